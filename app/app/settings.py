@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'core',
     'rest_framework',
     'rest_framework.authtoken',
@@ -99,6 +100,80 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+elif os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR'),
+        }
+    }
+else:
+    # Each process has its own copy, so cache generation bumps are not seen
+    # by other workers; set REDIS_URL or CACHE_DIR when running several.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+COURSE_CACHE_ALIAS = 'default'
+COURSE_CACHE_TIMEOUT = 300
+COURSE_CACHE_LOCK_TIMEOUT = 10
+
+# Rows read per round trip, and tagged per query, by the course export.
+COURSE_EXPORT_CHUNK_SIZE = 2000
+
+# Similar courses weigh tag overlap against text similarity. The index of
+# each user is persisted in COURSE_SIMILARITY_DIR and a bounded number of
+# them are kept in memory per process. Courses changed within
+# COURSE_SIMILARITY_LAG seconds of the last change seen are read again, as
+# transactions may commit in another order than their timestamps.
+COURSE_SIMILARITY_TAG_WEIGHT = 0.5
+COURSE_SIMILARITY_LAG = 60
+COURSE_SIMILARITY_DIR = os.environ.get(
+    'COURSE_SIMILARITY_DIR',
+    '/vol/web/similarity',
+)
+COURSE_SIMILARITY_CACHED_INDEXES = int(
+    os.environ.get('COURSE_SIMILARITY_CACHED_INDEXES', 32)
+)
+
+# Catalog courses stored per user by the refresh_recommendations command.
+# Users are refreshed again until COURSE_RECOMMENDATIONS_LAG seconds after
+# their last change, which may commit after its timestamp.
+COURSE_RECOMMENDATIONS_PER_USER = 50
+COURSE_RECOMMENDATIONS_LAG = 60
+
+# Per-process cache of token lookups; set AUTH_TOKEN_CACHE_ALIAS to also
+# share entries between processes through one of CACHES.
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('AUTH_TOKEN_CACHE_ALIAS')
+
+# 'db' issues database tokens; 'signed' issues short-lived signed access
+# tokens with refresh tokens and still accepts existing database tokens.
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+AUTH_ACCESS_TOKEN_LIFETIME = int(
+    os.environ.get('AUTH_ACCESS_TOKEN_LIFETIME', 5 * 60)
+)
+AUTH_REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get('AUTH_REFRESH_TOKEN_LIFETIME', 7 * 24 * 60 * 60)
+)
+AUTH_DENY_LIST_SYNC_INTERVAL = int(
+    os.environ.get('AUTH_DENY_LIST_SYNC_INTERVAL', 30)
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -141,6 +216,37 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Threads per process resizing uploaded course images.
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+
+# Media is served by core.media.serve_media. Set MEDIA_ACCEL to
+# 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache, lighttpd) to let the
+# front server transfer the files; nginx needs an internal location at
+# MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT.
+MEDIA_SERVE_PREFIXES = ['uploads/course/']
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Limits of uploaded course images, checked before they are decoded.
+# Uploads are streamed to temporary files in chunks of the given size.
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 40 * 1000 * 1000)
+)
+IMAGE_UPLOAD_FORMATS = ['JPEG', 'PNG', 'WEBP']
+IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_UPLOAD_PARTIAL_DIR = 'uploads/partial'
+
+# Widths served by the on-demand resize endpoint and its disk cache, kept
+# in a directory under MEDIA_ROOT and bounded in bytes.
+IMAGE_RESIZE_WIDTHS = [160, 320, 480, 640, 960, 1280, 1600]
+IMAGE_RESIZE_CACHE_DIR = 'cache/resized'
+IMAGE_RESIZE_CACHE_SIZE = int(
+    os.environ.get('IMAGE_RESIZE_CACHE_SIZE', 512 * 1024 * 1024)
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,139 @@
+"""
+Cache backends.
+"""
+import pickle
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+
+# Increments a key only if it exists, in one atomic step, so that a key
+# expiring meanwhile is not recreated at the delta.
+INCR_EXISTING_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return false
+"""
+
+
+class RedisCache(BaseCache):
+    """
+    Cache backend for Redis and servers speaking its protocol.
+
+    Integers are stored as plain values so that INCR works on them, every
+    other value is pickled. The client class can be swapped through the
+    CLIENT_CLASS option, e.g. for an in-process stand-in during tests.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._server = server
+        self._client_class = options.get('CLIENT_CLASS', 'redis.Redis')
+        self._client_kwargs = options.get('CLIENT_KWARGS', {})
+        self._client = None
+        self._incr_script = None
+
+    @property
+    def client(self):
+        """Return the Redis client, connecting lazily."""
+        if self._client is None:
+            client_class = import_string(self._client_class)
+            self._client = client_class.from_url(
+                self._server,
+                **self._client_kwargs,
+            )
+
+        return self._client
+
+    def _dumps(self, value):
+        """Serialize a value for storage."""
+        if type(value) is int:
+            return value
+
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _loads(self, data):
+        """Deserialize a stored value."""
+        try:
+            return int(data)
+        except ValueError:
+            return pickle.loads(data)
+
+    def _expiry(self, timeout):
+        """Return the expiry in milliseconds, or None to never expire."""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None
+
+        return max(int(timeout * 1000), 0)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            return False
+
+        return bool(self.client.set(
+            key,
+            self._dumps(value),
+            px=expiry,
+            nx=True,
+        ))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data = self.client.get(key)
+        if data is None:
+            return default
+
+        return self._loads(data)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self._expiry(timeout)
+        if expiry == 0:
+            self.client.delete(key)
+            return
+
+        self.client.set(key, self._dumps(value), px=expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self._expiry(timeout)
+        if expiry is None:
+            return bool(self.client.persist(key))
+
+        return bool(self.client.pexpire(key, expiry))
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self.client.delete(key))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self.client.exists(key))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        if self._incr_script is None:
+            self._incr_script = self.client.register_script(
+                INCR_EXISTING_SCRIPT,
+            )
+        value = self._incr_script(keys=[key], args=[delta])
+        if value is None:
+            raise ValueError("Key '%s' not found." % key)
+
+        return value
+
+    def clear(self):
+        self.client.flushdb()
@@ -0,0 +1,116 @@
+"""
+Django command to compare ways of serializing course lists.
+"""
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Course, Tag
+from course.renderers import FastJSONRenderer
+from course.representations import (
+    COURSE_FIELDS,
+    course_columns,
+    represent_courses,
+)
+from course.serializers import CourseSerializer
+
+
+TAGS_PER_COURSE = 3
+
+
+def best_time(function, repeat):
+    """Return the fastest of several runs of a function, in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Django command to benchmark course list serialization."""
+    help = (
+        'Time rendering course lists with CourseSerializer and with the '
+        'values() based fast path. Sample data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[100, 1000, 10000],
+            help='Numbers of courses to render.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Runs per measurement, the fastest is reported.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                f'benchmark-{uuid.uuid4().hex}@example.com',
+                uuid.uuid4().hex,
+            )
+            tags = Tag.objects.bulk_create([
+                Tag(user=user, name=f'Tag {index}') for index in range(10)
+            ])
+            created = 0
+            for size in sorted(options['sizes']):
+                self._create_courses(user, tags, created, size)
+                created = max(created, size)
+                self._measure(user, size, options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def _create_courses(self, user, tags, start, stop):
+        """Create sample courses numbered from start to stop."""
+        courses = Course.objects.bulk_create([
+            Course(
+                user=user,
+                title=f'Course {index}',
+                duration_hours=index % 100 + 1,
+                price=f'{index % 1000}.{index % 100:02d}',
+                link=f'https://example.com/courses/{index}',
+            )
+            for index in range(start, stop)
+        ])
+        Course.tags.through.objects.bulk_create([
+            Course.tags.through(
+                course_id=course.id,
+                tag_id=tags[(course.id + offset) % len(tags)].id,
+            )
+            for course in courses
+            for offset in range(TAGS_PER_COURSE)
+        ])
+
+    def _measure(self, user, size, repeat):
+        """Time both ways of rendering a list of courses."""
+        queryset = Course.objects.filter(user=user).order_by('-id')[:size]
+
+        def serializer():
+            courses = queryset.defer('search_vector').prefetch_related('tags')
+            return JSONRenderer().render(
+                CourseSerializer(courses, many=True).data,
+            )
+
+        def fast():
+            rows = list(queryset.values(*course_columns(COURSE_FIELDS)))
+            return FastJSONRenderer().render(represent_courses(rows))
+
+        slow_time = best_time(serializer, repeat)
+        fast_time = best_time(fast, repeat)
+        self.stdout.write(
+            f'{size:>6} courses: serializer {slow_time * 1000:.1f} ms, '
+            f'fast path {fast_time * 1000:.1f} ms, '
+            f'{slow_time / fast_time:.1f}x faster'
+        )
@@ -0,0 +1,37 @@
+"""
+Django command to rebuild the similar-course indexes of users.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from course.similarity import get_index
+
+
+class Command(BaseCommand):
+    """Django command to rebuild similar-course indexes from scratch."""
+    help = (
+        'Rebuild the similar-course index of every user, or of one user. '
+        'Indexes are otherwise brought up to date when queried.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Email of the only user whose index to rebuild.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        users = get_user_model().objects.filter(course__isnull=False)
+        if options['user']:
+            users = get_user_model().objects.filter(email=options['user'])
+            if not users.exists():
+                raise CommandError(f'User {options["user"]} does not exist.')
+
+        built = 0
+        for user_id in users.values_list('id', flat=True).distinct():
+            index = get_index(user_id, rebuild=True)
+            built += 1
+            self.stdout.write(f'User {user_id}: {len(index.ids)} courses.')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {built} indexes.'))
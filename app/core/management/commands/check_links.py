@@ -0,0 +1,99 @@
+"""
+Django command to check the links of courses.
+"""
+import datetime
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from course.links import LinkChecker, check_courses, links_to_check
+
+
+class Command(BaseCommand):
+    """Django command to record the health of course links."""
+    help = (
+        'Check course links not checked recently, many at a time, and '
+        'record their status, final URL and ETag.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=24 * 60 * 60,
+            help='Check links last checked more than this many seconds ago.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of courses checked and saved together.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=100,
+            help='Maximum number of requests in flight.',
+        )
+        parser.add_argument(
+            '--per-host',
+            type=int,
+            default=4,
+            help='Maximum number of requests in flight to one host.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=10,
+            help='Seconds allowed for checking one link.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, checking again every this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['max_age'] < 0:
+            # Checked links would stay due, and be checked forever.
+            raise CommandError('--max-age must not be negative.')
+
+        with LinkChecker(
+            concurrency=options['concurrency'],
+            per_host=options['per_host'],
+            timeout=options['timeout'],
+        ) as checker:
+            while True:
+                started = time.monotonic()
+                self.run(checker, options['max_age'], options['batch_size'])
+                if not options['interval']:
+                    return
+                time.sleep(max(
+                    options['interval'] - (time.monotonic() - started), 0,
+                ))
+
+    def run(self, checker, max_age, batch_size):
+        """Check every link due once."""
+        started = time.monotonic()
+        checked_before = timezone.now() - datetime.timedelta(seconds=max_age)
+        courses = requests = 0
+        while True:
+            # Checked courses leave the queryset, so the next batch is
+            # always at its start.
+            batch = list(links_to_check(checked_before)[:batch_size])
+            if not batch:
+                break
+            requests += check_courses(checker, batch)
+            courses += len(batch)
+            self.stdout.write(
+                f'{courses} courses checked with {requests} requests '
+                f'({courses / max(time.monotonic() - started, 1e-6):.0f} '
+                f'courses/s)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {courses} course links.'
+        ))
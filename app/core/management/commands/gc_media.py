@@ -0,0 +1,101 @@
+"""
+Django command to delete unreferenced course image files.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from core.models import StoredFile
+
+
+def walk_files(root):
+    """Yield the directory entries of all files below root, lazily."""
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Command(BaseCommand):
+    """Django command to garbage-collect course image files."""
+    help = (
+        'Delete files under MEDIA_ROOT/uploads/course that no course '
+        'refers to.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=3600,
+            help='Keep files modified less than this many seconds ago, '
+                 'which may belong to uploads still in progress.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of files looked up per query.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the files that would be deleted.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        self.dry_run = options['dry_run']
+        self.deleted = 0
+        self.freed = 0
+        cutoff = time.time() - options['min_age']
+        root = os.path.join(settings.MEDIA_ROOT, 'uploads', 'course')
+
+        batch = {}
+        for entry in walk_files(root):
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                continue
+            name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+            batch[name.replace(os.sep, '/')] = (entry.path, stat.st_size)
+            if len(batch) >= options['batch_size']:
+                self.collect(batch)
+                batch = {}
+        self.collect(batch)
+
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {self.deleted} unreferenced files '
+            f'({self.freed} bytes).'
+        ))
+
+    def collect(self, batch):
+        """Delete the files of a batch that have no references."""
+        if not batch:
+            return
+
+        referenced = set(StoredFile.objects.filter(
+            name__in=batch,
+        ).values_list('name', flat=True))
+        for name, (path, size) in batch.items():
+            if name in referenced:
+                continue
+            if self.dry_run:
+                self.stdout.write(name)
+            else:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+            self.deleted += 1
+            self.freed += size
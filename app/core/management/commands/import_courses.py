@@ -0,0 +1,199 @@
+"""
+Django command to import courses from CSV or JSON lines files.
+"""
+import itertools
+import json
+import os
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from course.importer import (
+    IMPORT_FORMATS,
+    CourseImporter,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    """Django command to bulk import courses for a user."""
+    help = (
+        'Import courses for a user from a CSV, JSONL or NDJSON file, '
+        'updating the courses with the same link. Interrupted imports '
+        'resume from their checkpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='File to import, or - to read standard input.',
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Email of the user owning the courses.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=IMPORT_FORMATS,
+            help='Format of the source, by default its file extension.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of records written per transaction.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File recording progress, by default SOURCE.checkpoint.',
+        )
+        parser.add_argument(
+            '--errors',
+            help='File receiving invalid records as JSON lines, by '
+                 'default SOURCE.errors.jsonl.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Write with bulk_create even on PostgreSQL.',
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'User {options["user"]} does not exist.')
+
+        import_format = options['format'] or \
+            os.path.splitext(source)[1].lstrip('.').lower()
+        if import_format not in IMPORT_FORMATS:
+            raise CommandError('Unknown source format, pass --format.')
+
+        from_stdin = source == '-'
+        self.checkpoint_path = options['checkpoint'] or \
+            (None if from_stdin else f'{source}.checkpoint')
+        self.errors_path = options['errors'] or \
+            (None if from_stdin else f'{source}.errors.jsonl')
+        self.importer = CourseImporter(
+            user,
+            use_copy=False if options['no_copy'] else None,
+        )
+        self.totals = self.load_checkpoint()
+        if self.totals['records']:
+            self.stdout.write(
+                f'Resuming after {self.totals["records"]} records.'
+            )
+
+        stream = sys.stdin if from_stdin else \
+            open(source, encoding='utf-8', newline='')
+        try:
+            self.run(stream, import_format, options['batch_size'])
+        finally:
+            if not from_stdin:
+                stream.close()
+
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.unlink(self.checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {self.totals["records"]} records: '
+            f'{self.totals["created"]} created, '
+            f'{self.totals["updated"]} updated, '
+            f'{self.totals["failed"]} failed, '
+            f'{self.totals["duplicates"]} duplicate links skipped.'
+        ))
+
+    def run(self, stream, import_format, batch_size):
+        """Validate and write the records not imported yet."""
+        records = itertools.islice(
+            enumerate(read_records(stream, import_format), 1),
+            self.totals['records'],
+            None,
+        )
+        started = time.monotonic()
+        first = self.totals['records']
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                return
+
+            rows, errors = [], []
+            for number, record in batch:
+                data, record_errors = self.importer.validate(record)
+                if record_errors:
+                    errors.append({
+                        'record': number,
+                        'errors': record_errors,
+                        'data': record,
+                    })
+                else:
+                    rows.append(data)
+
+            created, updated = self.importer.write(rows) if rows else (0, 0)
+            self.write_errors(errors)
+            self.totals['records'] = batch[-1][0]
+            self.totals['created'] += created
+            self.totals['updated'] += updated
+            self.totals['failed'] += len(errors)
+            self.totals['duplicates'] += len(rows) - created - updated
+            self.save_checkpoint()
+
+            rate = (self.totals['records'] - first) / \
+                max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f'{self.totals["records"]} records: '
+                f'{self.totals["created"]} created, '
+                f'{self.totals["updated"]} updated, '
+                f'{self.totals["failed"]} failed, '
+                f'{self.totals["duplicates"]} duplicate links skipped '
+                f'({rate:.0f} records/s)'
+            )
+
+    def write_errors(self, errors):
+        """Append invalid records to the error file."""
+        if not errors:
+            return
+        if not self.errors_path:
+            for error in errors:
+                self.stderr.write(json.dumps(error, default=str))
+            return
+
+        with open(self.errors_path, 'a', encoding='utf-8') as errors_file:
+            for error in errors:
+                errors_file.write(json.dumps(error, default=str) + '\n')
+
+    def load_checkpoint(self):
+        """Return the totals of an interrupted import, or empty totals."""
+        totals = {
+            'records': 0,
+            'created': 0,
+            'updated': 0,
+            'failed': 0,
+            'duplicates': 0,
+        }
+        if not self.checkpoint_path:
+            return totals
+
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return totals
+        except ValueError:
+            raise CommandError(f'Invalid checkpoint {self.checkpoint_path}.')
+
+        totals.update({key: int(saved.get(key, 0)) for key in totals})
+        return totals
+
+    def save_checkpoint(self):
+        """Record the records written so far, replacing the file at once."""
+        if not self.checkpoint_path:
+            return
+
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.totals, f)
+        os.replace(temp_path, self.checkpoint_path)
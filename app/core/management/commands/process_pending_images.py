@@ -0,0 +1,49 @@
+"""
+Django command to process course images left pending.
+"""
+from datetime import timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import Course
+from course.images import run_variants
+
+
+class Command(BaseCommand):
+    """Django command to generate the variants of stale pending images."""
+    help = (
+        'Generate the variants of course images still pending, e.g. whose '
+        'jobs were lost when the server restarted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=600,
+            help='Only process images uploaded at least this many seconds '
+                 'ago, whose jobs may otherwise still be running.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['min_age'] < 0:
+            raise CommandError('--min-age must not be negative.')
+
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        jobs = Course.objects.filter(
+            image_status=Course.IMAGE_PENDING,
+            updated_at__lte=cutoff,
+        ).order_by('id').values_list(
+            'id', 'user_id', 'image',
+        )
+
+        processed = 0
+        for job in jobs:
+            run_variants(*job)
+            processed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} pending images.'
+        ))
@@ -0,0 +1,21 @@
+"""
+Django command to correct the course counts of tags.
+"""
+from django.core.management import BaseCommand
+
+from core.models import Tag
+
+
+class Command(BaseCommand):
+    """Django command to recount the courses of tags."""
+    help = (
+        'Recount the courses of tags whose stored course count differs '
+        'from their links, e.g. after raw SQL changes.'
+    )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        drifted = Tag.objects.reconcile_course_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed {len(drifted)} tag counts.'
+        ))
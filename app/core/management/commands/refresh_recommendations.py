@@ -0,0 +1,57 @@
+"""
+Django command to refresh the materialized course recommendations.
+"""
+import time
+
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from course.recommendations import Catalog, refresh_user, stale_users
+
+
+class Command(BaseCommand):
+    """Django command to recompute recommendations of changed users."""
+    help = (
+        'Recompute the course recommendations of users whose courses, '
+        'tags or catalog courses sharing their tags changed since the last '
+        'run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute the recommendations of every user.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Keep running, refreshing every this many seconds.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            started = time.monotonic()
+            self.refresh(options['all'])
+            if not options['interval']:
+                return
+            time.sleep(max(
+                options['interval'] - (time.monotonic() - started), 0,
+            ))
+
+    def refresh(self, everyone):
+        """Recompute the recommendations of stale users once."""
+        started = time.monotonic()
+        read_at = timezone.now()
+        stale = stale_users(everyone=everyone)
+        if stale:
+            catalog = Catalog()
+            for user_id, signature in stale.items():
+                refresh_user(catalog, user_id, signature, read_at)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {len(stale)} users in '
+            f'{time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,222 @@
+"""
+Serving of uploaded media files.
+"""
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from core.models import StoredFile
+
+
+# Files named after the SHA-256 of their content, or derived from one,
+# never change and can be cached forever.
+CONTENT_ADDRESSED_RE = re.compile(r'(?:^|/)[0-9a-f]{64}(?:[./]|$)')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+MUTABLE_MAX_AGE = 60 * 60
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """
+    Window of an open file, read from its current position.
+
+    The wrapper exposes the file descriptor so that WSGI servers can send
+    the window with sendfile(); they start at the current offset and stop
+    after Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    Return the first and last byte requested by a Range header.
+
+    Returns None when the header should be ignored, e.g. when it asks for
+    several ranges, and raises RangeNotSatisfiable if it is out of bounds.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first == '':
+        # A suffix range asks for the last bytes of the file.
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        raise RangeNotSatisfiable()
+
+    return first, last
+
+
+def media_validators(name, stat):
+    """Return the ETag and modification time of a media file."""
+    if CONTENT_ADDRESSED_RE.search(name):
+        etag = f'"{hashlib.sha1(name.encode("utf-8")).hexdigest()}"'
+    else:
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+    return etag, int(stat.st_mtime)
+
+
+def if_range_matches(request, etag, last_modified):
+    """Return whether a Range header applies according to If-Range."""
+    if_range = request.headers.get('If-Range')
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def resolve(path):
+    """Return the storage name and file system path of a served file."""
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('..') or not any(
+        name.startswith(prefix) for prefix in settings.MEDIA_SERVE_PREFIXES
+    ):
+        raise Http404()
+
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except ValueError:
+        raise Http404()
+
+    # Only files a course refers to are public, not orphans or uploads
+    # still being processed.
+    if not StoredFile.objects.filter(name=name).exists():
+        raise Http404()
+
+    return name, full_path
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve a media file.
+
+    With MEDIA_ACCEL set the transfer is handed to the front server with
+    an X-Accel-Redirect or X-Sendfile header, otherwise the file is
+    streamed with support for conditional and Range requests.
+    """
+    name, full_path = resolve(path)
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        raise Http404()
+
+    etag, last_modified = media_validators(name, stat)
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+    )
+    if response is None:
+        response = accelerated_response(name, full_path, content_type) or \
+            file_response(request, full_path, stat.st_size, content_type,
+                          etag, last_modified)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if CONTENT_ADDRESSED_RE.search(name):
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=IMMUTABLE_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=MUTABLE_MAX_AGE)
+
+    return response
+
+
+def accelerated_response(name, full_path, content_type):
+    """Return a response delegating the transfer, or None if disabled."""
+    accel = settings.MEDIA_ACCEL
+    if not accel:
+        return None
+
+    response = HttpResponse(content_type=content_type)
+    if accel == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(
+            posixpath.join(settings.MEDIA_ACCEL_PREFIX, name)
+        )
+    elif accel == 'x-sendfile':
+        response['X-Sendfile'] = full_path
+    else:
+        raise ValueError(f'Unknown MEDIA_ACCEL {accel!r}.')
+
+    return response
+
+
+def file_response(request, full_path, size, content_type, etag,
+                  last_modified):
+    """Return a streaming response for the whole file or one range."""
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    first, last = byte_range or (0, size - 1)
+    length = last - first + 1
+    response = FileResponse(
+        RangeFile(open(full_path, 'rb'), first, length),
+        content_type=content_type,
+    )
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+
+    return response
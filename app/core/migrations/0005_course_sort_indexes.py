@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_course_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', 'price', 'id'], name='core_course_user_id_24ce8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', 'duration_hours', 'id'], name='core_course_user_id_051a55_idx'),
+        ),
+    ]
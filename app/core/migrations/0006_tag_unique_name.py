@@ -0,0 +1,47 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Merge tags sharing a name for the same user into one."""
+    Tag = apps.get_model('core', 'Tag')
+    Course = apps.get_model('core', 'Course')
+    CourseTag = Course.tags.through
+
+    duplicates = Tag.objects.values('user', 'name').annotate(
+        keep_id=Min('id'),
+        total=Count('id'),
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        others = Tag.objects.filter(
+            user=duplicate['user'],
+            name=duplicate['name'],
+        ).exclude(id=duplicate['keep_id'])
+        course_ids = CourseTag.objects.filter(
+            tag__in=others,
+        ).values_list('course_id', flat=True).distinct()
+        CourseTag.objects.bulk_create(
+            [
+                CourseTag(course_id=course_id, tag_id=duplicate['keep_id'])
+                for course_id in course_ids
+            ],
+            ignore_conflicts=True,
+        )
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_course_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='unique_tag_name_per_user'),
+        ),
+    ]
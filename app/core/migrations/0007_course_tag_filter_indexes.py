@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tag_unique_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['user', '-id'], name='core_course_user_id_2dbd7f_idx'),
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX core_course_tags_tag_id_course_id_idx '
+            'ON core_course_tags (tag_id, course_id);',
+            'DROP INDEX core_course_tags_tag_id_course_id_idx;',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.25 on 2026-10-16 23:41
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+CREATE_TRIGGER = """
+CREATE FUNCTION core_course_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_course_search_vector_trigger
+BEFORE INSERT OR UPDATE OF title, description, search_vector ON core_course
+FOR EACH ROW EXECUTE PROCEDURE core_course_search_vector_update();
+
+UPDATE core_course SET search_vector = NULL;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER core_course_search_vector_trigger ON core_course;
+DROP FUNCTION core_course_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_course_tag_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.AddIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_course_search__db39c5_gin'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:04
+
+from collections import Counter
+
+import core.models
+import core.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    """Count the references of courses to their existing files."""
+    Course = apps.get_model('core', 'Course')
+    StoredFile = apps.get_model('core', 'StoredFile')
+
+    counts = Counter()
+    courses = Course.objects.exclude(image='').exclude(image=None)
+    for image, variants in courses.values_list(
+        'image', 'image_variants',
+    ).iterator():
+        counts[image] += 1
+        for variant in variants.values():
+            counts.update(
+                name for name in variant.values() if isinstance(name, str)
+            )
+
+    StoredFile.objects.bulk_create(
+        [
+            StoredFile(name=name, references=count)
+            for name, count in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_imageupload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='course',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.course_image_file_path),
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
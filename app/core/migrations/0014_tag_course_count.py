@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:31
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_courses(apps, schema_editor):
+    """Count the courses of every tag."""
+    Course = apps.get_model('core', 'Course')
+    Tag = apps.get_model('core', 'Tag')
+
+    counts = Course.tags.through.objects.filter(
+        tag_id=OuterRef('pk'),
+    ).order_by().values('tag_id').annotate(count=Count('*')).values('count')
+    Tag.objects.update(course_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_storedfile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='course_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-course_count', 'name'], name='core_tag_user_id_5b4f0f_idx'),
+        ),
+        migrations.RunPython(count_courses, migrations.RunPython.noop),
+    ]
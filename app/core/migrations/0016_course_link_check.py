@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-17 00:50
+
+from django.db import migrations, models
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_course_recommendations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='link_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='link_etag',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='link_final_url',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='link_status',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(django.db.models.expressions.OrderBy(django.db.models.expressions.F('link_checked_at'), nulls_first=True), name='course_link_checked_at_idx'),
+        ),
+    ]
@@ -3,23 +3,33 @@ Database models.
 """
 import uuid
 import os
+from collections import Counter
 
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import OuterRef
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 
+from core.storage import ContentAddressedStorage
+
+
+SEARCH_CONFIG = 'english'
+
 
 def course_image_file_path(instance, filename):
     """Generate file path for new course image."""
-    ext = os.path.splitext(filename)[1]
-    filename = f'{uuid.uuid4()}{ext}'
+    ext = os.path.splitext(filename)[1].lower()
 
-    return os.path.join('uploads', 'course', filename)
+    # The storage names the file after the hash of its content.
+    return os.path.join('uploads', 'course', f'image{ext}')
 
 
 class UserManager(BaseUserManager):
@@ -51,14 +61,35 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Courses of partners form the catalog recommendations are drawn from.
+    is_partner = models.BooleanField(default=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
+class CourseQuerySet(models.QuerySet):
+    """Queryset of courses."""
+
+    def delete(self):
+        """Delete the courses, dropping them from the counts of their tags."""
+        with transaction.atomic():
+            Tag.objects.uncount_courses(self.values('id'))
+            return super().delete()
+
+
 class Course(models.Model):
     """Course object."""
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUS_CHOICES = [
+        (IMAGE_PENDING, 'Pending'),
+        (IMAGE_READY, 'Ready'),
+        (IMAGE_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -68,13 +99,234 @@ class Course(models.Model):
     duration_hours = models.IntegerField()
     price = models.DecimalField(max_digits=6, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
+    # Results of the last check of the link: the HTTP status, 0 when the
+    # link could not be fetched, the URL redirects led to and its ETag.
+    link_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    link_checked_at = models.DateTimeField(null=True, blank=True)
+    link_final_url = models.TextField(blank=True)
+    link_etag = models.TextField(blank=True)
+    LINK_CHECK_FIELDS = [
+        'link_status',
+        'link_checked_at',
+        'link_final_url',
+        'link_etag',
+    ]
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=course_image_file_path)
+    image = models.ImageField(
+        null=True,
+        upload_to=course_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        blank=True,
+    )
+    image_variants = models.JSONField(default=dict, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id']),
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'duration_hours', 'id']),
+            GinIndex(fields=['search_vector']),
+            models.Index(
+                models.F('link_checked_at').asc(nulls_first=True),
+                name='course_link_checked_at_idx',
+            ),
+        ]
+
+    def stored_files(self):
+        """Return the names of the stored files the course refers to."""
+        names = [self.image.name] if self.image else []
+        for variant in self.image_variants.values():
+            names += [
+                name for name in variant.values() if isinstance(name, str)
+            ]
+
+        return names
+
+    def set_link(self, link):
+        """
+        Change the link, forgetting the checks of the previous one.
+
+        A course with a new link is due for a check first.
+        """
+        if link == self.link:
+            return
+        self.link = link
+        self.link_status = None
+        self.link_checked_at = None
+        self.link_final_url = ''
+        self.link_etag = ''
+
+    def delete(self, *args, **kwargs):
+        """Delete the course, dropping it from the counts of its tags."""
+        with transaction.atomic():
+            Tag.objects.uncount_courses([self.id])
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
 
+class StoredFileManager(models.Manager):
+    """Manager for stored files."""
+
+    def _adjust(self, names, sign):
+        """Add or subtract the occurrences of names from their counts."""
+        counts = Counter(name for name in names if name)
+        by_count = {}
+        for name, count in counts.items():
+            by_count.setdefault(count, []).append(name)
+
+        for count, group in by_count.items():
+            self.filter(name__in=group).update(
+                references=models.F('references') + sign * count,
+            )
+
+        return list(counts)
+
+    def retain(self, names):
+        """Count a new reference to each of the named files."""
+        names = [name for name in names if name]
+        if not names:
+            return
+
+        with transaction.atomic():
+            self.bulk_create(
+                [StoredFile(name=name) for name in set(names)],
+                ignore_conflicts=True,
+            )
+            self._adjust(names, 1)
+
+    def release(self, names):
+        """Drop a reference to each of the named files."""
+        names = [name for name in names if name]
+        if not names:
+            return
+
+        with transaction.atomic():
+            names = self._adjust(names, -1)
+            self.filter(name__in=names, references__lte=0).delete()
+
+
+class StoredFile(models.Model):
+    """
+    Reference count of a stored, possibly shared file.
+
+    Files without a row are unreferenced and removed by the gc_media
+    command.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+
+    objects = StoredFileManager()
+
+    def __str__(self):
+        return self.name
+
+
+class ImageUpload(models.Model):
+    """Resumable upload of a course image, received in chunks."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def path(self):
+        """Return the path of the partially received file."""
+        return os.path.join(
+            settings.MEDIA_ROOT,
+            settings.IMAGE_UPLOAD_PARTIAL_DIR,
+            f'{self.id}.part',
+        )
+
+    def __str__(self):
+        return self.filename
+
+
+class TagManager(models.Manager):
+    """Manager for tags."""
+
+    def get_or_create_many(self, user, names):
+        """Return tags for the given names, creating any that are missing."""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        tags = {
+            tag.name: tag
+            for tag in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in tags]
+        if missing:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            tags.update({
+                tag.name: tag
+                for tag in self.filter(user=user, name__in=missing)
+            })
+
+        return [tags[name] for name in names]
+
+    def reconcile_course_counts(self):
+        """Recount the courses of tags whose count drifted, returning them."""
+        CourseTag = Course.tags.through
+        counts = CourseTag.objects.filter(
+            tag_id=OuterRef('pk'),
+        ).order_by().values('tag_id').annotate(
+            count=models.Count('*'),
+        ).values('count')
+        actual = Coalesce(models.Subquery(counts), 0)
+
+        with transaction.atomic():
+            drifted = list(self.annotate(actual=actual).exclude(
+                course_count=models.F('actual'),
+            ).select_for_update(of=('self',)).values_list('id', flat=True))
+            if drifted:
+                self.filter(id__in=drifted).update(course_count=actual)
+
+        return drifted
+
+    def adjust_course_counts(self, changes):
+        """Add the changes, a mapping of tag ids to deltas, to the counts."""
+        by_delta = {}
+        for tag_id, delta in changes.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(tag_id)
+
+        for delta, tag_ids in by_delta.items():
+            self.filter(id__in=tag_ids).update(
+                course_count=models.F('course_count') + delta,
+            )
+
+    def uncount_courses(self, course_ids):
+        """Drop the given courses, ids or a subquery, from the counts."""
+        links = Course.tags.through.objects.filter(course_id__in=course_ids)
+        counts = links.filter(
+            tag_id=OuterRef('pk'),
+        ).order_by().values('tag_id').annotate(
+            count=models.Count('*'),
+        ).values('count')
+        self.filter(id__in=links.values('tag_id')).update(
+            course_count=models.F('course_count') - models.Subquery(counts),
+        )
+
+
 class Tag(models.Model):
     """Tag for filtering courses."""
     name = models.CharField(max_length=255)
@@ -82,6 +334,72 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # Number of courses with the tag, kept up to date on every change of
+    # course tags and checked by the reconcile_tag_counts command.
+    course_count = models.IntegerField(default=0, editable=False)
+
+    objects = TagManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='unique_tag_name_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-course_count', 'name']),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class CourseRecommendation(models.Model):
+    """Catalog course recommended to a user, at a rank."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='recommendations',
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'],
+                name='unique_recommendation_rank_per_user',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.course_id}'
+
+
+class RecommendationState(models.Model):
+    """What the recommendations of a user were last computed from."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+    )
+    signature = models.CharField(max_length=255)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.signature
+
+
+class RevokedToken(models.Model):
+    """Signed token that must no longer be accepted."""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
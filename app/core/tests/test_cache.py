@@ -0,0 +1,88 @@
+"""
+Tests for cache backends.
+"""
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import RedisCache
+
+
+def create_cache(**params):
+    """Create and return a Redis cache backed by an in-process server."""
+    defaults = {
+        'OPTIONS': {'CLIENT_CLASS': 'fakeredis.FakeRedis'},
+    }
+    defaults.update(params)
+    return RedisCache('redis://localhost:6379/0', defaults)
+
+
+class RedisCacheTests(SimpleTestCase):
+    """Test the Redis cache backend."""
+
+    def setUp(self):
+        self.cache = create_cache()
+        self.cache.clear()
+
+    def test_set_and_get(self):
+        """Test storing and reading values."""
+        self.cache.set('number', 42)
+        self.cache.set('data', {'courses': [1, 2, 3]})
+
+        self.assertEqual(self.cache.get('number'), 42)
+        self.assertEqual(self.cache.get('data'), {'courses': [1, 2, 3]})
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_add_only_when_missing(self):
+        """Test add does not overwrite existing values."""
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+
+        self.assertEqual(self.cache.get('key'), 'first')
+
+    def test_incr(self):
+        """Test incrementing integer values."""
+        self.cache.set('counter', 1)
+
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 5), 7)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.assertNotIn('missing', self.cache)
+
+    def test_incr_atomic(self):
+        """Test a key vanishing while incremented is not recreated."""
+        # The key looks present to any separate existence check.
+        with patch.object(self.cache.client, 'exists', return_value=1):
+            with self.assertRaises(ValueError):
+                self.cache.incr('expired')
+
+        self.assertIsNone(self.cache.get('expired'))
+
+    def test_delete_and_has_key(self):
+        """Test deleting values."""
+        self.cache.set('key', 'value')
+
+        self.assertIn('key', self.cache)
+        self.assertTrue(self.cache.delete('key'))
+        self.assertNotIn('key', self.cache)
+
+    def test_timeout(self):
+        """Test values expire after their timeout."""
+        self.cache.set('short', 'value', timeout=0.05)
+        self.cache.set('forever', 'value', timeout=None)
+        self.cache.set('gone', 'value', timeout=0)
+
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 'value')
+        self.assertIsNone(self.cache.get('gone'))
+
+    def test_key_prefix(self):
+        """Test caches with different prefixes do not share keys."""
+        other = create_cache(KEY_PREFIX='other')
+        self.cache.set('key', 'value')
+
+        self.assertIsNone(other.get('key'))
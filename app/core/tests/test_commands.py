@@ -1,13 +1,25 @@
 """
 Test custom Django management commands.
 """
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import Course, StoredFile, Tag
+from core.storage import ContentAddressedStorage
+from course.cache import get_generation
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +44,382 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class GcMediaCommandTests(TestCase):
+    """Test garbage-collecting course image files."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def create_file(self, name, age=7200):
+        """Create a file below MEDIA_ROOT, modified age seconds ago."""
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'data')
+        mtime = os.path.getmtime(path) - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def gc(self, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command('gc_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_unreferenced_files_deleted(self):
+        """Test only files without references are deleted."""
+        kept = self.create_file('uploads/course/ab/kept.jpg')
+        variant = self.create_file('uploads/course/variants/k/card.webp')
+        orphan = self.create_file('uploads/course/ab/orphan.jpg')
+        legacy = self.create_file('uploads/course/legacy.jpg')
+        other = self.create_file('uploads/other/file.jpg')
+        StoredFile.objects.retain([
+            'uploads/course/ab/kept.jpg',
+            'uploads/course/variants/k/card.webp',
+        ])
+
+        out = self.gc('--batch-size', '2')
+
+        self.assertIn('Deleted 2 unreferenced files (8 bytes)', out)
+        self.assertTrue(os.path.exists(kept))
+        self.assertTrue(os.path.exists(variant))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(other))
+
+    def test_recent_files_kept(self):
+        """Test files younger than the minimum age are kept."""
+        recent = self.create_file('uploads/course/ab/recent.jpg', age=60)
+
+        self.gc()
+        self.assertTrue(os.path.exists(recent))
+
+        self.gc('--min-age', '30')
+        self.assertFalse(os.path.exists(recent))
+
+    def test_reused_files_kept(self):
+        """Test an orphan reused by a new upload is not deleted."""
+        storage = ContentAddressedStorage()
+        name = storage.content_name(
+            'uploads/course/image.jpg',
+            ContentFile(b'data'),
+        )
+        orphan = self.create_file(name)
+
+        saved = storage.save('uploads/course/image.jpg', ContentFile(b'data'))
+        self.gc()
+
+        self.assertEqual(saved, name)
+        self.assertTrue(os.path.exists(orphan))
+
+    def test_dry_run(self):
+        """Test a dry run only lists the files."""
+        orphan = self.create_file('uploads/course/ab/orphan.jpg')
+
+        out = self.gc('--dry-run')
+
+        self.assertIn('uploads/course/ab/orphan.jpg', out)
+        self.assertIn('Would delete 1 unreferenced files', out)
+        self.assertTrue(os.path.exists(orphan))
+
+    def test_directory_streamed(self):
+        """Test files are looked up in batches while walking."""
+        for index in range(5):
+            self.create_file(f'uploads/course/ab/{index}.jpg')
+
+        with self.assertNumQueries(3):
+            self.gc('--batch-size', '2')
+
+
+class BenchmarkCoursesCommandTests(TestCase):
+    """Test benchmarking course serialization."""
+
+    def test_reports_sizes_and_rolls_back(self):
+        """Test every size is timed and no sample data is kept."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_courses',
+            '--sizes', '3', '5',
+            '--repeat', '1',
+            stdout=out,
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('3 courses', lines[0])
+        self.assertIn('5 courses', lines[1])
+        self.assertFalse(Course.objects.exists())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class ReconcileTagCountsCommandTests(TestCase):
+    """Test correcting the course counts of tags."""
+
+    def test_drifted_counts_fixed(self):
+        """Test drifted counts are recounted and reported."""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        tag = Tag.objects.create(user=user, name='Python', course_count=3)
+        Tag.objects.create(user=user, name='Django')
+        out = StringIO()
+
+        call_command('reconcile_tag_counts', stdout=out)
+
+        tag.refresh_from_db()
+        self.assertEqual(tag.course_count, 0)
+        self.assertIn('Fixed 1 tag counts.', out.getvalue())
+
+
+class BuildSimilarityIndexCommandTests(TestCase):
+    """Test rebuilding similar-course indexes."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_indexes_rebuilt(self):
+        """Test the indexes of users with courses are written."""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        for title in ['Python', 'Django']:
+            Course.objects.create(
+                user=user,
+                title=title,
+                duration_hours=5,
+                price=Decimal('9.99'),
+            )
+        out = StringIO()
+
+        with override_settings(COURSE_SIMILARITY_DIR=self.directory):
+            call_command('build_similarity_index', stdout=out)
+
+        self.assertEqual(os.listdir(self.directory), [f'{user.id}.npz'])
+        self.assertIn(f'User {user.id}: 2 courses.', out.getvalue())
+        self.assertIn('Rebuilt 1 indexes.', out.getvalue())
+
+    def test_unknown_user(self):
+        """Test rebuilding the index of a missing user fails."""
+        with self.assertRaises(CommandError):
+            call_command('build_similarity_index', '--user', 'x@example.com')
+
+
+class ImportCoursesCommandTests(TestCase):
+    """Test bulk importing courses."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def write_source(self, name, lines):
+        """Write a source file and return its path."""
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        return path
+
+    def jsonl(self, *records):
+        """Write records as a JSON lines file and return its path."""
+        return self.write_source(
+            'courses.jsonl',
+            [json.dumps(record) for record in records],
+        )
+
+    def run_import(self, path, *args):
+        """Run the command and return its output."""
+        out = StringIO()
+        call_command(
+            'import_courses', path, '--user', self.user.email, *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def course(self, index, **params):
+        """Return a sample course record."""
+        record = {
+            'title': f'Course {index}',
+            'duration_hours': index + 1,
+            'price': f'{index}.50',
+            'link': f'https://example.com/{index}',
+        }
+        record.update(params)
+        return record
+
+    def test_import_jsonl(self):
+        """Test valid records are imported and invalid ones reported."""
+        path = self.jsonl(
+            self.course(1, tags=['Python', 'Django']),
+            self.course(2, price='not a price'),
+            self.course(3, tags=[{'name': 'Python'}]),
+        )
+
+        out = self.run_import(path)
+
+        self.assertIn('2 created, 0 updated, 1 failed', out)
+        courses = Course.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(
+            [course.title for course in courses],
+            ['Course 1', 'Course 3'],
+        )
+        self.assertEqual(
+            sorted(courses[0].tags.values_list('name', flat=True)),
+            ['Django', 'Python'],
+        )
+        self.assertEqual(courses[1].tags.get().name, 'Python')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        with open(f'{path}.errors.jsonl') as f:
+            errors = [json.loads(line) for line in f]
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['record'], 2)
+        self.assertIn('price', errors[0]['errors'])
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
+
+    def test_import_csv(self):
+        """Test CSV files in the export layout are imported."""
+        path = self.write_source('courses.csv', [
+            'id,title,description,duration_hours,price,link,tags',
+            '7,"Data, big",,10,99.99,,"[""SQL""]"',
+            '8,Empty tags,"Multi\nline",5,1.00,https://x.y,',
+        ])
+
+        self.run_import(path)
+
+        first, second = Course.objects.filter(user=self.user).order_by('id')
+        self.assertEqual(first.title, 'Data, big')
+        self.assertEqual(first.description, '')
+        self.assertEqual(first.price, Decimal('99.99'))
+        self.assertEqual(first.tags.get().name, 'SQL')
+        self.assertEqual(second.description, 'Multi\nline')
+        self.assertFalse(second.tags.exists())
+
+    def test_upsert_by_link(self):
+        """Test courses with a known link are updated in place."""
+        for args in ([], ['--no-copy']):
+            with self.subTest(args=args):
+                Course.objects.all().delete()
+                existing = Course.objects.create(
+                    user=self.user,
+                    title='Old',
+                    duration_hours=1,
+                    price=Decimal('1.00'),
+                    link='https://example.com/1',
+                )
+                existing.tags.add(
+                    Tag.objects.get_or_create(user=self.user, name='X')[0],
+                )
+                modified = Course.objects.get(id=existing.id).updated_at
+                path = self.jsonl(
+                    self.course(1, title='First', tags=['New']),
+                    self.course(1, title='Renamed', tags=['New']),
+                    self.course(2, link=''),
+                    self.course(3, link=''),
+                )
+
+                out = self.run_import(path, *args)
+
+                self.assertIn(
+                    'Imported 4 records: 2 created, 1 updated, 0 failed, '
+                    '1 duplicate links skipped.',
+                    out,
+                )
+                existing.refresh_from_db()
+                self.assertEqual(existing.title, 'Renamed')
+                self.assertGreater(existing.updated_at, modified)
+                self.assertEqual(
+                    list(existing.tags.values_list('name', flat=True)),
+                    ['New'],
+                )
+                self.assertEqual(Course.objects.count(), 3)
+
+    def test_model_defaults_applied(self):
+        """Test fields the import does not set get their model defaults."""
+        self.run_import(self.jsonl(self.course(1)))
+
+        course = Course.objects.get(user=self.user)
+        self.assertEqual(course.image_status, '')
+        self.assertEqual(course.image_variants, {})
+        self.assertIsNone(course.link_checked_at)
+
+    def test_search_vector_maintained(self):
+        """Test imported courses are found by full-text search."""
+        self.run_import(self.jsonl(self.course(1, title='Quantum physics')))
+
+        self.assertTrue(
+            Course.objects.filter(search_vector='quantum').exists()
+        )
+
+    def test_resume_from_checkpoint(self):
+        """Test an interrupted import continues after its checkpoint."""
+        path = self.jsonl(self.course(1), self.course(2), self.course(3))
+        with open(f'{path}.checkpoint', 'w') as f:
+            json.dump({'records': 2, 'created': 2}, f)
+
+        out = self.run_import(path, '--batch-size', '1')
+
+        self.assertIn('Resuming after 2 records.', out)
+        self.assertIn('Imported 3 records: 3 created', out)
+        self.assertEqual(
+            list(Course.objects.values_list('title', flat=True)),
+            ['Course 3'],
+        )
+
+    def test_checkpoint_after_each_batch(self):
+        """Test progress is recorded once a batch is written."""
+        path = self.jsonl(self.course(1), self.course(2), {'title': 'x'})
+
+        with patch(
+            'course.importer.CourseImporter.write',
+            side_effect=[(1, 0), RuntimeError('interrupted')],
+        ):
+            with self.assertRaises(RuntimeError):
+                self.run_import(path, '--batch-size', '1')
+
+        with open(f'{path}.checkpoint') as f:
+            self.assertEqual(json.load(f)['records'], 1)
+
+    def test_tag_counts_maintained(self):
+        """Test imported tag links are counted, with and without COPY."""
+        path = self.jsonl(
+            self.course(1, tags=['Python', 'Django']),
+            self.course(2, tags=['Python']),
+        )
+        self.run_import(path)
+        self.run_import(self.jsonl(
+            self.course(1, tags=['Django']),
+        ), '--no-copy')
+
+        counts = dict(Tag.objects.values_list('name', 'course_count'))
+        self.assertEqual(counts, {'Python': 1, 'Django': 1})
+
+    def test_invalidates_cached_responses(self):
+        """Test the user's cached course responses are invalidated."""
+        generation = get_generation(self.user.id)
+
+        self.run_import(self.jsonl(self.course(1)))
+
+        self.assertNotEqual(get_generation(self.user.id), generation)
+
+    def test_unknown_user(self):
+        """Test importing for a missing user fails."""
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_courses', self.jsonl(), '--user', 'x@example.com',
+            )
@@ -0,0 +1,207 @@
+"""
+Tests for serving media files.
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.media import RangeFile, RangeNotSatisfiable, parse_range
+from core.models import StoredFile
+
+
+DIGEST = 'ab' * 32
+IMAGE_NAME = f'uploads/course/ab/{DIGEST}.jpg'
+CONTENT = bytes(range(256)) * 4
+
+
+def media_url(name):
+    return f'/static/media/{name}'
+
+
+class MediaServingTests(TestCase):
+    """Test serving uploaded files."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            MEDIA_ACCEL=None,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.write(IMAGE_NAME, CONTENT)
+        StoredFile.objects.create(name=IMAGE_NAME, references=1)
+
+    def write(self, name, content):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def get(self, name=IMAGE_NAME, **headers):
+        res = self.client.get(media_url(name), **headers)
+        if res.streaming:
+            res.body = b''.join(res.streaming_content)
+        else:
+            res.body = res.content
+        return res
+
+    def test_full_file(self):
+        """Test the whole file is served with caching headers."""
+        res = self.get()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.body, CONTENT)
+        self.assertEqual(res['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_byte_range(self):
+        """Test a byte range is served as partial content."""
+        res = self.get(HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.body, CONTENT[10:20])
+        self.assertEqual(res['Content-Length'], '10')
+        self.assertEqual(
+            res['Content-Range'],
+            f'bytes 10-19/{len(CONTENT)}',
+        )
+
+    def test_suffix_and_open_ranges(self):
+        """Test suffix and open-ended ranges."""
+        res = self.get(HTTP_RANGE='bytes=-100')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.body, CONTENT[-100:])
+
+        res = self.get(HTTP_RANGE='bytes=1000-')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.body, CONTENT[1000:])
+
+        res = self.get(HTTP_RANGE='bytes=1000-5000')
+        self.assertEqual(res.body, CONTENT[1000:])
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end of the file is refused."""
+        res = self.get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_multiple_ranges_ignored(self):
+        """Test requests for several ranges get the whole file."""
+        res = self.get(HTTP_RANGE='bytes=0-1,5-6')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.body, CONTENT)
+
+    def test_if_none_match(self):
+        """Test a matching ETag returns not modified."""
+        etag = self.get()['ETag']
+
+        res = self.get(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.body, b'')
+
+    def test_if_range(self):
+        """Test ranges only apply while If-Range matches."""
+        etag = self.get()['ETag']
+
+        res = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(res.status_code, 206)
+
+        res = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.body, CONTENT)
+
+    def test_mutable_name_revalidated(self):
+        """Test files not named by content are cached briefly."""
+        name = 'uploads/course/legacy.png'
+        self.write(name, b'legacy')
+        StoredFile.objects.create(name=name, references=1)
+
+        res = self.get(name)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('immutable', res['Cache-Control'])
+
+    def test_unreferenced_not_found(self):
+        """Test only files referenced by courses are served."""
+        self.write('uploads/course/orphan.jpg', b'orphan')
+        self.write('uploads/partial/upload', b'partial')
+        StoredFile.objects.create(name='uploads/partial/upload')
+
+        for name in (
+            'uploads/course/orphan.jpg',
+            'uploads/partial/upload',
+            'uploads/course/missing.jpg',
+            'uploads/course/../../etc/passwd',
+        ):
+            with self.subTest(name=name):
+                self.assertEqual(self.get(name).status_code, 404)
+
+    def test_only_safe_methods(self):
+        """Test files cannot be modified through the media URL."""
+        res = self.client.post(media_url(IMAGE_NAME))
+
+        self.assertEqual(res.status_code, 405)
+
+    @override_settings(MEDIA_ACCEL='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        """Test nginx is told to send the file."""
+        res = self.get()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.body, b'')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected-media/{IMAGE_NAME}',
+        )
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('ETag', res)
+
+    @override_settings(MEDIA_ACCEL='x-sendfile')
+    def test_x_sendfile(self):
+        """Test the front server is given the file path."""
+        res = self.get()
+
+        self.assertEqual(
+            res['X-Sendfile'],
+            os.path.join(self.media_root, IMAGE_NAME),
+        )
+
+
+class RangeTests(SimpleTestCase):
+    """Test byte range helpers."""
+
+    def test_parse_range(self):
+        """Test parsing Range headers against a file size."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        self.assertEqual(parse_range('bytes=50-', 100), (50, 99))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('items=0-9', 100))
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=9-5', 100)
+        with self.assertRaises(RangeNotSatisfiable):
+            parse_range('bytes=-0', 100)
+
+    def test_range_file(self):
+        """Test reading stops at the end of the window."""
+        with tempfile.TemporaryFile() as f:
+            f.write(CONTENT)
+            window = RangeFile(f, 100, 50)
+
+            self.assertEqual(window.fileno(), f.fileno())
+            self.assertEqual(window.tell(), 100)
+            self.assertEqual(window.read(30), CONTENT[100:130])
+            self.assertEqual(window.read(), CONTENT[130:150])
+            self.assertEqual(window.read(), b'')
@@ -1,9 +1,9 @@
 """
 Tests for models.
 """
-from unittest.mock import patch
 from decimal import Decimal
 
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -80,11 +80,109 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
-    @patch('core.models.uuid.uuid4')
-    def test_course_file_name_uuid(self, mock_uuid):
+    def test_tag_name_unique_per_user(self):
+        """Test a user cannot have two tags with the same name."""
+        user = create_user()
+        other_user = create_user(email='other@example.com')
+        models.Tag.objects.create(user=user, name='Tag1')
+        models.Tag.objects.create(user=other_user, name='Tag1')
+
+        with self.assertRaises(IntegrityError):
+            models.Tag.objects.create(user=user, name='Tag1')
+
+    def test_get_or_create_many_tags(self):
+        """Test resolving tag names reuses existing tags."""
+        user = create_user()
+        existing = models.Tag.objects.create(user=user, name='Python')
+
+        tags = models.Tag.objects.get_or_create_many(
+            user,
+            ['Django', 'Python', 'Django'],
+        )
+
+        self.assertEqual([tag.name for tag in tags], ['Django', 'Python'])
+        self.assertEqual(tags[1], existing)
+        self.assertIsNotNone(tags[0].id)
+        self.assertEqual(models.Tag.objects.filter(user=user).count(), 2)
+
+    def test_course_file_name(self):
         """Test generating image path."""
-        uuid = 'test-uuid'
-        mock_uuid.return_value = uuid
-        file_path = models.course_image_file_path(None, 'example.jpg')
+        file_path = models.course_image_file_path(None, 'example.JPG')
+
+        self.assertEqual(file_path, 'uploads/course/image.jpg')
+
+    def test_stored_file_references(self):
+        """Test counting references to stored files."""
+        models.StoredFile.objects.retain(['a.jpg', 'b.jpg', 'a.jpg'])
+        models.StoredFile.objects.retain(['b.jpg', ''])
+
+        counts = dict(
+            models.StoredFile.objects.values_list('name', 'references')
+        )
+        self.assertEqual(counts, {'a.jpg': 2, 'b.jpg': 2})
+
+        models.StoredFile.objects.release(['a.jpg', 'a.jpg', 'b.jpg'])
+
+        counts = dict(
+            models.StoredFile.objects.values_list('name', 'references')
+        )
+        self.assertEqual(counts, {'b.jpg': 1})
+
+    def test_tag_course_counts(self):
+        """Test tag course counts follow every change of course tags."""
+        user = create_user()
+        python = models.Tag.objects.create(user=user, name='Python')
+        django = models.Tag.objects.create(user=user, name='Django')
+        courses = [
+            models.Course.objects.create(
+                user=user,
+                title=f'Course {i}',
+                duration_hours=5,
+                price=Decimal('9.99'),
+            )
+            for i in range(3)
+        ]
+
+        def counts():
+            return dict(models.Tag.objects.values_list('name', 'course_count'))
+
+        courses[0].tags.add(python, django)
+        courses[0].tags.add(python)
+        python.course_set.add(courses[1], courses[2])
+        self.assertEqual(counts(), {'Python': 3, 'Django': 1})
+
+        courses[0].tags.remove(python, python)
+        self.assertEqual(counts(), {'Python': 2, 'Django': 1})
+
+        python.course_set.remove(courses[0], courses[1])
+        courses[0].tags.clear()
+        self.assertEqual(counts(), {'Python': 1, 'Django': 0})
+
+        django.course_set.add(*courses)
+        python.course_set.clear()
+        self.assertEqual(counts(), {'Python': 0, 'Django': 3})
+
+        courses[0].delete()
+        models.Course.objects.filter(id=courses[1].id).delete()
+        self.assertEqual(counts(), {'Python': 0, 'Django': 1})
+
+    def test_reconcile_tag_course_counts(self):
+        """Test reconciling recounts only the drifted tags."""
+        user = create_user()
+        tag = models.Tag.objects.create(user=user, name='Python')
+        other = models.Tag.objects.create(user=user, name='Django')
+        course = models.Course.objects.create(
+            user=user,
+            title='Course',
+            duration_hours=5,
+            price=Decimal('9.99'),
+        )
+        course.tags.add(tag, other)
+        models.Tag.objects.filter(id=tag.id).update(course_count=7)
+
+        drifted = models.Tag.objects.reconcile_course_counts()
 
-        self.assertEqual(file_path, f'uploads/course/{uuid}.jpg')
+        self.assertEqual(drifted, [tag.id])
+        tag.refresh_from_db()
+        self.assertEqual(tag.course_count, 1)
+        self.assertEqual(models.Tag.objects.reconcile_course_counts(), [])
@@ -0,0 +1,44 @@
+"""
+Tests for file storages.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from core.storage import ContentAddressedStorage
+
+
+class ContentAddressedStorageTests(SimpleTestCase):
+    """Test storing files by their content."""
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_named_by_content(self):
+        """Test files are named after the hash of their content."""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('uploads/image.JPG', ContentFile(b'content'))
+
+        self.assertEqual(name, f'uploads/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'content')
+
+    def test_identical_files_stored_once(self):
+        """Test saving identical content returns the existing file."""
+        first = self.storage.save('a/x.png', ContentFile(b'same'))
+        second = self.storage.save('a/y.png', ContentFile(b'same'))
+        other = self.storage.save('a/z.png', ContentFile(b'other'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(self.storage.path(first)))),
+            1,
+        )
@@ -0,0 +1,183 @@
+"""
+Response caching for course APIs.
+"""
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+_local_locks = {}
+_local_locks_guard = threading.Lock()
+
+
+def get_cache():
+    """Return the cache backing course API responses."""
+    return caches[settings.COURSE_CACHE_ALIAS]
+
+
+def _generation_key(user_id):
+    """Return the cache key holding a user's generation counter."""
+    return f'course-api:generation:{user_id}'
+
+
+def _modified_key(user_id):
+    """Return the cache key holding the time of a user's last change."""
+    return f'course-api:modified:{user_id}'
+
+
+def get_generation(user_id):
+    """Return the current cache generation for a user."""
+    cache = get_cache()
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock so an evicted counter never reuses an old
+        # generation whose entries may still be cached.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+
+    return generation
+
+
+def bump_generation(user_id):
+    """Invalidate every cached response of a user."""
+    cache = get_cache()
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+    cache.set(_modified_key(user_id), time.time(), timeout=None)
+
+
+def get_validators(user_id):
+    """
+    Return the generation of a user's responses and their last change.
+
+    The change time is in whole seconds, the precision of HTTP dates, and
+    None until that second has passed: a change later in the same second
+    would otherwise leave it as it is. It is also None when not known.
+    """
+    cache = get_cache()
+    values = cache.get_many([_generation_key(user_id), _modified_key(user_id)])
+    generation = values.get(_generation_key(user_id))
+    if generation is None:
+        generation = get_generation(user_id)
+
+    modified = values.get(_modified_key(user_id))
+    if modified is not None:
+        modified = int(modified)
+        if time.time() < modified + 1:
+            modified = None
+
+    return generation, modified
+
+
+def invalidate_user(user_id):
+    """Invalidate a user's responses now and once the transaction commits."""
+    bump_generation(user_id)
+    transaction.on_commit(lambda: bump_generation(user_id))
+
+
+def _local_lock(key):
+    """Return the in-process lock serializing work on a cache key."""
+    with _local_locks_guard:
+        lock = _local_locks.get(key)
+        if lock is None:
+            lock = _local_locks[key] = threading.Lock()
+
+        return lock
+
+
+def get_or_compute(key, compute, timeout=None):
+    """
+    Return the cached value for a key, computing it once on a miss.
+
+    Concurrent misses are coalesced: threads of one process wait on a
+    local lock, other processes wait on a short-lived lock entry in the
+    shared cache and poll for the value. Values of None are not cached.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_timeout = settings.COURSE_CACHE_LOCK_TIMEOUT
+    lock = _local_lock(key)
+    with lock:
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f'{key}:lock'
+        acquired = cache.add(lock_key, 1, timeout=lock_timeout)
+        if not acquired:
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key)
+                if value is not None:
+                    return value
+
+        try:
+            value = compute()
+            if value is not None:
+                cache.set(key, value, timeout=timeout)
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+            with _local_locks_guard:
+                if _local_locks.get(key) is lock:
+                    del _local_locks[key]
+
+        return value
+
+
+class CachedResponseMixin:
+    """Cache successful read responses per user and query string."""
+
+    def get_response_cache_key(self, request):
+        """Return the cache key for the response to a request."""
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        digest = hashlib.sha1(params.encode('utf-8')).hexdigest()
+        generation = get_generation(request.user.id)
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+
+        return ':'.join([
+            'course-api',
+            str(request.user.id),
+            str(generation),
+            self.basename,
+            self.action,
+            str(lookup),
+            digest,
+        ])
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """Serve a response from the cache, computing it on a miss."""
+        response = None
+
+        def compute():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            return response.data
+
+        data = get_or_compute(
+            self.get_response_cache_key(request),
+            compute,
+            timeout=settings.COURSE_CACHE_TIMEOUT,
+        )
+        if response is not None:
+            return response
+
+        return Response(data)
@@ -0,0 +1,73 @@
+"""
+Conditional GET support for course APIs.
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from rest_framework import status
+
+from course.cache import get_validators
+
+
+def user_validators(user):
+    """
+    Return a version and modification time of a user's courses and tags.
+
+    Both come from the cache generation, which every change of the user's
+    courses or tags bumps, deletions included, so no query is made.
+    """
+    return get_validators(user.id)
+
+
+class ConditionalResponseMixin:
+    """Answer conditional GET requests without building the response."""
+
+    def get_etag(self, request, version):
+        """Return a strong ETag for a resource version and representation."""
+        parts = [
+            str(version),
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', ''),
+        ]
+        digest = hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+        return f'"{digest}"'
+
+    def conditional_response(self, request, validators, respond,
+                             check_first=True):
+        """
+        Return 304 if the client copy is current, else call respond.
+
+        Validators cover every resource of a user, so they do not tell
+        whether a single resource exists. Detail views pass check_first
+        False to respond before answering 304, which keeps missing
+        resources 404 and costs a cache lookup.
+        """
+        version, last_modified = validators
+        etag = self.get_etag(request, version)
+
+        response = None
+        if not check_first:
+            response = respond()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        if not_modified is not None:
+            response = not_modified
+        elif response is None:
+            response = respond()
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
@@ -0,0 +1,105 @@
+"""
+Streaming export of course catalogs.
+"""
+import csv
+import io
+import itertools
+import zlib
+
+import orjson
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from course.representations import course_tags
+
+
+EXPORT_FIELDS = [
+    'id',
+    'title',
+    'description',
+    'duration_hours',
+    'price',
+    'link',
+    'updated_at',
+]
+
+
+def export_batches(queryset, chunk_size):
+    """
+    Yield the exported courses in batches of chunk_size rows.
+
+    Rows are read through a server-side cursor and the tags of each batch
+    are fetched with one query, so only one batch is held in memory.
+    """
+    rows = queryset.prefetch_related(None).values(
+        *EXPORT_FIELDS,
+    ).order_by('id').iterator(chunk_size=chunk_size)
+    while True:
+        batch = list(itertools.islice(rows, chunk_size))
+        if not batch:
+            return
+
+        tags = course_tags([row['id'] for row in batch])
+        for row in batch:
+            row['price'] = f'{row["price"]:f}'
+            row['updated_at'] = row['updated_at'].isoformat()
+            row['tags'] = tags.get(row['id'], [])
+        yield batch
+
+
+def ndjson_chunks(batches):
+    """Yield the courses as JSON objects, one per line."""
+    for batch in batches:
+        yield b''.join(orjson.dumps(row) + b'\n' for row in batch)
+
+
+def csv_chunks(batches):
+    """Yield the courses as CSV rows, the tag names as a JSON array."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS + ['tags'])
+    yield buffer.getvalue().encode('utf-8')
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in batch:
+            names = [tag['name'] for tag in row['tags']]
+            writer.writerow(
+                [row[field] for field in EXPORT_FIELDS] +
+                [orjson.dumps(names).decode('utf-8')]
+            )
+        yield buffer.getvalue().encode('utf-8')
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of chunks into one gzip member."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_chunks),
+    'csv': ('text/csv; charset=utf-8', csv_chunks),
+}
+
+
+def export_response(queryset, export_format, compression=None):
+    """Return a response streaming courses in one of EXPORT_FORMATS."""
+    content_type, encode = EXPORT_FORMATS[export_format]
+    chunks = encode(
+        export_batches(queryset, settings.COURSE_EXPORT_CHUNK_SIZE),
+    )
+    filename = f'courses.{export_format}'
+    if compression == 'gzip':
+        chunks = gzip_chunks(chunks)
+        content_type = 'application/gzip'
+        filename += '.gz'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
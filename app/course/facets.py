@@ -0,0 +1,88 @@
+"""
+Facet counts for course lists.
+"""
+from decimal import Decimal
+
+from django.db import connection
+
+
+FACETS_SQL = """
+WITH filtered AS ({filtered})
+SELECT
+    GROUPING(f.price_bucket) = 0,
+    GROUPING(f.duration_bucket) = 0,
+    GROUPING(ct.tag_id) = 0,
+    f.price_bucket,
+    f.duration_bucket,
+    ct.tag_id,
+    t.name,
+    COUNT(DISTINCT f.id)
+FROM (
+    SELECT
+        id,
+        FLOOR(price / %s) AS price_bucket,
+        FLOOR(duration_hours::numeric / %s) AS duration_bucket
+    FROM filtered
+) f
+LEFT JOIN core_course_tags ct ON ct.course_id = f.id
+LEFT JOIN core_tag t ON t.id = ct.tag_id
+GROUP BY GROUPING SETS (
+    (),
+    (f.price_bucket),
+    (f.duration_bucket),
+    (ct.tag_id, t.name)
+)
+"""
+
+
+def course_facets(queryset, price_width, duration_width):
+    """
+    Return histogram buckets and tag counts for a course queryset.
+
+    All facets are computed by a single grouping-sets aggregate over the
+    filtered courses, so the cost is one scan of the matching rows.
+    Durations are divided as numeric, since integer division would
+    truncate negative durations towards zero.
+    """
+    filtered = queryset.order_by().values('id', 'price', 'duration_hours')
+    sql, params = filtered.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            FACETS_SQL.format(filtered=sql),
+            [*params, price_width, duration_width],
+        )
+        rows = cursor.fetchall()
+
+    facets = {'count': 0, 'price': [], 'duration_hours': [], 'tags': []}
+    for is_price, is_duration, is_tag, price, duration, tag_id, name, count \
+            in rows:
+        if is_price:
+            low = Decimal(price) * price_width
+            facets['price'].append({
+                'min': f'{low:.2f}',
+                'max': f'{low + price_width:.2f}',
+                'count': count,
+            })
+        elif is_duration:
+            low = int(duration) * duration_width
+            facets['duration_hours'].append({
+                'min': low,
+                'max': low + duration_width,
+                'count': count,
+            })
+        elif is_tag:
+            if tag_id is not None:
+                facets['tags'].append({
+                    'id': tag_id,
+                    'name': name,
+                    'count': count,
+                })
+        else:
+            facets['count'] = count
+
+    facets['price'].sort(key=lambda bucket: Decimal(bucket['min']))
+    facets['duration_hours'].sort(key=lambda bucket: bucket['min'])
+    facets['tags'].sort(key=lambda tag: (-tag['count'], tag['name']))
+
+    return facets
@@ -0,0 +1,68 @@
+"""
+Sparse fieldsets and opt-in expansion of API representations.
+"""
+from django.utils.translation import gettext as _
+from drf_spectacular.utils import OpenApiParameter, OpenApiTypes
+from rest_framework.exceptions import ValidationError
+
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _names(value):
+    """Split a comma separated query parameter."""
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def _check(param, names, allowed):
+    """Refuse names that are not allowed for a query parameter."""
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValidationError({param: [
+            _('Unknown fields: %(fields)s.') % {'fields': ', '.join(unknown)}
+        ]})
+
+
+def select_fields(query_params, default, expandable=()):
+    """
+    Return the fields requested by a client, in representation order.
+
+    `expand` adds some of the expandable fields to the default ones,
+    `fields` names exactly the fields to return out of both.
+    """
+    available = list(default) + list(expandable)
+    expand = _names(query_params.get(EXPAND_PARAM, ''))
+    _check(EXPAND_PARAM, expand, expandable)
+
+    requested = query_params.get(FIELDS_PARAM)
+    if requested is None:
+        wanted = set(default) | set(expand)
+    else:
+        wanted = set(_names(requested))
+        _check(FIELDS_PARAM, wanted, available)
+        if not wanted:
+            raise ValidationError({FIELDS_PARAM: [_('Name some fields.')]})
+
+    return [field for field in available if field in wanted]
+
+
+def fieldset_parameters(default, expandable=()):
+    """Return the schema parameters of select_fields()."""
+    parameters = [
+        OpenApiParameter(
+            FIELDS_PARAM,
+            OpenApiTypes.STR,
+            description='Comma separated fields to return, out of: '
+                        f'{", ".join(list(default) + list(expandable))}.',
+        ),
+    ]
+    if expandable:
+        parameters.append(OpenApiParameter(
+            EXPAND_PARAM,
+            OpenApiTypes.STR,
+            description='Comma separated optional fields to add to the '
+                        f'default ones, out of: {", ".join(expandable)}.',
+        ))
+
+    return parameters
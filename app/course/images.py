@@ -0,0 +1,176 @@
+"""
+Background processing of course images.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from core.models import Course, StoredFile
+from course.cache import invalidate_user
+
+
+logger = logging.getLogger(__name__)
+
+# Bounding boxes of the generated variants, the aspect ratio is kept.
+VARIANT_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1600, 1600),
+}
+
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+# Formats keeping transparency, others are flattened onto white.
+ALPHA_FORMATS = {'WEBP', 'PNG'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the worker pool processing images, creating it lazily."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='course-image',
+            )
+
+        return _executor
+
+
+def schedule_variants(course):
+    """Generate the image variants of a course once the upload commits."""
+    job = (course.id, course.user_id, course.image.name)
+    transaction.on_commit(lambda: get_executor().submit(_work, *job))
+
+
+def _work(*job):
+    """Run a job on a worker thread, closing its database connection."""
+    try:
+        run_variants(*job)
+    finally:
+        connections.close_all()
+
+
+def run_variants(course_id, user_id, image_name):
+    """Generate the variants of an image, recording any failure."""
+    try:
+        generate_variants(course_id, image_name)
+    except Exception:
+        logger.exception('Processing image of course %s failed.', course_id)
+        Course.objects.filter(
+            id=course_id,
+            image=image_name,
+            image_status=Course.IMAGE_PENDING,
+        ).update(
+            image_status=Course.IMAGE_FAILED,
+            updated_at=timezone.now(),
+        )
+    finally:
+        invalidate_user(user_id)
+
+
+def render_variant(image, size, image_format, options):
+    """Return the encoded bytes and size of one variant of an image."""
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    if variant.mode == 'RGBA' and image_format not in ALPHA_FORMATS:
+        background = Image.new('RGB', variant.size, 'white')
+        background.paste(variant, mask=variant.getchannel('A'))
+        variant = background
+    buffer = io.BytesIO()
+    # No exif or icc data is passed on, so metadata is stripped.
+    variant.save(buffer, format=image_format, **options)
+
+    return buffer.getvalue(), variant.size
+
+
+def variant_name(image_name, variant, extension):
+    """Return the storage name of an image variant."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return os.path.join(
+        'uploads', 'course', 'variants', stem, f'{variant}.{extension}'
+    )
+
+
+def load_image(name):
+    """
+    Return a stored image decoded to RGB, or RGBA if it has transparency,
+    upright and without metadata.
+    """
+    with default_storage.open(name, 'rb') as image_file:
+        with Image.open(image_file) as original:
+            alpha = (
+                original.mode in ('RGBA', 'LA', 'PA')
+                or 'transparency' in original.info
+            )
+            # Apply the EXIF orientation before the metadata is dropped.
+            return ImageOps.exif_transpose(original).convert(
+                'RGBA' if alpha else 'RGB'
+            )
+
+
+def generate_variants(course_id, image_name):
+    """Resize a course image and record the variants on the course."""
+    pending = Course.objects.filter(
+        id=course_id,
+        image=image_name,
+        image_status=Course.IMAGE_PENDING,
+    )
+    if not pending.exists():
+        # The course was deleted, another image uploaded meanwhile or the
+        # job already ran, e.g. when rescheduled by process_pending_images.
+        return
+
+    # Images are stored by content, so variants of an image uploaded
+    # before are shared instead of rendered again.
+    image = None
+    variants = {}
+    for variant, size in VARIANT_SIZES.items():
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            name = variant_name(image_name, variant, extension)
+            try:
+                # Reusing the variant counts as a modification, so that
+                # gc_media spares it until this job has recorded it.
+                os.utime(default_storage.path(name))
+                with default_storage.open(name, 'rb') as f, \
+                        Image.open(f) as rendered:
+                    width, height = rendered.size
+            except FileNotFoundError:
+                if image is None:
+                    image = load_image(image_name)
+                data, (width, height) = render_variant(
+                    image, size, image_format, options,
+                )
+                name = default_storage.save(name, ContentFile(data))
+            variants.setdefault(variant, {
+                'width': width,
+                'height': height,
+            })[extension] = name
+
+    with transaction.atomic():
+        updated = pending.update(
+            image_status=Course.IMAGE_READY,
+            image_variants=variants,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            StoredFile.objects.retain(
+                name
+                for variant in variants.values()
+                for name in variant.values()
+                if isinstance(name, str)
+            )
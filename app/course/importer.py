@@ -0,0 +1,240 @@
+"""
+Bulk import of course catalogs.
+"""
+import csv
+import io
+import json
+
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from core.models import Course, Tag
+from course.cache import invalidate_user
+from course.serializers import CourseDetailSerializer, set_course_tags
+
+
+IMPORT_FORMATS = ['csv', 'jsonl', 'ndjson']
+IMPORT_FIELDS = ['title', 'description', 'duration_hours', 'price', 'link']
+
+
+def read_records(stream, import_format):
+    """
+    Yield the records of a text stream one at a time.
+
+    CSV files have a header row and their `tags` column holds a JSON
+    array of names, as written by the course export. Lines of JSON files
+    that cannot be decoded are yielded as None.
+    """
+    if import_format == 'csv':
+        for row in csv.DictReader(stream):
+            if row.get('tags'):
+                try:
+                    row['tags'] = json.loads(row['tags'])
+                except ValueError:
+                    pass
+            elif 'tags' in row:
+                row['tags'] = []
+            yield row
+        return
+
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+class CourseImporter:
+    """
+    Write validated courses of a user in batches.
+
+    Courses are matched to existing ones by link and updated, the others
+    are created. On PostgreSQL a batch is loaded with COPY into a
+    temporary table and merged with a few statements, elsewhere the ORM's
+    bulk operations are used.
+    """
+
+    def __init__(self, user, use_copy=None):
+        self.user = user
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql'
+        self.use_copy = use_copy
+        # Binding a serializer to each record copies its fields, which
+        # costs more than validating, so one unbound instance is reused.
+        self.serializer = CourseDetailSerializer()
+
+    def validate(self, record):
+        """Return the validated course of a record, or its errors."""
+        if not isinstance(record, dict):
+            return None, {'non_field_errors': ['Invalid record.']}
+
+        tags = record.get('tags')
+        if isinstance(tags, list):
+            record = dict(record, tags=[
+                {'name': tag} if isinstance(tag, str) else tag
+                for tag in tags
+            ])
+
+        try:
+            return self.serializer.run_validation(record), None
+        except ValidationError as exc:
+            return None, exc.detail
+
+    def write(self, rows):
+        """
+        Save a batch of validated rows, returning created and updated.
+
+        A link appears once per batch, the last row for it wins, so the
+        counts leave out rows repeating the link of a later one.
+        """
+        by_link = {}
+        for row in rows:
+            by_link[row.get('link') or object()] = row
+        rows = list(by_link.values())
+
+        names = [
+            tag['name'] for row in rows for tag in row.get('tags') or []
+        ]
+        with transaction.atomic():
+            tags = {
+                tag.name: tag.id
+                for tag in Tag.objects.get_or_create_many(self.user, names)
+            }
+            if self.use_copy:
+                ids, created = self._merge(rows)
+            else:
+                ids, created = self._bulk(rows)
+
+            wanted = {
+                course_id: {tags[tag['name']] for tag in row['tags']}
+                for row, course_id in zip(rows, ids)
+                if 'tags' in row
+            }
+            if wanted:
+                set_course_tags(wanted)
+            invalidate_user(self.user.id)
+
+        return created, len(rows) - created
+
+    def _merge(self, rows):
+        """Upsert rows through a COPY into a staging table."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for position, row in enumerate(rows):
+            writer.writerow(
+                [position] + [row.get(field, '') for field in IMPORT_FIELDS]
+            )
+        buffer.seek(0)
+
+        table = connection.ops.quote_name(Course._meta.db_table)
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE course_import ('
+                'position integer PRIMARY KEY, '
+                'course_id bigint, '
+                'created boolean NOT NULL DEFAULT false, '
+                'title varchar(255) NOT NULL, '
+                'description text NOT NULL, '
+                'duration_hours integer NOT NULL, '
+                'price numeric(6, 2) NOT NULL, '
+                'link varchar(255) NOT NULL'
+                ') ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY course_import (position, title, description, '
+                'duration_hours, price, link) FROM STDIN WITH ('
+                'FORMAT csv, FORCE_NOT_NULL (title, description, link))',
+                buffer,
+            )
+            cursor.execute(
+                f'UPDATE course_import AS s SET course_id = c.id '
+                f'FROM {table} AS c '
+                f"WHERE c.user_id = %s AND s.link <> '' AND c.link = s.link",
+                [self.user.id],
+            )
+            cursor.execute(
+                f'UPDATE {table} AS c SET title = s.title, '
+                f'description = s.description, '
+                f'duration_hours = s.duration_hours, price = s.price, '
+                f'updated_at = %s '
+                f'FROM course_import AS s WHERE c.id = s.course_id',
+                [now],
+            )
+            # Ids are drawn before inserting, so that every row knows
+            # the course it became.
+            cursor.execute(
+                f'UPDATE course_import SET created = true, course_id = '
+                f"nextval(pg_get_serial_sequence('{Course._meta.db_table}', "
+                f"'id')) WHERE course_id IS NULL"
+            )
+            columns, defaults = self._defaults()
+            cursor.execute(
+                f'INSERT INTO {table} (id, user_id, title, description, '
+                f'duration_hours, price, link, updated_at'
+                f'{"".join(", " + column for column in columns)}) '
+                f'SELECT course_id, %s, title, description, duration_hours, '
+                f'price, link, %s{", %s" * len(defaults)} '
+                f'FROM course_import WHERE created ORDER BY position',
+                [self.user.id, now, *defaults],
+            )
+            cursor.execute(
+                'SELECT course_id, created FROM course_import '
+                'ORDER BY position'
+            )
+            result = cursor.fetchall()
+            cursor.execute('DROP TABLE course_import')
+
+        return (
+            [course_id for course_id, _created in result],
+            sum(created for _course_id, created in result),
+        )
+
+    def _defaults(self):
+        """
+        Return the columns the import does not set and their defaults.
+
+        They are taken from the model, so that new fields are filled in
+        as the ORM would fill them.
+        """
+        written = {'id', 'user', 'updated_at', *IMPORT_FIELDS}
+        columns, defaults = [], []
+        for field in Course._meta.concrete_fields:
+            if field.name in written:
+                continue
+            columns.append(connection.ops.quote_name(field.column))
+            defaults.append(
+                field.get_db_prep_save(field.get_default(), connection)
+            )
+
+        return columns, defaults
+
+    def _bulk(self, rows):
+        """Upsert rows with bulk_create and bulk_update."""
+        links = [row['link'] for row in rows if row.get('link')]
+        existing = {}
+        for course in Course.objects.filter(user=self.user, link__in=links):
+            existing.setdefault(course.link, course)
+
+        now = timezone.now()
+        courses, creates, updates = [], [], []
+        for row in rows:
+            course = existing.get(row.get('link')) if row.get('link') \
+                else None
+            if course is None:
+                course = Course(user=self.user)
+                creates.append(course)
+            else:
+                updates.append(course)
+            for field in IMPORT_FIELDS:
+                setattr(course, field, row.get(field, ''))
+            course.updated_at = now
+            courses.append(course)
+
+        Course.objects.bulk_create(creates)
+        Course.objects.bulk_update(updates, IMPORT_FIELDS + ['updated_at'])
+
+        return [course.id for course in courses], len(creates)
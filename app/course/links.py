@@ -0,0 +1,160 @@
+"""
+Concurrent health checks of course links.
+"""
+import asyncio
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models import Course
+
+
+# Status recorded for links that could not be fetched at all.
+UNREACHABLE = 0
+# Statuses of HEAD requests retried with GET, as some servers refuse or
+# mishandle HEAD.
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 501}
+USER_AGENT = 'BeeClever-LinkChecker/1.0'
+
+LinkResult = namedtuple('LinkResult', ['status', 'final_url', 'etag'])
+
+
+class LinkChecker:
+    """
+    Check links concurrently over one reused HTTP session.
+
+    At most `concurrency` requests are in flight and at most `per_host` of
+    them to the same host. The event loop and session live as long as the
+    checker, so connections are reused between batches.
+    """
+
+    def __init__(self, concurrency=100, per_host=4, timeout=10):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.session = None
+        self.host_limits = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def check(self, links):
+        """Check (url, etag) pairs, returning a LinkResult for each."""
+        return self.loop.run_until_complete(self._check_all(links))
+
+    def close(self):
+        """Close the connections and the event loop."""
+        if self.session is not None:
+            self.loop.run_until_complete(self.session.close())
+        self.loop.close()
+
+    def _host_limit(self, url):
+        """Return the semaphore bounding requests to the host of a URL."""
+        host = urlsplit(url).netloc.lower()
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self.host_limits[host]
+
+    async def _check_all(self, links):
+        """Check links at the same time, within the limits."""
+        return await asyncio.gather(*[
+            self._check(url, etag) for url, etag in links
+        ])
+
+    async def _check(self, url, etag):
+        """Check a link with HEAD, falling back to GET."""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.concurrency,
+                    ttl_dns_cache=300,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT},
+            )
+
+        headers = {'If-None-Match': etag} if etag else {}
+        async with self._host_limit(url):
+            try:
+                result = await self._request('HEAD', url, headers)
+                if result.status in HEAD_FALLBACK_STATUSES:
+                    result = await self._request('GET', url, headers)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                return LinkResult(UNREACHABLE, '', '')
+
+        return result
+
+    async def _request(self, method, url, headers):
+        """Request a URL, following redirects, without reading the body."""
+        async with self.session.request(
+            method,
+            url,
+            headers=headers,
+            allow_redirects=True,
+        ) as response:
+            return LinkResult(
+                response.status,
+                str(response.url),
+                response.headers.get('ETag', ''),
+            )
+
+
+def links_to_check(checked_before):
+    """Return courses with web links not checked since a time, oldest first."""
+    return Course.objects.filter(
+        Q(link_checked_at__isnull=True) |
+        Q(link_checked_at__lt=checked_before),
+        link__regex=r'^https?://',
+    ).order_by(
+        F('link_checked_at').asc(nulls_first=True),
+        'id',
+    ).only('id', 'link', *Course.LINK_CHECK_FIELDS)
+
+
+def check_courses(checker, courses):
+    """
+    Check the links of courses and save the results in bulk.
+
+    Courses sharing a link and an ETag are checked with one request. A
+    304 answer to a conditional request keeps the previous results.
+    Courses whose link changed meanwhile are left for the next check.
+    Returns the number of requests made.
+    """
+    groups = {}
+    for course in courses:
+        groups.setdefault((course.link, course.link_etag), []).append(course)
+
+    results = checker.check(list(groups))
+    now = timezone.now()
+    for ((link, etag), group), result in zip(groups.items(), results):
+        for course in group:
+            course.link_checked_at = now
+            if result.status == 304:
+                continue
+            course.link_status = result.status
+            course.link_final_url = result.final_url \
+                if result.final_url != link else ''
+            course.link_etag = result.etag
+
+    # Links edited while they were checked were reset for a new check,
+    # which the results of the old link must not overwrite.
+    current = dict(Course.objects.filter(
+        id__in=[course.id for course in courses],
+    ).values_list('id', 'link'))
+    # bulk_update leaves updated_at alone: a checked link is no change
+    # of the course for caches and indexes.
+    Course.objects.bulk_update(
+        [
+            course for course in courses
+            if current.get(course.id) == course.link
+        ],
+        Course.LINK_CHECK_FIELDS,
+    )
+    return len(groups)
@@ -0,0 +1,261 @@
+"""
+Pagination for course APIs.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict, namedtuple
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+Cursor = namedtuple('Cursor', ['ordering', 'values', 'reverse'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a unique, composite sort key.
+
+    Every ordering is made unique by appending the primary key, so a page
+    boundary is described by the key values of the last row seen and the
+    next page is fetched with a range condition instead of an OFFSET.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering_fields = ('id',)
+    default_ordering = '-id'
+    invalid_cursor_message = _('Invalid cursor')
+    invalid_ordering_message = _('Invalid ordering')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of results for the request."""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.keys = self.get_keys(self.ordering)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = False
+        if self.cursor is not None:
+            reverse = self.cursor.reverse
+            try:
+                queryset = queryset.filter(
+                    self._keyset_filter(self.cursor.values, reverse)
+                )
+            except (TypeError, ValueError, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        keys = [self._invert(key) for key in self.keys] if reverse \
+            else self.keys
+        results = list(queryset.order_by(*keys)[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        """Return the page size requested by the client, within bounds."""
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size,
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering requested by the client."""
+        ordering = request.query_params.get(
+            self.ordering_query_param,
+            self.default_ordering,
+        )
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError(
+                {self.ordering_query_param: [self.invalid_ordering_message]}
+            )
+
+        return ordering
+
+    def get_keys(self, ordering):
+        """Return the unique sort key for an ordering."""
+        if ordering.lstrip('-') == 'id':
+            return [ordering]
+
+        tie_breaker = '-id' if ordering.startswith('-') else 'id'
+        return [ordering, tie_breaker]
+
+    def _invert(self, key):
+        """Flip the direction of a sort key."""
+        return key[1:] if key.startswith('-') else f'-{key}'
+
+    def _keyset_filter(self, values, reverse):
+        """Build the condition selecting rows after the cursor position."""
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            descending = key.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            equal = {
+                previous.lstrip('-'): values[position]
+                for position, previous in enumerate(self.keys[:index])
+            }
+            condition |= Q(
+                **equal,
+                **{f'{key.lstrip("-")}__{lookup}': values[index]},
+            )
+
+        return condition
+
+    def _get_position(self, item):
+        """Return the sort key values of a result row."""
+        fields = [key.lstrip('-') for key in self.keys]
+        if isinstance(item, Mapping):
+            return [item[field] for field in fields]
+
+        return [getattr(item, field) for field in fields]
+
+    def decode_cursor(self, request):
+        """Return the cursor from the request, or None for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            data = json.loads(
+                base64.urlsafe_b64decode(encoded + padding).decode('utf-8')
+            )
+            cursor = Cursor(
+                ordering=data['o'],
+                values=list(data['v']),
+                reverse=bool(data.get('r')),
+            )
+        except (TypeError, KeyError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+        if cursor.ordering != self.ordering or \
+                len(cursor.values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+
+        return cursor
+
+    def encode_cursor(self, cursor):
+        """Return an opaque URL for the given cursor."""
+        data = {'o': cursor.ordering, 'v': cursor.values}
+        if cursor.reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(
+                data,
+                cls=DjangoJSONEncoder,
+                separators=(',', ':'),
+            ).encode('utf-8')
+        ).decode('ascii').rstrip('=')
+
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def get_next_link(self):
+        """Return the URL of the next page."""
+        if not self.has_next or not self.page:
+            return None
+
+        values = self._get_position(self.page[-1])
+        return self.encode_cursor(Cursor(self.ordering, values, False))
+
+    def get_previous_link(self):
+        """Return the URL of the previous page."""
+        if not self.has_previous or not self.page:
+            return None
+
+        values = self._get_position(self.page[0])
+        return self.encode_cursor(Cursor(self.ordering, values, True))
+
+    def get_paginated_response(self, data):
+        """Wrap page data with links to the neighbouring pages."""
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        """Describe the paginated response for the API schema."""
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        """Describe the pagination query parameters for the API schema."""
+        orderings = []
+        for field in self.ordering_fields:
+            orderings += [field, f'-{field}']
+
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.ordering_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Field to sort results by.',
+                'schema': {'type': 'string', 'enum': orderings},
+            },
+        ]
+
+
+class CoursePagination(KeysetPagination):
+    """Cursor pagination for the course list."""
+    ordering_fields = ('id', 'price', 'duration_hours')
+
+    def get_ordering(self, request, queryset, view):
+        """Order search results by relevance unless asked otherwise."""
+        if 'rank' in queryset.query.annotations and \
+                self.ordering_query_param not in request.query_params:
+            return '-rank'
+
+        return super().get_ordering(request, queryset, view)
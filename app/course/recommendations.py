@@ -0,0 +1,266 @@
+"""
+Materialized course recommendations.
+
+Users are recommended courses of partner catalogs that carry the tag
+names of their own courses and fall in their usual price and duration
+ranges. Rankings are computed by the refresh_recommendations command for
+the users whose courses changed and stored in CourseRecommendation, so
+reading them is a lookup.
+
+A user's recommendations are stale when their courses or tags change, or
+the catalog courses carrying their tag names do: other catalog changes
+cannot alter them. Changes are found by counts and latest updated_at, set
+before changes commit, so users are refreshed again until a refresh read
+their data COURSE_RECOMMENDATIONS_LAG after their last change. Changes
+committing later than that are only picked up by the next change or an
+--all run.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from scipy import sparse
+
+from core.models import (
+    Course,
+    CourseRecommendation,
+    RecommendationState,
+    Tag,
+)
+
+
+# Weights of tag affinity and price and duration fit in scores.
+TAG_WEIGHT = 0.6
+PRICE_WEIGHT = 0.2
+DURATION_WEIGHT = 0.2
+
+# Links of catalog courses to tags named like each user's tags, by user.
+# Links are counted rather than courses, so that losing a tag shows.
+CATALOG_SIGNATURES_SQL = """
+SELECT
+    own.user_id,
+    COUNT(*),
+    MAX(course.updated_at),
+    MAX(tag.updated_at)
+FROM {tag} own
+JOIN {tag} tag ON LOWER(tag.name) = LOWER(own.name)
+JOIN {user} partner ON partner.id = tag.user_id AND partner.is_partner
+JOIN {link} link ON link.tag_id = tag.id
+JOIN {course} course ON course.id = link.course_id
+WHERE own.course_count > 0
+GROUP BY own.user_id
+"""
+
+
+def range_fit(values, own_values):
+    """
+    Score values by how well they fit the range of a user's own values.
+
+    Values within the 10th to 90th percentile score 1, and the score falls
+    linearly to 0 at a range width outside of it.
+    """
+    low, high = np.percentile(own_values, [10, 90])
+    width = max(high - low, 0.25 * high, 1)
+    distance = np.maximum(low - values, 0) + np.maximum(values - high, 0)
+    return np.clip(1 - distance / width, 0, 1)
+
+
+class Catalog:
+    """Courses of partners, held as arrays for vectorized scoring."""
+
+    def __init__(self):
+        courses = Course.objects.filter(user__is_partner=True)
+        rows = list(courses.order_by('id').values_list(
+            'id', 'user_id', 'price', 'duration_hours', 'link',
+        ))
+        positions = {row[0]: position for position, row in enumerate(rows)}
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.owners = np.array([row[1] for row in rows], dtype=np.int64)
+        self.prices = np.array([row[2] for row in rows], dtype=np.float64)
+        self.durations = np.array(
+            [row[3] for row in rows],
+            dtype=np.float64,
+        )
+        self.by_link = {}
+        for position, row in enumerate(rows):
+            if row[4]:
+                self.by_link.setdefault(row[4], []).append(position)
+
+        self.vocabulary = {}
+        course_positions, columns = [], []
+        links = Course.tags.through.objects.filter(
+            course__user__is_partner=True,
+        ).values_list('course_id', 'tag__name')
+        for course_id, name in links:
+            course_positions.append(positions[course_id])
+            columns.append(self.vocabulary.setdefault(
+                name.lower(),
+                len(self.vocabulary),
+            ))
+        # Rows are scaled by the number of tags of each course, so that
+        # multiplying by weights per tag averages them over the course.
+        tags = sparse.csr_matrix(
+            (np.ones(len(columns)), (course_positions, columns)),
+            shape=(len(rows), len(self.vocabulary)),
+        )
+        counts = np.asarray(tags.sum(axis=1)).ravel()
+        counts[counts == 0] = 1
+        self.tags = sparse.csr_matrix(sparse.diags(1 / counts) @ tags)
+
+    def rank(self, user_id, limit):
+        """Return the (course id, score) pairs to recommend to a user."""
+        own = list(Course.objects.filter(user_id=user_id).values_list(
+            'price', 'duration_hours', 'link',
+        ))
+        names = Course.tags.through.objects.filter(
+            course__user_id=user_id,
+        ).values_list('tag__name', flat=True)
+        affinity = np.zeros(len(self.vocabulary))
+        for name in names:
+            column = self.vocabulary.get(name.lower())
+            if column is not None:
+                affinity[column] += 1 / len(own)
+        if not affinity.any():
+            return []
+
+        scores = TAG_WEIGHT * (self.tags @ affinity)
+        scores += PRICE_WEIGHT * range_fit(
+            self.prices,
+            np.array([row[0] for row in own], dtype=np.float64),
+        )
+        scores += DURATION_WEIGHT * range_fit(
+            self.durations,
+            np.array([row[1] for row in own], dtype=np.float64),
+        )
+        # Only courses sharing tags qualify, other than the user's own and
+        # catalog copies of them.
+        eligible = (self.tags @ affinity > 0) & (self.owners != user_id)
+        for link in {row[2] for row in own if row[2]}:
+            eligible[self.by_link.get(link, [])] = False
+
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(
+                -scores[candidates], limit - 1,
+            )[:limit]]
+        candidates = candidates[
+            np.lexsort((self.ids[candidates], -scores[candidates]))
+        ]
+        return [
+            (int(self.ids[candidate]), float(scores[candidate]))
+            for candidate in candidates
+        ]
+
+
+def user_signatures():
+    """
+    Return a string per user that changes with their courses and tags and
+    the catalog courses sharing their tag names, and the latest change.
+    """
+    signatures = {}
+    courses = Course.objects.values('user_id').annotate(
+        count=Count('id'),
+        latest=Max('updated_at'),
+    ).order_by()
+    for row in courses:
+        signatures[row['user_id']] = [
+            f'{row["count"]}:{row["latest"]}',
+            [row['latest']],
+        ]
+
+    tags = Tag.objects.values('user_id').annotate(
+        latest=Max('updated_at'),
+    ).order_by()
+    for row in tags:
+        if row['user_id'] in signatures:
+            signatures[row['user_id']][0] += f':{row["latest"]}'
+            signatures[row['user_id']][1].append(row['latest'])
+
+    with connection.cursor() as cursor:
+        cursor.execute(CATALOG_SIGNATURES_SQL.format(
+            tag=connection.ops.quote_name(Tag._meta.db_table),
+            user=connection.ops.quote_name(get_user_model()._meta.db_table),
+            link=connection.ops.quote_name(
+                Course.tags.through._meta.db_table,
+            ),
+            course=connection.ops.quote_name(Course._meta.db_table),
+        ))
+        for user_id, count, courses_latest, tags_latest in cursor:
+            if user_id in signatures:
+                signatures[user_id][0] += \
+                    f'|{count}:{courses_latest}:{tags_latest}'
+                signatures[user_id][1] += [courses_latest, tags_latest]
+
+    return {
+        user_id: (signature, max(filter(None, changes), default=None))
+        for user_id, (signature, changes) in signatures.items()
+    }
+
+
+def stale_users(everyone=False):
+    """
+    Return the users whose recommendations are out of date and the
+    signatures to record for them.
+
+    Users are also stale until refreshed COURSE_RECOMMENDATIONS_LAG after
+    their last change, which may have committed after the refresh.
+    """
+    signatures = user_signatures()
+    states = {
+        state.user_id: state for state in RecommendationState.objects.all()
+    }
+    lag = timedelta(seconds=settings.COURSE_RECOMMENDATIONS_LAG)
+
+    def is_stale(user_id):
+        signature, latest = signatures.get(user_id, ('', None))
+        state = states.get(user_id)
+        if state is None or state.signature != signature:
+            return True
+        return latest is not None and state.refreshed_at < latest + lag
+
+    return {
+        user_id: signatures.get(user_id, ('', None))[0]
+        for user_id in set(signatures) | set(states)
+        if everyone or is_stale(user_id)
+    }
+
+
+def refresh_user(catalog, user_id, signature, read_at):
+    """
+    Store the current recommendations of a user.
+
+    read_at is a time before the user's data and the catalog were read.
+    """
+    ranked = catalog.rank(
+        user_id,
+        settings.COURSE_RECOMMENDATIONS_PER_USER,
+    ) if signature else []
+
+    with transaction.atomic():
+        # Catalog courses may have been deleted since the catalog was read.
+        existing = set(Course.objects.filter(
+            id__in=[course_id for course_id, _score in ranked],
+        ).values_list('id', flat=True))
+        ranked = [
+            (course_id, score) for course_id, score in ranked
+            if course_id in existing
+        ]
+        CourseRecommendation.objects.filter(user_id=user_id).delete()
+        CourseRecommendation.objects.bulk_create([
+            CourseRecommendation(
+                user_id=user_id,
+                course_id=course_id,
+                rank=rank,
+                score=score,
+            )
+            for rank, (course_id, score) in enumerate(ranked, 1)
+        ])
+        RecommendationState.objects.update_or_create(
+            user_id=user_id,
+            defaults={'signature': signature, 'refreshed_at': read_at},
+        )
+
+    return len(ranked)
@@ -0,0 +1,178 @@
+"""
+On-demand resizing of course images with a bounded disk cache.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from PIL import Image
+
+from course.images import VARIANT_FORMATS, load_image
+
+
+class ResizeCache:
+    """
+    Resized images stored under MEDIA_ROOT, evicted least recently used.
+
+    A file's modification time doubles as its last access time, so every
+    process sharing the directory agrees on the eviction order. Renders
+    of the same image are serialized within a process; files are written
+    under a temporary name and renamed, so readers in other processes
+    never see partial results.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    @property
+    def root(self):
+        return os.path.join(
+            settings.MEDIA_ROOT,
+            settings.IMAGE_RESIZE_CACHE_DIR,
+        )
+
+    @property
+    def max_size(self):
+        return settings.IMAGE_RESIZE_CACHE_SIZE
+
+    def path(self, image_name, width, extension):
+        """Return the cache file path of a resized image."""
+        digest = hashlib.sha1(
+            f'{image_name}:{width}'.encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.root, digest[:2], f'{digest}.{extension}')
+
+    def _lock(self, path):
+        """Return the in-process lock serializing renders of a file."""
+        with self._locks_guard:
+            lock = self._locks.get(path)
+            if lock is None:
+                lock = self._locks[path] = threading.Lock()
+
+            return lock
+
+    def get(self, image_name, width, extension):
+        """Return the path of a resized image, rendering it on a miss."""
+        path = self.path(image_name, width, extension)
+        if self._touch(path):
+            return path
+
+        lock = self._lock(path)
+        with lock:
+            try:
+                if self._touch(path):
+                    return path
+
+                size = self._render(image_name, width, extension, path)
+            finally:
+                with self._locks_guard:
+                    if self._locks.get(path) is lock:
+                        del self._locks[path]
+
+        self._add_size(size)
+        return path
+
+    def open(self, image_name, width, extension):
+        """Return the resized image opened for reading."""
+        try:
+            return open(self.get(image_name, width, extension), 'rb')
+        except FileNotFoundError:
+            # Evicted right after it was looked up, render it again.
+            return open(self.get(image_name, width, extension), 'rb')
+
+    def _touch(self, path):
+        """Mark a cached file as used, returning False if it is missing."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+
+        return True
+
+    def _render(self, image_name, width, extension, path):
+        """Write a resized image to the cache and return its size."""
+        image_format, options = VARIANT_FORMATS[extension]
+        image = load_image(image_name)
+
+        if width < image.width:
+            height = max(round(image.height * width / image.width), 1)
+            image = image.resize((width, height), Image.LANCZOS)
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                image.save(temp_file, format=image_format, **options)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        return os.path.getsize(path)
+
+    def _add_size(self, size):
+        """Account for a new file, evicting old ones when over the limit."""
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(entry[2] for entry in self._scan())
+            else:
+                self._size += size
+
+            if self._size > self.max_size:
+                self._evict()
+
+    def _scan(self):
+        """Yield the path, access time and size of every cached file."""
+        try:
+            directories = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+
+        for directory in directories:
+            if not directory.is_dir():
+                continue
+            with os.scandir(directory.path) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.tmp'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+    def _evict(self):
+        """Delete least recently used files until well under the limit."""
+        # Other processes add files too, so start from the real size.
+        files = sorted(self._scan(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in files)
+        target = self.max_size * 0.9
+        for path, _mtime, file_size in files:
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+        self._size = size
+
+    def clear(self):
+        """Delete every cached file."""
+        with self._size_lock:
+            for path, _mtime, _size in list(self._scan()):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self._size = None
+
+
+resize_cache = ResizeCache()
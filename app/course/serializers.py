@@ -1,47 +1,113 @@
 """
 Serializers for course APIs
 """
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import escape
+from django.utils.translation import gettext as _, gettext_lazy
+from PIL import Image
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from core.models import (
     Course,
+    ImageUpload,
+    StoredFile,
     Tag,
 )
+from course.cache import invalidate_user
+from course.export import EXPORT_FORMATS
+from course.images import VARIANT_FORMATS
+from course.representations import image_variant_urls
+from course.uploads import upload_offset
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer restricted to the fields named by a `fields` argument.
+
+    Fields listed in `Meta.expandable_fields` are left out unless named.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            expandable = getattr(self.Meta, 'expandable_fields', [])
+            fields = [name for name in self.fields if name not in expandable]
 
+        for name in set(self.fields) - set(fields):
+            self.fields.pop(name)
 
-class TagSerializer(serializers.ModelSerializer):
+
+class TagSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for tags."""
+    courses = serializers.PrimaryKeyRelatedField(
+        source='course_set',
+        many=True,
+        read_only=True,
+    )
 
     class Meta:
         model = Tag
+        fields = ['id', 'name', 'course_count', 'courses']
+        expandable_fields = ['courses']
+        read_only_fields = ['id', 'course_count']
+
+    def update(self, instance, validated_data):
+        """Update a tag, keeping names unique per user."""
+        name = validated_data.get('name', instance.name)
+        exists = Tag.objects.filter(
+            user=instance.user,
+            name=name,
+        ).exclude(id=instance.id).exists()
+        if exists:
+            msg = _('A tag with this name already exists.')
+            raise serializers.ValidationError({'name': [msg]})
+
+        return super().update(instance, validated_data)
+
+
+class CourseTagSerializer(TagSerializer):
+    """Serializer for the tags of a course."""
+
+    class Meta(TagSerializer.Meta):
         fields = ['id', 'name']
-        read_only_fields = ['id']
+        expandable_fields = []
 
 
 class CourseSerializer(serializers.ModelSerializer):
     """Serializer for courses."""
-    tags = TagSerializer(many=True, required=False)
+    tags = CourseTagSerializer(many=True, required=False)
 
     class Meta:
         model = Course
         fields = ['id', 'title', 'duration_hours', 'price', 'link', 'tags']
         read_only_fields = ['id']
 
-    def _get_or_create_tags(self, tags, course):
+    def _get_or_create_tags(self, tags):
         """Handle getting or creating tags as needed."""
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            course.tags.add(tag_obj)
+        return Tag.objects.get_or_create_many(
+            auth_user,
+            [tag['name'] for tag in tags],
+        )
 
     def create(self, validated_data):
         """Create a course."""
         tags = validated_data.pop('tags', [])
         course = Course.objects.create(**validated_data)
-        self._get_or_create_tags(tags, course)
+        tag_objs = self._get_or_create_tags(tags)
+        if tag_objs:
+            # The new course needs no touching for its tags, so the links
+            # are written in bulk rather than through tags.add().
+            set_course_tags({course.id: {tag.id for tag in tag_objs}})
+            invalidate_user(course.user_id)
 
         return course
 
@@ -49,9 +115,10 @@ class CourseSerializer(serializers.ModelSerializer):
         """Update a course."""
         tags = validated_data.pop('tags', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_tags(tags))
 
+        if 'link' in validated_data:
+            instance.set_link(validated_data.pop('link'))
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
 
@@ -59,18 +126,433 @@ class CourseSerializer(serializers.ModelSerializer):
         return instance
 
 
+# Delimiters of search matches in headlines. They are not HTML, so that
+# the course text can be escaped before they are replaced by <mark> tags.
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+class HighlightField(serializers.CharField):
+    """Headline of a search match as escaped HTML with <mark> tags."""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return escape(value).replace(
+            HIGHLIGHT_START, '<mark>',
+        ).replace(
+            HIGHLIGHT_STOP, '</mark>',
+        )
+
+
+class CourseSearchSerializer(DynamicFieldsMixin, CourseSerializer):
+    """Serializer for course full-text search results."""
+    rank = serializers.FloatField(read_only=True)
+    title_highlight = HighlightField()
+    description_highlight = HighlightField()
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + [
+            'rank',
+            'title_highlight',
+            'description_highlight',
+        ]
+
+
 class CourseDetailSerializer(CourseSerializer):
     """Serializer for course detail view."""
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + [
+            'description',
+            'image_status',
+            'image_variants',
+        ]
+        read_only_fields = CourseSerializer.Meta.read_only_fields + [
+            'image_status',
+        ]
+
+    @extend_schema_field(OpenApiTypes.OBJECT)
+    def get_image_variants(self, obj):
+        """Return the URLs of the resized course images."""
+        return image_variant_urls(
+            obj.image_variants,
+            self.context.get('request'),
+        )
+
+
+def set_course_tags(wanted):
+    """
+    Replace tags of courses, writing only the changed links.
+
+    Takes the wanted tag ids by course id.
+    """
+    CourseTag = Course.tags.through
+    stale = []
+    existing = set()
+    counts = Counter()
+    links = CourseTag.objects.filter(course_id__in=wanted).values_list(
+        'id', 'course_id', 'tag_id',
+    )
+    for link_id, course_id, tag_id in links:
+        if tag_id in wanted[course_id]:
+            existing.add((course_id, tag_id))
+        else:
+            stale.append(link_id)
+            counts[tag_id] -= 1
+
+    if stale:
+        CourseTag.objects.filter(id__in=stale).delete()
+    created = CourseTag.objects.bulk_create([
+        CourseTag(course_id=course_id, tag_id=tag_id)
+        for course_id, tag_ids in wanted.items()
+        for tag_id in tag_ids
+        if (course_id, tag_id) not in existing
+    ])
+    counts.update(link.tag_id for link in created)
+    # Bulk writes send no m2m_changed signals, so counts are kept here.
+    Tag.objects.adjust_course_counts(counts)
+
+
+class CourseBatchSerializer(serializers.Serializer):
+    """Serializer for creating, updating and deleting courses in bulk."""
+    max_items = 1000
+
+    def get_fields(self):
+        """Return the batch sections, named after the serializer methods."""
+        return {
+            'create': serializers.ListField(
+                child=serializers.DictField(),
+                required=False,
+                max_length=self.max_items,
+            ),
+            'update': serializers.ListField(
+                child=serializers.DictField(),
+                required=False,
+                max_length=self.max_items,
+            ),
+            'delete': serializers.ListField(
+                child=serializers.IntegerField(),
+                required=False,
+                max_length=self.max_items,
+            ),
+        }
+
+    def _validate_creates(self, items):
+        """Validate new courses, returning results and valid entries."""
+        results, valid = [], []
+        for item in items:
+            serializer = CourseDetailSerializer(
+                data=item,
+                context=self.context,
+            )
+            if serializer.is_valid():
+                result = {'status': 201}
+                valid.append((result, dict(serializer.validated_data)))
+            else:
+                result = {'status': 400, 'errors': serializer.errors}
+            results.append(result)
+
+        return results, valid
+
+    def _validate_updates(self, user, items):
+        """Validate course changes, returning results and valid entries."""
+        ids = [
+            item.get('id') for item in items
+            if isinstance(item.get('id'), int)
+        ]
+        courses = Course.objects.filter(user=user, id__in=ids).in_bulk()
+
+        results, valid = [], []
+        for item in items:
+            course = courses.get(item.get('id'))
+            if course is None:
+                result = {
+                    'id': item.get('id'),
+                    'status': 404,
+                    'errors': {'id': [_('Course not found.')]},
+                }
+                results.append(result)
+                continue
+
+            serializer = CourseDetailSerializer(
+                course,
+                data=item,
+                partial=True,
+                context=self.context,
+            )
+            if serializer.is_valid():
+                result = {'id': course.id, 'status': 200}
+                valid.append((course, dict(serializer.validated_data)))
+            else:
+                result = {
+                    'id': course.id,
+                    'status': 400,
+                    'errors': serializer.errors,
+                }
+            results.append(result)
+
+        return results, valid
+
+    def create(self, validated_data):
+        """Apply the batch, returning the outcome of every item."""
+        user = validated_data['user']
+        create_results, creates = self._validate_creates(
+            validated_data.get('create', []),
+        )
+        update_results, updates = self._validate_updates(
+            user,
+            validated_data.get('update', []),
+        )
+        delete_ids = list(dict.fromkeys(validated_data.get('delete', [])))
+
+        names = [
+            tag['name']
+            for _result, data in creates + updates
+            for tag in data.get('tags') or []
+        ]
+
+        with transaction.atomic():
+            tags = {
+                tag.name: tag.id
+                for tag in Tag.objects.get_or_create_many(user, names)
+            }
+
+            courses = Course.objects.bulk_create([
+                Course(user=user, **{
+                    attr: value for attr, value in data.items()
+                    if attr != 'tags'
+                })
+                for _result, data in creates
+            ])
+            wanted = {}
+            for (result, data), course in zip(creates, courses):
+                result['id'] = course.id
+                if data.get('tags'):
+                    wanted[course.id] = {
+                        tags[tag['name']] for tag in data['tags']
+                    }
+
+            fields = set()
+            for course, data in updates:
+                for attr, value in data.items():
+                    if attr == 'tags':
+                        wanted[course.id] = {
+                            tags[tag['name']] for tag in value
+                        }
+                    elif attr == 'link':
+                        if value != course.link:
+                            course.set_link(value)
+                            fields.update(Course.LINK_CHECK_FIELDS)
+                        fields.add(attr)
+                    else:
+                        setattr(course, attr, value)
+                        fields.add(attr)
+            if updates:
+                now = timezone.now()
+                for course, _data in updates:
+                    course.updated_at = now
+                Course.objects.bulk_update(
+                    [course for course, _data in updates],
+                    sorted(fields | {'updated_at'}),
+                    batch_size=self.max_items,
+                )
+
+            if wanted:
+                set_course_tags(wanted)
+
+            deleted = set(Course.objects.filter(
+                user=user,
+                id__in=delete_ids,
+            ).values_list('id', flat=True))
+            if deleted:
+                Course.objects.filter(id__in=deleted).delete()
+
+        delete_results = [
+            {'id': course_id, 'status': 204} if course_id in deleted
+            else {
+                'id': course_id,
+                'status': 404,
+                'errors': {'id': [_('Course not found.')]},
+            }
+            for course_id in delete_ids
+        ]
+
+        return {
+            'create': create_results,
+            'update': update_results,
+            'delete': delete_results,
+        }
+
+
+class CourseFilterSerializer(serializers.Serializer):
+    """Serializer for course list range filters."""
+    price_min = serializers.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        required=False,
+    )
+    price_max = serializers.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        required=False,
+    )
+    duration_min = serializers.IntegerField(required=False)
+    duration_max = serializers.IntegerField(required=False)
+
+
+class CourseFacetSerializer(serializers.Serializer):
+    """Serializer for course facet bucket sizes."""
+    price_bucket = serializers.DecimalField(
+        max_digits=6,
+        decimal_places=2,
+        min_value=Decimal('0.01'),
+        default=Decimal('50'),
+    )
+    duration_bucket = serializers.IntegerField(min_value=1, default=10)
+
+
+class CourseExportSerializer(serializers.Serializer):
+    """Serializer for the format of a course export."""
+    export_format = serializers.ChoiceField(
+        choices=list(EXPORT_FORMATS),
+        default='ndjson',
+    )
+    compression = serializers.ChoiceField(
+        choices=['gzip'],
+        required=False,
+    )
+
+
+class CourseSimilarSerializer(serializers.Serializer):
+    """Serializer for the number of similar courses to return."""
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class SimilarCourseSerializer(CourseSerializer):
+    """Serializer for a course similar to another one."""
+    similarity = serializers.FloatField(read_only=True)
 
     class Meta(CourseSerializer.Meta):
-        fields = CourseSerializer.Meta.fields + ['description']
+        fields = CourseSerializer.Meta.fields + ['similarity']
+
+
+class RecommendedCourseSerializer(CourseSerializer):
+    """Serializer for a catalog course recommended to a user."""
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(CourseSerializer.Meta):
+        fields = CourseSerializer.Meta.fields + ['score']
+
+
+class BoundedImageField(serializers.ImageField):
+    """Image field checking size, format and pixels before decoding."""
+    default_error_messages = {
+        'too_large': gettext_lazy('Image must not exceed {max_size} bytes.'),
+        'format': gettext_lazy('Image format must be one of {formats}.'),
+        'too_many_pixels': gettext_lazy(
+            'Image must not exceed {max_pixels} pixels.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if getattr(data, 'size', 0) > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail('too_large', max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
+
+        try:
+            # Opening only parses the header; nothing is decoded yet.
+            with Image.open(data) as image:
+                image_format = image.format
+                width, height = image.size
+        except Image.DecompressionBombError:
+            self.fail(
+                'too_many_pixels',
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+        except Exception:
+            self.fail('invalid_image')
+        finally:
+            if hasattr(data, 'seek'):
+                data.seek(0)
+
+        if image_format not in settings.IMAGE_UPLOAD_FORMATS:
+            self.fail(
+                'format',
+                formats=', '.join(settings.IMAGE_UPLOAD_FORMATS),
+            )
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.fail(
+                'too_many_pixels',
+                max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS,
+            )
+
+        return super().to_internal_value(data)
 
 
 class CourseImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to courses."""
+    image = BoundedImageField()
 
     class Meta:
         model = Course
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'image_status']
+        read_only_fields = ['id', 'image_status']
+
+    def update(self, instance, validated_data):
+        """Replace the image, moving references to the new file."""
+        stale_files = instance.stored_files()
+        validated_data.update(
+            image_status=Course.IMAGE_PENDING,
+            image_variants={},
+        )
+        with transaction.atomic():
+            course = super().update(instance, validated_data)
+            StoredFile.objects.retain(course.stored_files())
+            StoredFile.objects.release(stale_files)
+
+        return course
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """Serializer for resumable course image uploads."""
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'filename', 'size', 'offset']
         read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
+
+    def validate_size(self, value):
+        """Reject uploads larger than the image size limit up front."""
+        if not 0 < value <= settings.IMAGE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                _('Size must be between 1 and %(max_size)s bytes.') % {
+                    'max_size': settings.IMAGE_UPLOAD_MAX_SIZE,
+                }
+            )
+
+        return value
+
+    def get_offset(self, obj) -> int:
+        """Return the number of bytes received so far."""
+        return upload_offset(obj)
+
+
+class CourseImageResizeSerializer(serializers.Serializer):
+    """Serializer for the size and format of a resized course image."""
+    width = serializers.ChoiceField(choices=[])
+    image_format = serializers.ChoiceField(
+        choices=list(VARIANT_FORMATS),
+        default='webp',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['width'].choices = settings.IMAGE_RESIZE_WIDTHS
+
+    def validate_width(self, value):
+        """Return the width as an integer."""
+        return int(value)
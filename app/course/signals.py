@@ -0,0 +1,99 @@
+"""
+Signal handlers for the course app.
+"""
+from collections import Counter
+
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (
+    Course,
+    StoredFile,
+    Tag,
+)
+from course.cache import invalidate_user
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_cached_responses(sender, instance, **kwargs):
+    """Drop cached responses of the owner of a changed course or tag."""
+    invalidate_user(instance.user_id)
+
+
+@receiver(post_delete, sender=Course)
+def release_course_files(sender, instance, **kwargs):
+    """Drop the references of a deleted course to its image files."""
+    StoredFile.objects.release(instance.stored_files())
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def invalidate_cached_responses_on_tags(sender, instance, action, **kwargs):
+    """Drop cached responses when tags are added to or removed from courses."""
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def touch_courses_on_tags(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """Mark courses as modified when their tags change."""
+    if action not in ('post_add', 'post_remove', 'pre_clear') or \
+            (action != 'pre_clear' and not pk_set):
+        return
+
+    if reverse:
+        courses = Course.objects.filter(tags=instance) \
+            if action == 'pre_clear' else \
+            Course.objects.filter(id__in=pk_set)
+    else:
+        courses = Course.objects.filter(id=instance.id)
+    courses.update(updated_at=timezone.now())
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_courses_on_tag_delete(sender, instance, **kwargs):
+    """Mark courses as modified when one of their tags is deleted."""
+    Course.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def count_tag_courses(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep the course counts of tags in step with their links."""
+    if action in ('pre_remove', 'pre_clear'):
+        # Only links that exist are deleted, count them beforehand.
+        if reverse:
+            links = sender.objects.filter(tag_id=instance.id)
+        else:
+            links = sender.objects.filter(course_id=instance.id)
+        if action == 'pre_remove':
+            links = links.filter(**{
+                'course_id__in' if reverse else 'tag_id__in': pk_set,
+            })
+        instance._removed_tag_links = Counter(
+            links.values_list('tag_id', flat=True)
+        )
+        return
+
+    if action == 'post_add' and pk_set:
+        # Django only reports the links it added.
+        changes = Counter({instance.id: len(pk_set)}) if reverse \
+            else Counter(dict.fromkeys(pk_set, 1))
+    elif action in ('post_remove', 'post_clear'):
+        removed = getattr(instance, '_removed_tag_links', Counter())
+        instance._removed_tag_links = Counter()
+        changes = Counter({
+            tag_id: -count for tag_id, count in removed.items()
+        })
+    else:
+        return
+
+    Tag.objects.adjust_course_counts(changes)
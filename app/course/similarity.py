@@ -0,0 +1,334 @@
+"""
+Index of similar courses.
+
+The courses of a user are described by two sparse matrices: their tags,
+with a column per tag id, and the hashed words of their title and
+description. Courses are compared by a weighted sum of the Jaccard index
+of their tags and the cosine of their word vectors. The index of each
+user is kept in memory and in a file, and reads again only the courses
+changed since it was built.
+
+Changes are found by their updated_at, which is set before the change
+commits, so a change may become visible with a timestamp older than one
+already indexed. Updates therefore read again every course changed within
+COURSE_SIMILARITY_LAG of the last change seen, and an index only counts as
+current once it was read that long after that change. Transactions taking
+longer than the lag to commit can still be missed until the next change or
+a build_similarity_index run.
+"""
+import os
+import re
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from scipy import sparse
+
+from core.models import Course
+
+
+INDEX_VERSION = 2
+TEXT_FEATURES = 2 ** 18
+# Words of titles weigh more than those of descriptions.
+TITLE_WEIGHT = 2
+WORD_RE = re.compile(r'\w\w+')
+
+_indexes = OrderedDict()
+_indexes_guard = threading.Lock()
+_user_locks = {}
+
+
+def text_matrix(texts):
+    """
+    Return the normalized word vectors of (title, description) pairs.
+
+    Words are hashed to columns with CRC32, which unlike hash() is stable
+    across processes, and counted with sublinear weights.
+    """
+    data, indices, indptr = [], [], [0]
+    for title, description in texts:
+        counts = {}
+        for weight, text in ((TITLE_WEIGHT, title), (1, description)):
+            for word in WORD_RE.findall(text.lower()):
+                column = zlib.crc32(word.encode('utf-8')) % TEXT_FEATURES
+                counts[column] = counts.get(column, 0) + weight
+        indices.extend(counts)
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (1 + np.log(np.array(data, dtype=np.float32)), indices, indptr),
+        shape=(len(texts), TEXT_FEATURES),
+    )
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+
+def tag_matrix(tag_ids, columns=0):
+    """Return the tag incidence matrix of lists of tag ids."""
+    indices = [tag_id for ids in tag_ids for tag_id in ids]
+    indptr = np.cumsum([0] + [len(ids) for ids in tag_ids])
+    columns = max([columns] + [tag_id + 1 for tag_id in indices])
+
+    return sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.float32), indices, indptr),
+        shape=(len(tag_ids), columns),
+    )
+
+
+def course_state(user_id):
+    """Return the number of courses of a user and their last change."""
+    state = Course.objects.filter(user_id=user_id).aggregate(
+        count=Count('id'),
+        latest=Max('updated_at'),
+    )
+    return state['count'], state['latest']
+
+
+def lag():
+    """Return how long changes may take to commit after their timestamp."""
+    return timedelta(seconds=settings.COURSE_SIMILARITY_LAG)
+
+
+def read_courses(user_id, since=None):
+    """Return ids, text and tags of a user's courses changed since a time."""
+    courses = Course.objects.filter(user_id=user_id)
+    if since is not None:
+        courses = courses.filter(updated_at__gte=since)
+    rows = list(courses.order_by('id').values_list(
+        'id', 'title', 'description',
+    ))
+
+    links = Course.tags.through.objects.filter(course__user_id=user_id)
+    if since is not None:
+        links = links.filter(course__updated_at__gte=since)
+    tags = {}
+    for course_id, tag_id in links.values_list('course_id', 'tag_id'):
+        tags.setdefault(course_id, []).append(tag_id)
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    return (
+        ids,
+        text_matrix([row[1:] for row in rows]),
+        tag_matrix([tags.get(course_id, []) for course_id in ids]),
+    )
+
+
+class SimilarityIndex:
+    """
+    Tag and word vectors of the courses of a user, sorted by id.
+
+    `count` and `latest` are the course state the index reflects and
+    `read_at` the time its courses were last read.
+    """
+
+    def __init__(self, ids, text, tags, count, latest, read_at):
+        self.ids = ids
+        self.text = text
+        self.tags = tags
+        self.count = count
+        self.latest = latest
+        self.read_at = read_at
+        self.tag_sizes = np.asarray(tags.sum(axis=1)).ravel()
+
+    @classmethod
+    def build(cls, user_id):
+        """Build the index of every course of a user."""
+        read_at = timezone.now()
+        count, latest = course_state(user_id)
+        ids, text, tags = read_courses(user_id)
+        return cls(ids, text, tags, count, latest, read_at)
+
+    def is_current(self, state):
+        """
+        Return whether the index reflects the given course state.
+
+        Changes committed late with older timestamps leave the state as
+        it is, so the index is only current once read after the lag.
+        """
+        if (self.count, self.latest) != state:
+            return False
+
+        return self.latest is None or self.read_at >= self.latest + lag()
+
+    def updated(self, user_id, state):
+        """Return an index with the courses changed since this one."""
+        count, latest = state
+        if self.latest is None or latest is None:
+            return self.build(user_id)
+
+        read_at = timezone.now()
+        ids, text, tags = read_courses(user_id, since=self.latest - lag())
+        removed = ids
+        added = np.setdiff1d(ids, self.ids, assume_unique=True)
+        # Ids are never reused, so when the new courses account for the
+        # count nothing was deleted and the ids need not be read.
+        if count != self.count + len(added):
+            current = np.fromiter(
+                Course.objects.filter(user_id=user_id).values_list(
+                    'id', flat=True,
+                ).iterator(),
+                dtype=np.int64,
+            )
+            removed = np.union1d(
+                ids, np.setdiff1d(self.ids, current, assume_unique=True),
+            )
+
+        keep = ~np.isin(self.ids, removed)
+        columns = max(self.tags.shape[1], tags.shape[1])
+        old_tags = self.tags[keep]
+        old_tags.resize((old_tags.shape[0], columns))
+        tags.resize((tags.shape[0], columns))
+
+        all_ids = np.concatenate([self.ids[keep], ids])
+        order = np.argsort(all_ids, kind='stable')
+        return SimilarityIndex(
+            all_ids[order],
+            sparse.vstack([self.text[keep], text], format='csr')[order],
+            sparse.vstack([old_tags, tags], format='csr')[order],
+            count,
+            latest,
+            read_at,
+        )
+
+    def similar(self, course_id, limit):
+        """Return up to limit (id, score) pairs of the closest courses."""
+        position = np.searchsorted(self.ids, course_id)
+        if position == len(self.ids) or self.ids[position] != course_id:
+            return []
+
+        shared = (self.tags @ self.tags[position].T).toarray().ravel()
+        union = self.tag_sizes + self.tag_sizes[position] - shared
+        jaccard = np.divide(
+            shared, union, out=np.zeros_like(shared), where=union > 0,
+        )
+        cosine = (self.text @ self.text[position].T).toarray().ravel()
+        weight = settings.COURSE_SIMILARITY_TAG_WEIGHT
+        scores = weight * jaccard + (1 - weight) * cosine
+        scores[position] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(
+                -scores[candidates], limit - 1,
+            )[:limit]]
+        candidates = candidates[
+            np.lexsort((self.ids[candidates], -scores[candidates]))
+        ]
+        return [
+            (int(self.ids[candidate]), float(scores[candidate]))
+            for candidate in candidates
+        ]
+
+    def save(self, path):
+        """Write the index to a file, replacing it at once."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=INDEX_VERSION,
+                ids=self.ids,
+                count=self.count,
+                latest=self.latest.isoformat() if self.latest else '',
+                read_at=self.read_at.isoformat(),
+                text_data=self.text.data,
+                text_indices=self.text.indices,
+                text_indptr=self.text.indptr,
+                tags_indices=self.tags.indices,
+                tags_indptr=self.tags.indptr,
+                tags_columns=self.tags.shape[1],
+            )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read an index from a file, or return None if it is unusable."""
+        try:
+            with np.load(path) as f:
+                if int(f['version']) != INDEX_VERSION:
+                    return None
+                ids = f['ids']
+                text = sparse.csr_matrix(
+                    (f['text_data'], f['text_indices'], f['text_indptr']),
+                    shape=(len(ids), TEXT_FEATURES),
+                )
+                tags = sparse.csr_matrix(
+                    (
+                        np.ones(len(f['tags_indices']), dtype=np.float32),
+                        f['tags_indices'],
+                        f['tags_indptr'],
+                    ),
+                    shape=(len(ids), int(f['tags_columns'])),
+                )
+                latest = str(f['latest'])
+                return cls(
+                    ids,
+                    text,
+                    tags,
+                    int(f['count']),
+                    datetime.fromisoformat(latest) if latest else None,
+                    datetime.fromisoformat(str(f['read_at'])),
+                )
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+
+def index_path(user_id):
+    """Return the file persisting the index of a user."""
+    return os.path.join(settings.COURSE_SIMILARITY_DIR, f'{user_id}.npz')
+
+
+def _user_lock(user_id):
+    """Return the in-process lock serializing index builds of a user."""
+    with _indexes_guard:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+
+def get_index(user_id, rebuild=False):
+    """
+    Return the current index of a user's courses.
+
+    The index is taken from memory or its file and brought up to date
+    with the courses changed since, or built when there is none. Updates
+    re-reading the lag window without a change of state are only written
+    once the index is current, rather than on every request meanwhile.
+    """
+    with _user_lock(user_id):
+        state = course_state(user_id)
+        with _indexes_guard:
+            index = _indexes.get(user_id)
+        if index is None and not rebuild:
+            index = SimilarityIndex.load(index_path(user_id))
+
+        if index is None or rebuild:
+            index = SimilarityIndex.build(user_id)
+            index.save(index_path(user_id))
+        elif not index.is_current(state):
+            changed = (index.count, index.latest) != state
+            index = index.updated(user_id, state)
+            if changed or index.is_current(state):
+                index.save(index_path(user_id))
+
+        with _indexes_guard:
+            _indexes[user_id] = index
+            _indexes.move_to_end(user_id)
+            while len(_indexes) > settings.COURSE_SIMILARITY_CACHED_INDEXES:
+                evicted, _index = _indexes.popitem(last=False)
+                lock = _user_locks.get(evicted)
+                if lock is not None and not lock.locked():
+                    del _user_locks[evicted]
+
+        return index
+
+
+def similar_courses(user_id, course_id, limit):
+    """Return the (id, score) pairs of the courses closest to a course."""
+    return get_index(user_id).similar(course_id, limit)
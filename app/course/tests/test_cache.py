@@ -0,0 +1,244 @@
+"""
+Tests for course API response caching.
+"""
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+from course.cache import (
+    bump_generation,
+    get_generation,
+    get_or_compute,
+)
+
+
+COURSES_URL = reverse('course:course-list')
+TAGS_URL = reverse('course:tag-list')
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'course-cache-tests',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    },
+    'redis': {
+        'BACKEND': 'core.cache.RedisCache',
+        'LOCATION': 'redis://localhost:6379/0',
+        'OPTIONS': {'CLIENT_CLASS': 'fakeredis.FakeRedis'},
+    },
+}
+
+
+def create_course(user, **params):
+    """Create and return a sample course."""
+    defaults = {
+        'title': 'Sample Course title',
+        'duration_hours': 20,
+        'price': Decimal('22.80'),
+    }
+    defaults.update(params)
+    return Course.objects.create(user=user, **defaults)
+
+
+class GetOrComputeTests(SimpleTestCase):
+    """Test computing cached values."""
+
+    def test_concurrent_misses_compute_once(self):
+        """Test concurrent misses on every backend compute the value once."""
+        for name, config in CACHE_BACKENDS.items():
+            with self.subTest(backend=name), \
+                    override_settings(CACHES={'default': config}):
+                caches['default'].clear()
+                calls = []
+
+                def compute():
+                    calls.append(1)
+                    time.sleep(0.2)
+                    return 'value'
+
+                results = []
+                threads = [
+                    threading.Thread(
+                        target=lambda: results.append(
+                            get_or_compute('key', compute, timeout=60)
+                        ),
+                    )
+                    for _ in range(8)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                self.assertEqual(len(calls), 1)
+                self.assertEqual(results, ['value'] * 8)
+
+    def test_waits_for_other_process(self):
+        """Test a miss waits while another process holds the lock."""
+        cache = caches['default']
+        cache.clear()
+        cache.add('key:lock', 1)
+
+        def release():
+            time.sleep(0.2)
+            cache.set('key', 'from other process')
+
+        thread = threading.Thread(target=release)
+        thread.start()
+        value = get_or_compute('key', lambda: 'computed here')
+        thread.join()
+
+        self.assertEqual(value, 'from other process')
+
+    def test_none_not_cached(self):
+        """Test None results are recomputed."""
+        caches['default'].clear()
+        calls = []
+
+        def compute():
+            calls.append(1)
+
+        get_or_compute('key', compute)
+        get_or_compute('key', compute)
+
+        self.assertEqual(len(calls), 2)
+
+    def test_bump_generation(self):
+        """Test bumping a generation changes it, even after eviction."""
+        caches['default'].clear()
+        first = get_generation(1)
+        bump_generation(1)
+        second = get_generation(1)
+        caches['default'].clear()
+        bump_generation(1)
+
+        self.assertNotEqual(first, second)
+        self.assertNotIn(get_generation(1), (first, second))
+
+
+class CachedCourseAPITests(TestCase):
+    """Test caching of course API responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _get(self, url, params=None):
+        """Request a URL and return the response and number of queries."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+
+        return res, len(ctx.captured_queries)
+
+    def test_list_served_from_cache(self):
+        """Test a repeated list request does not query the database."""
+        create_course(user=self.user)
+
+        first, _ = self._get(COURSES_URL)
+        second, queries = self._get(COURSES_URL)
+
+        self.assertEqual(queries, 0)
+        self.assertEqual(first.data, second.data)
+
+    def test_cache_keyed_by_query_params(self):
+        """Test different query strings are cached separately."""
+        create_course(user=self.user, price=Decimal('5'))
+        create_course(user=self.user, price=Decimal('50'))
+
+        self.client.get(COURSES_URL)
+        res, queries = self._get(COURSES_URL, {'price_min': '10'})
+
+        self.assertGreater(queries, 0)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_invalidated_on_change(self):
+        """Test saving a course invalidates cached responses."""
+        course = create_course(user=self.user, title='Before')
+        self.client.get(COURSES_URL)
+
+        course.title = 'After'
+        course.save()
+        res, _ = self._get(COURSES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'After')
+
+    def test_cache_invalidated_on_tag_change(self):
+        """Test adding tags to a course invalidates cached responses."""
+        course = create_course(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Python')
+        url = reverse('course:course-detail', args=[course.id])
+        self.client.get(url)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        course.tags.add(tag)
+        detail = self.client.get(url)
+        tags = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(
+            detail.data['tags'],
+            [{'id': tag.id, 'name': 'Python'}],
+        )
+        self.assertEqual(len(tags.data), 1)
+
+    def test_cache_invalidated_by_bulk_endpoint(self):
+        """Test bulk changes invalidate cached responses."""
+        self.client.get(COURSES_URL)
+
+        payload = {
+            'create': [
+                {'title': 'Bulk', 'duration_hours': 1, 'price': '1.00'},
+            ],
+        }
+        self.client.post(
+            reverse('course:course-bulk'),
+            payload,
+            format='json',
+        )
+        res, _ = self._get(COURSES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_limited_to_user(self):
+        """Test cached responses are not shared between users."""
+        create_course(user=self.user)
+        self.client.get(COURSES_URL)
+
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(other_user)
+        res, _ = self._get(COURSES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_errors_not_cached(self):
+        """Test error responses are not cached."""
+        url = reverse('course:course-detail', args=[0])
+        self.client.get(url)
+
+        res, queries = self._get(url)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertGreater(queries, 0)
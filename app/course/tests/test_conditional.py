@@ -0,0 +1,206 @@
+"""
+Tests for conditional GET on course APIs.
+"""
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+
+
+COURSES_URL = reverse('course:course-list')
+TAGS_URL = reverse('course:tag-list')
+
+
+def detail_url(course_id):
+    """Create and return a course detail URL."""
+    return reverse('course:course-detail', args=[course_id])
+
+
+def later(seconds=2):
+    """Return a patch moving the clock forward by some seconds."""
+    return patch('course.cache.time.time', return_value=time.time() + seconds)
+
+
+def create_course(user, **params):
+    """Create and return a sample course."""
+    defaults = {
+        'title': 'Sample Course title',
+        'duration_hours': 20,
+        'price': Decimal('22.80'),
+    }
+    defaults.update(params)
+    return Course.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    """Test ETag and Last-Modified handling."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_validators(self):
+        """Test the course list sends a strong ETag and Last-Modified."""
+        create_course(user=self.user)
+
+        with later():
+            res = self.client.get(COURSES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertRegex(res['ETag'], r'^"[0-9a-f]+"$')
+        self.assertIn('Last-Modified', res)
+
+    def test_no_last_modified_within_change_second(self):
+        """Test Last-Modified is held back while changes may still share it."""
+        create_course(user=self.user)
+
+        with patch('course.cache.time.time', return_value=time.time()):
+            res = self.client.get(COURSES_URL)
+
+        self.assertIn('ETag', res)
+        self.assertNotIn('Last-Modified', res)
+
+    def test_list_not_modified(self):
+        """Test a matching ETag returns 304 without loading courses."""
+        create_course(user=self.user)
+        etag = self.client.get(COURSES_URL)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(COURSES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_if_modified_since(self):
+        """Test an up to date If-Modified-Since returns 304."""
+        create_course(user=self.user)
+        with later():
+            last_modified = self.client.get(COURSES_URL)['Last-Modified']
+
+            res = self.client.get(
+                COURSES_URL,
+                HTTP_IF_MODIFIED_SINCE=last_modified,
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since_after_delete(self):
+        """Test deleting a course or tag moves Last-Modified forward."""
+        course = create_course(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Python')
+        with later():
+            last_modified = self.client.get(TAGS_URL)['Last-Modified']
+
+        for offset, instance in ((4, course), (8, tag)):
+            with later(offset):
+                instance.delete()
+            with later(offset + 2):
+                res = self.client.get(
+                    TAGS_URL,
+                    HTTP_IF_MODIFIED_SINCE=last_modified,
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            last_modified = res['Last-Modified']
+
+    def test_list_etag_changes(self):
+        """Test the ETag changes when courses change."""
+        course = create_course(user=self.user)
+        first = self.client.get(COURSES_URL)['ETag']
+
+        course.title = 'New title'
+        course.save()
+        res = self.client.get(COURSES_URL, HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        second = res['ETag']
+
+        course.delete()
+        res = self.client.get(COURSES_URL, HTTP_IF_NONE_MATCH=second)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn(res['ETag'], (first, second))
+
+    def test_list_etag_depends_on_query(self):
+        """Test different query strings have different ETags."""
+        create_course(user=self.user)
+
+        etag = self.client.get(COURSES_URL)['ETag']
+        res = self.client.get(
+            COURSES_URL,
+            {'ordering': 'price'},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test a matching ETag on a course returns 304."""
+        course = create_course(user=self.user)
+        etag = self.client.get(detail_url(course.id))['ETag']
+
+        res = self.client.get(detail_url(course.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_with_tags(self):
+        """Test the course ETag changes when its tags change."""
+        course = create_course(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Python')
+        url = detail_url(course.id)
+
+        etag = self.client.get(url)['ETag']
+        course.tags.add(tag)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        etag = res['ETag']
+        tag.name = 'Django'
+        tag.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tags'][0]['name'], 'Django')
+
+    def test_detail_other_users_course_not_found(self):
+        """Test conditional requests do not reveal other users' courses."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        course = create_course(user=other_user)
+
+        res = self.client.get(detail_url(course.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_detail_malformed_id_not_found(self):
+        """Test a non-numeric course id returns 404."""
+        res = self.client.get(
+            reverse('course:course-detail', args=['abc']),
+            HTTP_IF_NONE_MATCH='*',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_not_modified(self):
+        """Test a matching ETag on the tag list returns 304."""
+        Tag.objects.create(user=self.user, name='Python')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
@@ -8,7 +8,9 @@ import os
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -33,6 +35,10 @@ def detail_url(course_id):
     return reverse('course:course-detail', args=[course_id])
 
 
+BULK_URL = reverse('course:course-bulk')
+FACETS_URL = reverse('course:course-facets')
+
+
 def image_upload_url(course_id):
     """Create and return a course detail URL."""
     return reverse('course:course-upload-image', args=[course_id])
@@ -92,7 +98,7 @@ class PrivateCourseAPITest(TestCase):
         courses = Course.objects.all().order_by('-id')
         serializer = CourseSerializer(courses, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_course_list_limited_to_user(self):
         """Test list of courses is limited to authenticated user."""
@@ -108,7 +114,7 @@ class PrivateCourseAPITest(TestCase):
         courses = Course.objects.filter(user=self.user)
         serializer = CourseSerializer(courses, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_course_detail(self):
         """Test get course details."""
@@ -258,6 +264,21 @@ class PrivateCourseAPITest(TestCase):
             ).exists()
             self.assertTrue(exists)
 
+    def test_create_course_with_duplicate_tags(self):
+        """Test repeated tag names in a payload create one tag."""
+        payload = {
+            'title': 'Python Generation',
+            'duration_hours': 15,
+            'price': Decimal('0'),
+            'tags': [{'name': 'Python'}, {'name': 'Python'}],
+        }
+        res = self.client.post(COURSES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        course = Course.objects.get(id=res.data['id'])
+        self.assertEqual(course.tags.count(), 1)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_on_update(self):
         """Test creating a tag on update of a course."""
         course = create_course(user=self.user)
@@ -314,9 +335,699 @@ class PrivateCourseAPITest(TestCase):
         s1 = CourseSerializer(c1)
         s2 = CourseSerializer(c2)
         s3 = CourseSerializer(c3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_list_paginated_by_cursor(self):
+        """Test walking the course list page by page."""
+        courses = [
+            create_course(user=self.user, title=f'Course {i}')
+            for i in range(5)
+        ]
+
+        res = self.client.get(COURSES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+        seen = [course['id'] for course in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen += [course['id'] for course in res.data['results']]
+
+        expected = [course.id for course in reversed(courses)]
+        self.assertEqual(seen, expected)
+
+    def test_list_previous_page(self):
+        """Test the previous link returns the preceding page."""
+        for i in range(5):
+            create_course(user=self.user, title=f'Course {i}')
+
+        first = self.client.get(COURSES_URL, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        res = self.client.get(second.data['previous'])
+
+        self.assertEqual(res.data['results'], first.data['results'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_list_ordering_composite_key(self):
+        """Test paging by price keeps ties in a stable order."""
+        prices = ['5.00', '1.00', '5.00', '3.00', '5.00']
+        for price in prices:
+            create_course(user=self.user, price=Decimal(price))
+
+        res = self.client.get(
+            COURSES_URL,
+            {'ordering': '-price', 'page_size': 2},
+        )
+        seen = [course['id'] for course in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen += [course['id'] for course in res.data['results']]
+
+        expected = Course.objects.filter(user=self.user) \
+            .order_by('-price', '-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_list_invalid_ordering_error(self):
+        """Test ordering by an unsupported field returns error."""
+        res = self.client.get(COURSES_URL, {'ordering': 'description'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_invalid_cursor_error(self):
+        """Test a tampered cursor returns error."""
+        res = self.client.get(COURSES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CourseQueryCountTests(TestCase):
+    """Test the number of queries made by the course API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _create_tagged_courses(self, count, tags_per_course=3):
+        """Create courses that each have several tags."""
+        courses = []
+        for i in range(count):
+            course = create_course(user=self.user, title=f'Course {i}')
+            for j in range(tags_per_course):
+                tag = Tag.objects.create(
+                    user=self.user,
+                    name=f'Tag {course.id}-{j}',
+                )
+                course.tags.add(tag)
+            courses.append(course)
+
+        return courses
+
+    def _count_queries(self, method, *args, **kwargs):
+        """Call the API and return the response and number of queries."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method)(*args, **kwargs)
+
+        return res, len(ctx.captured_queries)
+
+    def test_list_queries_constant(self):
+        """Test listing courses does not query tags per course."""
+        self._create_tagged_courses(1)
+        res, small = self._count_queries('get', COURSES_URL)
+        self.assertEqual(len(res.data['results']), 1)
+
+        self._create_tagged_courses(10)
+        res, large = self._count_queries('get', COURSES_URL)
+        self.assertEqual(len(res.data['results']), 11)
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 2)
+
+    def test_retrieve_queries_bounded(self):
+        """Test retrieving a course loads tags in one query."""
+        course = self._create_tagged_courses(1, tags_per_course=10)[0]
+
+        res, queries = self._count_queries('get', detail_url(course.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertLessEqual(queries, 2)
+
+    def test_create_queries_bounded(self):
+        """Test creating a course makes a fixed number of queries."""
+        payload = {
+            'title': 'Sample Course',
+            'duration_hours': 20,
+            'price': Decimal('10.00'),
+        }
+
+        res, queries = self._count_queries(
+            'post', COURSES_URL, payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertLessEqual(queries, 2)
+
+    def test_create_with_tags_queries_constant(self):
+        """Test creating a course does not query per tag."""
+        Tag.objects.create(user=self.user, name='Existing')
+
+        def payload(tag_count):
+            return {
+                'title': 'Sample Course',
+                'duration_hours': 20,
+                'price': Decimal('10.00'),
+                'tags': [{'name': 'Existing'}] + [
+                    {'name': f'Tag {tag_count}-{i}'}
+                    for i in range(tag_count)
+                ],
+            }
+
+        res, small = self._count_queries(
+            'post', COURSES_URL, payload(1), format='json',
+        )
+        self.assertEqual(len(res.data['tags']), 2)
+        res, large = self._count_queries(
+            'post', COURSES_URL, payload(20), format='json',
+        )
+        self.assertEqual(len(res.data['tags']), 21)
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 8)
+
+    def test_update_queries_bounded(self):
+        """Test updating a course makes a fixed number of queries."""
+        course = self._create_tagged_courses(1, tags_per_course=10)[0]
+        payload = {'title': 'New Course Title'}
+
+        res, queries = self._count_queries(
+            'patch', detail_url(course.id), payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 10)
+        self.assertLessEqual(queries, 4)
+
+    def test_update_same_tags_no_through_writes(self):
+        """Test resending the same tags does not rewrite the through table."""
+        course = self._create_tagged_courses(1)[0]
+        payload = {
+            'tags': [{'name': tag.name} for tag in course.tags.all()],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(course.id), payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'] for query in ctx.captured_queries
+            if 'core_course_tags' in query['sql']
+            and query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(writes, [])
+
+    def test_update_changed_tags_bulk_writes(self):
+        """Test changing tags issues one delete and one insert."""
+        course = self._create_tagged_courses(1)[0]
+        kept = course.tags.first()
+        payload = {
+            'tags': [
+                {'name': kept.name},
+                {'name': 'New 1'},
+                {'name': 'New 2'},
+            ],
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(course.id), payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [
+            query['sql'].split()[0] for query in ctx.captured_queries
+            if 'core_course_tags' in query['sql']
+            and query['sql'].startswith(('INSERT', 'DELETE'))
+        ]
+        self.assertEqual(sorted(writes), ['DELETE', 'INSERT'])
+        names = set(course.tags.values_list('name', flat=True))
+        self.assertEqual(names, {kept.name, 'New 1', 'New 2'})
+
+
+class BulkCourseAPITests(TestCase):
+    """Test the bulk course API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def _course_payload(self, i, **params):
+        """Return a payload for a new course."""
+        payload = {
+            'title': f'Course {i}',
+            'duration_hours': 10 + i,
+            'price': '9.99',
+            'tags': [{'name': 'Bulk'}, {'name': f'Tag {i}'}],
+        }
+        payload.update(params)
+        return payload
+
+    def test_bulk_create(self):
+        """Test creating courses with tags in bulk."""
+        payload = {'create': [self._course_payload(i) for i in range(3)]}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['create']), 3)
+        for i, result in enumerate(res.data['create']):
+            self.assertEqual(result['status'], 201)
+            course = Course.objects.get(id=result['id'])
+            self.assertEqual(course.user, self.user)
+            self.assertEqual(course.title, f'Course {i}')
+            names = set(course.tags.values_list('name', flat=True))
+            self.assertEqual(names, {'Bulk', f'Tag {i}'})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 4)
+
+    def test_bulk_reports_errors_per_item(self):
+        """Test invalid items are reported without failing the batch."""
+        payload = {
+            'create': [
+                self._course_payload(1),
+                self._course_payload(2, price='not a price'),
+            ],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        valid, invalid = res.data['create']
+        self.assertEqual(valid['status'], 201)
+        self.assertEqual(invalid['status'], 400)
+        self.assertIn('price', invalid['errors'])
+        self.assertEqual(Course.objects.filter(user=self.user).count(), 1)
+
+    def test_bulk_update(self):
+        """Test updating courses and their tags in bulk."""
+        tag = Tag.objects.create(user=self.user, name='Old')
+        c1 = create_course(user=self.user, title='First')
+        c2 = create_course(user=self.user, title='Second')
+        c1.tags.add(tag)
+        c2.tags.add(tag)
+        payload = {
+            'update': [
+                {'id': c1.id, 'title': 'First updated'},
+                {'id': c2.id, 'tags': [{'name': 'New'}]},
+            ],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in res.data['update']],
+            [200, 200],
+        )
+        c1.refresh_from_db()
+        c2.refresh_from_db()
+        self.assertEqual(c1.title, 'First updated')
+        self.assertEqual(list(c1.tags.all()), [tag])
+        self.assertEqual(c2.title, 'Second')
+        self.assertEqual(
+            list(c2.tags.values_list('name', flat=True)),
+            ['New'],
+        )
+
+    def test_bulk_delete(self):
+        """Test deleting courses in bulk."""
+        course = create_course(user=self.user)
+        other_user = create_user(email='other@example.com', password='pass123')
+        other_course = create_course(user=other_user)
+        payload = {'delete': [course.id, other_course.id]}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in res.data['delete']],
+            [204, 404],
+        )
+        self.assertFalse(Course.objects.filter(id=course.id).exists())
+        self.assertTrue(Course.objects.filter(id=other_course.id).exists())
+
+    def test_bulk_update_other_users_course_error(self):
+        """Test updating another user's course in bulk returns error."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        course = create_course(user=other_user, title='Original')
+        payload = {'update': [{'id': course.id, 'title': 'Changed'}]}
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.data['update'][0]['status'], 404)
+        course.refresh_from_db()
+        self.assertEqual(course.title, 'Original')
+
+    def test_bulk_queries_constant(self):
+        """Test the number of queries does not grow with the batch."""
+        def run(count):
+            courses = [create_course(user=self.user) for _ in range(count)]
+            payload = {
+                'create': [self._course_payload(i) for i in range(count)],
+                'update': [
+                    {'id': course.id, 'title': 'Changed', 'tags': []}
+                    for course in courses
+                ],
+                'delete': [course.id for course in courses],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.post(BULK_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(run(2), run(20))
+
+
+class CourseSearchAPITests(TestCase):
+    """Test full-text search over courses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_search_matches_title_and_description(self):
+        """Test searching finds courses by title or description."""
+        c1 = create_course(user=self.user, title='Learning Python')
+        c2 = create_course(
+            user=self.user,
+            title='Backend basics',
+            description='Web services written in Python.',
+        )
+        create_course(user=self.user, title='Ruby', description='Gems.')
+
+        res = self.client.get(COURSES_URL, {'search': 'python'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [course['id'] for course in res.data['results']]
+        self.assertEqual(ids, [c1.id, c2.id])
+
+    def test_search_highlights_matches(self):
+        """Test search results include ranks and highlighted snippets."""
+        create_course(
+            user=self.user,
+            title='Data analysis',
+            description='Analyse tables with pandas and numpy.',
+        )
+
+        res = self.client.get(COURSES_URL, {'search': 'pandas'})
+
+        result = res.data['results'][0]
+        self.assertGreater(result['rank'], 0)
+        self.assertIn('<mark>pandas</mark>', result['description_highlight'])
+        self.assertEqual(result['title_highlight'], 'Data analysis')
+
+    def test_search_highlights_escaped(self):
+        """Test course text in highlights is escaped as HTML."""
+        create_course(
+            user=self.user,
+            title='<script>alert(1)</script> pandas',
+            description='Tables & <b>pandas</b>.',
+        )
+
+        res = self.client.get(COURSES_URL, {'search': 'pandas'})
+
+        result = res.data['results'][0]
+        self.assertEqual(
+            result['title_highlight'],
+            '&lt;script&gt;alert(1)&lt;/script&gt; <mark>pandas</mark>',
+        )
+        self.assertIn('&amp;', result['description_highlight'])
+        self.assertNotIn('<b>', result['description_highlight'])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the authenticated user's courses."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        create_course(user=other_user, title='Python for others')
+
+        res = self.client.get(COURSES_URL, {'search': 'python'})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_vector_follows_updates(self):
+        """Test the search index is refreshed when a course changes."""
+        course = create_course(user=self.user, title='Old title')
+        course.title = 'Kotlin for Android'
+        course.save()
+
+        res = self.client.get(COURSES_URL, {'search': 'kotlin'})
+
+        ids = [course['id'] for course in res.data['results']]
+        self.assertEqual(ids, [course.id])
+
+    def test_search_paginated_by_rank(self):
+        """Test paging through search results ordered by rank."""
+        for i in range(5):
+            create_course(
+                user=self.user,
+                title='Python ' * (i % 2 + 1),
+                description=f'Course {i}',
+            )
+
+        params = {'search': 'python', 'page_size': 2}
+        res = self.client.get(COURSES_URL, params)
+        results = res.data['results']
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            results += res.data['results']
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(len({course['id'] for course in results}), 5)
+        ranks = [course['rank'] for course in results]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+
+class CourseRangeFilterAPITests(TestCase):
+    """Test range filters and facets on courses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_filter_by_price_range(self):
+        """Test filtering courses by price range."""
+        create_course(user=self.user, price=Decimal('5.00'))
+        c2 = create_course(user=self.user, price=Decimal('15.00'))
+        c3 = create_course(user=self.user, price=Decimal('20.00'))
+        create_course(user=self.user, price=Decimal('25.50'))
+
+        params = {'price_min': '10', 'price_max': '20'}
+        res = self.client.get(COURSES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [course['id'] for course in res.data['results']]
+        self.assertEqual(ids, [c3.id, c2.id])
+
+    def test_filter_by_duration_range(self):
+        """Test filtering courses by duration range."""
+        create_course(user=self.user, duration_hours=5)
+        c2 = create_course(user=self.user, duration_hours=40)
+
+        res = self.client.get(COURSES_URL, {'duration_min': 10})
+
+        ids = [course['id'] for course in res.data['results']]
+        self.assertEqual(ids, [c2.id])
+
+    def test_filter_invalid_range_error(self):
+        """Test an invalid range value returns error."""
+        res = self.client.get(COURSES_URL, {'price_min': 'cheap'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_ignored_on_detail(self):
+        """Test filter parameters do not affect single course requests."""
+        course = create_course(user=self.user, price=Decimal('5.00'))
+        url = detail_url(course.id)
+        query = '?price_min=cheap&tags_match=bogus&tags=0&search=none'
+
+        res = self.client.patch(url + query, {'title': 'New title'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.delete(url + query)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_facets(self):
+        """Test facets count courses per bucket and per tag."""
+        python = Tag.objects.create(user=self.user, name='Python')
+        web = Tag.objects.create(user=self.user, name='Web')
+        c1 = create_course(
+            user=self.user,
+            price=Decimal('10.00'),
+            duration_hours=5,
+        )
+        c2 = create_course(
+            user=self.user,
+            price=Decimal('40.00'),
+            duration_hours=12,
+        )
+        create_course(user=self.user, price=Decimal('60.00'), duration_hours=8)
+        c1.tags.add(python, web)
+        c2.tags.add(python)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        self.assertEqual(res.data['price'], [
+            {'min': '0.00', 'max': '50.00', 'count': 2},
+            {'min': '50.00', 'max': '100.00', 'count': 1},
+        ])
+        self.assertEqual(res.data['duration_hours'], [
+            {'min': 0, 'max': 10, 'count': 2},
+            {'min': 10, 'max': 20, 'count': 1},
+        ])
+        self.assertEqual(res.data['tags'], [
+            {'id': python.id, 'name': 'Python', 'count': 2},
+            {'id': web.id, 'name': 'Web', 'count': 1},
+        ])
+
+    def test_facets_negative_durations(self):
+        """Test negative durations fall in buckets below zero."""
+        create_course(user=self.user, duration_hours=-3)
+        create_course(user=self.user, duration_hours=-10)
+        create_course(user=self.user, duration_hours=3)
+
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['duration_hours'], [
+            {'min': -10, 'max': 0, 'count': 2},
+            {'min': 0, 'max': 10, 'count': 1},
+        ])
+
+    def test_facets_follow_filters(self):
+        """Test facets only count courses matching the filters."""
+        create_course(user=self.user, price=Decimal('10.00'))
+        create_course(user=self.user, price=Decimal('30.00'))
+        other_user = create_user(email='other@example.com', password='pass123')
+        create_course(user=other_user, price=Decimal('30.00'))
+
+        params = {'price_min': '20', 'price_bucket': '10'}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(FACETS_URL, params)
+
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['price'], [
+            {'min': '30.00', 'max': '40.00', 'count': 1},
+        ])
+
+
+class TagFilterQueryPlanTests(TestCase):
+    """Test the query plans used to filter courses by tags."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(
+            email='user@example.com',
+            password='testpass123'
+        )
+        other_user = create_user(
+            email='other@example.com',
+            password='testpass123'
+        )
+        cls.tags = [
+            Tag.objects.create(user=cls.user, name=f'Tag {i}')
+            for i in range(20)
+        ]
+        courses = Course.objects.bulk_create([
+            Course(
+                user=cls.user if i % 4 else other_user,
+                title=f'Course {i}',
+                description='Long description. ' * 50,
+                duration_hours=i % 100,
+                price=Decimal(i % 500),
+            )
+            for i in range(5000)
+        ])
+        CourseTag = Course.tags.through
+        CourseTag.objects.bulk_create([
+            CourseTag(course_id=course.id, tag_id=cls.tags[(i + j) % 20].id)
+            for i, course in enumerate(courses)
+            for j in range(3)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_course, core_course_tags')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _list_query_plan(self, params):
+        """Request the course list and return its SQL and query plan."""
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(COURSES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        sql = ctx.captured_queries[0]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        return res, sql, plan
+
+    def test_filter_any_tags_semi_join(self):
+        """Test filtering by any tag uses a semi-join without DISTINCT."""
+        tag_ids = f'{self.tags[0].id},{self.tags[1].id}'
+
+        res, sql, plan = self._list_query_plan({'tags': tag_ids})
+
+        self.assertNotIn('DISTINCT', sql)
+        self.assertIn('EXISTS', sql)
+        self.assertIn('Semi Join', plan)
+        self.assertNotIn('Unique', plan)
+
+    def test_filter_all_tags_semi_join(self):
+        """Test filtering by all tags uses semi-joins without DISTINCT."""
+        tag_ids = f'{self.tags[0].id},{self.tags[1].id}'
+
+        res, sql, plan = self._list_query_plan(
+            {'tags': tag_ids, 'tags_match': 'all'},
+        )
+
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('Unique', plan)
+        self.assertIn('core_course_tags_tag_id_course_id_idx', plan)
+
+    def test_search_uses_gin_index(self):
+        """Test full-text search is served by the GIN index."""
+        course = Course.objects.filter(user=self.user).first()
+        course.title = 'Quantum computing'
+        course.save()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_course')
+
+        res, sql, plan = self._list_query_plan({'search': 'quantum'})
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIn('core_course_search__db39c5_gin', plan)
+
+    def test_filter_all_tags(self):
+        """Test filtering by all tags returns courses having every tag."""
+        tag_ids = [self.tags[0].id, self.tags[1].id]
+
+        res = self.client.get(
+            COURSES_URL,
+            {
+                'tags': ','.join(map(str, tag_ids)),
+                'tags_match': 'all',
+                'page_size': 100,
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['results'])
+        for course in res.data['results']:
+            ids = {tag['id'] for tag in course['tags']}
+            self.assertTrue(set(tag_ids) <= ids)
 
 
 class ImageUploadTests(TestCase):
@@ -344,8 +1055,9 @@ class ImageUploadTests(TestCase):
             res = self.client.post(url, payload, format='multipart')
 
         self.course.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], 'pending')
         self.assertTrue(os.path.exists(self.course.image.path))
 
     def test_upload_image_bad_request(self):
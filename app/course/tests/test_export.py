@@ -0,0 +1,136 @@
+"""
+Tests for the course export.
+"""
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+from course.export import export_batches
+
+
+EXPORT_URL = reverse('course:course-export')
+
+
+def create_course(user, **params):
+    """Create and return a sample course."""
+    defaults = {
+        'title': 'Sample Course title',
+        'duration_hours': 20,
+        'price': Decimal('22.80'),
+    }
+    defaults.update(params)
+    return Course.objects.create(user=user, **defaults)
+
+
+class CourseExportTests(TestCase):
+    """Test streaming course exports."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Python, 3')
+        self.courses = [
+            create_course(self.user, title=f'Course {index}')
+            for index in range(5)
+        ]
+        self.courses[1].tags.add(self.tag)
+
+    def export(self, **params):
+        """Request an export and return the response and its body."""
+        res = self.client.get(EXPORT_URL, params)
+        body = b''.join(res.streaming_content) if res.streaming else b''
+        return res, body
+
+    def test_ndjson(self):
+        """Test courses are exported as JSON lines in id order."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_course(other)
+
+        res, body = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [course.id for course in self.courses],
+        )
+        self.assertEqual(rows[0]['price'], '22.80')
+        self.assertEqual(rows[0]['tags'], [])
+        self.assertEqual(
+            rows[1]['tags'],
+            [{'id': self.tag.id, 'name': 'Python, 3'}],
+        )
+
+    def test_csv(self):
+        """Test courses are exported as CSV with a header."""
+        res, body = self.export(export_format='csv')
+
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('courses.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1]['title'], 'Course 1')
+        self.assertEqual(json.loads(rows[1]['tags']), ['Python, 3'])
+
+    def test_gzip(self):
+        """Test exports can be compressed."""
+        _res, plain = self.export(export_format='csv')
+
+        res, body = self.export(export_format='csv', compression='gzip')
+
+        self.assertEqual(res['Content-Type'], 'application/gzip')
+        self.assertIn('courses.csv.gz', res['Content-Disposition'])
+        self.assertEqual(gzip.decompress(body), plain)
+
+    def test_filters_apply(self):
+        """Test the course list filters narrow the export."""
+        res, body = self.export(tags=str(self.tag.id))
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [self.courses[1].id])
+
+    def test_empty_csv_has_header(self):
+        """Test an empty export still has the CSV header."""
+        Course.objects.all().delete()
+
+        _res, body = self.export(export_format='csv')
+
+        self.assertTrue(body.startswith(b'id,title,'))
+        self.assertEqual(len(body.splitlines()), 1)
+
+    def test_invalid_format(self):
+        """Test unknown formats are refused."""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batches(self):
+        """Test rows are read in batches with one tag query per batch."""
+        queryset = Course.objects.filter(user=self.user)
+
+        with self.assertNumQueries(4):
+            batches = list(export_batches(queryset, 2))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
@@ -0,0 +1,170 @@
+"""
+Tests for sparse fieldsets and expansion.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+
+
+COURSES_URL = reverse('course:course-list')
+TAGS_URL = reverse('course:tag-list')
+TAG_COLUMN = '"core_tag"."name"'
+
+
+def detail_url(course_id):
+    """Create and return a course detail URL."""
+    return reverse('course:course-detail', args=[course_id])
+
+
+def create_course(user, **params):
+    """Create and return a sample course."""
+    defaults = {
+        'title': 'Sample Course title',
+        'description': 'Sample description',
+        'duration_hours': 20,
+        'price': Decimal('22.80'),
+    }
+    defaults.update(params)
+    return Course.objects.create(user=user, **defaults)
+
+
+class FieldsetTests(TestCase):
+    """Test narrowing and expanding representations."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Python')
+        self.course = create_course(self.user, title='Python basics')
+        self.course.tags.add(self.tag)
+
+    def get(self, url, **params):
+        """Request a URL, returning the response and the SQL run."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        return res, [query['sql'] for query in queries.captured_queries]
+
+    def test_course_fields(self):
+        """Test only the requested course fields are read and returned."""
+        res, queries = self.get(COURSES_URL, fields='id,title')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.course.id, 'title': 'Python basics'}],
+        )
+        course_queries = [
+            sql for sql in queries if '"core_course"."title"' in sql
+        ]
+        self.assertEqual(len(course_queries), 1)
+        self.assertNotIn('"price"', course_queries[0])
+        self.assertFalse(any(TAG_COLUMN in sql for sql in queries))
+
+    def test_fields_in_representation_order(self):
+        """Test fields are returned in the usual order."""
+        res, _queries = self.get(COURSES_URL, fields='tags,price,id')
+
+        self.assertEqual(
+            list(res.data['results'][0]),
+            ['id', 'price', 'tags'],
+        )
+        self.assertEqual(
+            res.data['results'][0]['tags'],
+            [{'id': self.tag.id, 'name': 'Python'}],
+        )
+
+    def test_expand_course(self):
+        """Test detail fields can be added to the list."""
+        res, _queries = self.get(COURSES_URL, expand='description')
+
+        course = res.data['results'][0]
+        self.assertEqual(course['description'], 'Sample description')
+        self.assertIn('tags', course)
+        self.assertNotIn('image_variants', course)
+
+    def test_unknown_fields(self):
+        """Test unknown fields are refused."""
+        for params in (
+            {'fields': 'id,secret'},
+            {'expand': 'title'},
+            {'fields': ','},
+        ):
+            with self.subTest(params=params):
+                res, _queries = self.get(COURSES_URL, **params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_pagination_with_fields(self):
+        """Test pages follow the ordering even if it is not returned."""
+        create_course(self.user, title='Cheap', price=Decimal('1.00'))
+        create_course(self.user, title='Dear', price=Decimal('99.00'))
+
+        res, _queries = self.get(
+            COURSES_URL,
+            fields='title',
+            ordering='price',
+            page_size=2,
+        )
+        titles = [course['title'] for course in res.data['results']]
+        res = self.client.get(res.data['next'])
+        titles += [course['title'] for course in res.data['results']]
+
+        self.assertEqual(titles, ['Cheap', 'Python basics', 'Dear'])
+
+    def test_retrieve_fields(self):
+        """Test the detail view can be narrowed."""
+        res, queries = self.get(
+            detail_url(self.course.id),
+            fields='title,image_status',
+        )
+
+        self.assertEqual(
+            res.data,
+            {'title': 'Python basics', 'image_status': ''},
+        )
+        self.assertFalse(any(TAG_COLUMN in sql for sql in queries))
+
+    def test_search_fields(self):
+        """Test search results can be narrowed."""
+        res, queries = self.get(
+            COURSES_URL,
+            search='python',
+            fields='id,rank',
+        )
+
+        self.assertEqual(list(res.data['results'][0]), ['id', 'rank'])
+        self.assertFalse(any(TAG_COLUMN in sql for sql in queries))
+
+    def test_tag_fields(self):
+        """Test tags can be narrowed and expanded with their courses."""
+        res, _queries = self.get(TAGS_URL)
+        self.assertEqual(
+            res.data,
+            [{'id': self.tag.id, 'name': 'Python', 'course_count': 1}],
+        )
+
+        res, _queries = self.get(TAGS_URL, fields='name')
+        self.assertEqual(res.data, [{'name': 'Python'}])
+
+        res, _queries = self.get(TAGS_URL, expand='courses')
+        self.assertEqual(
+            res.data,
+            [{'id': self.tag.id, 'name': 'Python', 'course_count': 1,
+              'courses': [self.course.id]}],
+        )
@@ -0,0 +1,331 @@
+"""
+Tests for course image processing.
+"""
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Course, StoredFile
+from course import images
+
+
+def image_upload_url(course_id):
+    """Create and return an image upload URL."""
+    return reverse('course:course-upload-image', args=[course_id])
+
+
+def detail_url(course_id):
+    """Create and return a course detail URL."""
+    return reverse('course:course-detail', args=[course_id])
+
+
+def image_bytes(size=(2000, 1000), image_format='JPEG', color='red',
+                **options):
+    """Return an encoded sample image."""
+    buffer = ContentFile(b'', name=f'sample.{image_format.lower()}')
+    Image.new('RGB', size, color).save(buffer, format=image_format, **options)
+    buffer.seek(0)
+    return buffer
+
+
+class ImageVariantTests(TestCase):
+    """Tests for generating course image variants."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(
+            user=self.user,
+            title='Sample course',
+            duration_hours=5,
+            price=Decimal('5.00'),
+        )
+
+    def upload(self, image_file):
+        """Upload an image without running the scheduled job."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            res = self.client.post(
+                image_upload_url(self.course.id),
+                {'image': image_file},
+                format='multipart',
+            )
+        self.course.refresh_from_db()
+        return res, callbacks
+
+    def test_upload_returns_before_processing(self):
+        """Test uploading responds right away and schedules the work."""
+        with patch('course.images.get_executor') as get_executor:
+            res, callbacks = self.upload(image_bytes())
+
+            self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(res.data['image_status'], 'pending')
+            get_executor.assert_not_called()
+
+            for callback in callbacks:
+                callback()
+            get_executor.return_value.submit.assert_called_once_with(
+                images._work,
+                self.course.id,
+                self.user.id,
+                self.course.image.name,
+            )
+
+    def test_generate_variants(self):
+        """Test variants are resized, stripped and recorded."""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        self.upload(image_bytes(exif=exif.tobytes()))
+
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.image_status, 'ready')
+        self.assertEqual(
+            set(self.course.image_variants),
+            {'thumbnail', 'card', 'full'},
+        )
+        thumbnail = self.course.image_variants['thumbnail']
+        self.assertEqual((thumbnail['width'], thumbnail['height']),
+                         (160, 80))
+        full = self.course.image_variants['full']
+        self.assertEqual((full['width'], full['height']), (1600, 800))
+        for variant in self.course.image_variants.values():
+            for extension, image_format in (('webp', 'WEBP'),
+                                            ('jpeg', 'JPEG')):
+                with default_storage.open(variant[extension]) as f, \
+                        Image.open(f) as image:
+                    self.assertEqual(image.format, image_format)
+                    self.assertEqual(len(image.getexif()), 0)
+
+    def test_variants_follow_exif_orientation(self):
+        """Test the orientation is applied before metadata is stripped."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        self.upload(image_bytes(exif=exif.tobytes()))
+
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+
+        self.course.refresh_from_db()
+        full = self.course.image_variants['full']
+        self.assertEqual((full['width'], full['height']), (800, 1600))
+
+    def test_variants_keep_transparency(self):
+        """Test WebP variants keep alpha and JPEG ones are flattened."""
+        image_file = ContentFile(b'', name='sample.png')
+        image = Image.new('RGBA', (400, 200), (255, 0, 0, 255))
+        image.paste((0, 0, 0, 0), (0, 0, 200, 200))
+        image.save(image_file, format='PNG')
+        image_file.seek(0)
+        self.upload(image_file)
+
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+
+        self.course.refresh_from_db()
+        card = self.course.image_variants['card']
+        with default_storage.open(card['webp']) as f, Image.open(f) as webp:
+            self.assertEqual(webp.mode, 'RGBA')
+            self.assertEqual(webp.getpixel((10, 10))[3], 0)
+            self.assertEqual(webp.getpixel((390, 10))[3], 255)
+        with default_storage.open(card['jpeg']) as f, Image.open(f) as jpeg:
+            self.assertEqual(jpeg.mode, 'RGB')
+            self.assertGreater(min(jpeg.getpixel((10, 10))), 240)
+
+    def test_detail_lists_variant_urls(self):
+        """Test the course detail exposes the variant URLs."""
+        self.upload(image_bytes())
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+
+        res = self.client.get(detail_url(self.course.id))
+
+        self.assertEqual(res.data['image_status'], 'ready')
+        url = res.data['image_variants']['card']['webp']
+        self.assertTrue(url.startswith('http://testserver/'))
+        self.assertTrue(url.endswith('card.webp'))
+
+    def test_new_upload_releases_files(self):
+        """Test uploading again drops the references to the old files."""
+        self.upload(image_bytes())
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+        self.course.refresh_from_db()
+        stale = self.course.stored_files()
+        self.assertEqual(len(stale), 7)
+        self.assertEqual(
+            StoredFile.objects.filter(name__in=stale, references=1).count(),
+            7,
+        )
+
+        self.upload(image_bytes(color='blue'))
+
+        self.assertEqual(self.course.image_variants, {})
+        self.assertFalse(StoredFile.objects.filter(name__in=stale).exists())
+        self.assertTrue(StoredFile.objects.filter(
+            name=self.course.image.name,
+            references=1,
+        ).exists())
+
+    def test_identical_images_shared(self):
+        """Test identical images and their variants are stored once."""
+        other = Course.objects.create(
+            user=self.user,
+            title='Other course',
+            duration_hours=5,
+            price=Decimal('5.00'),
+        )
+        self.upload(image_bytes())
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+        with self.captureOnCommitCallbacks():
+            self.client.post(
+                image_upload_url(other.id),
+                {'image': image_bytes()},
+                format='multipart',
+            )
+        other.refresh_from_db()
+
+        with patch('course.images.render_variant') as render:
+            images.run_variants(other.id, self.user.id, other.image.name)
+
+        render.assert_not_called()
+        other.refresh_from_db()
+        self.course.refresh_from_db()
+        self.assertEqual(other.image.name, self.course.image.name)
+        self.assertEqual(other.image_variants, self.course.image_variants)
+        self.assertEqual(
+            StoredFile.objects.filter(
+                name__in=other.stored_files(),
+                references=2,
+            ).count(),
+            7,
+        )
+
+        other.delete()
+        self.assertEqual(
+            StoredFile.objects.filter(
+                name__in=self.course.stored_files(),
+                references=1,
+            ).count(),
+            7,
+        )
+
+    def test_shared_variants_touched(self):
+        """Test reused variants are touched so gc_media spares them."""
+        self.upload(image_bytes())
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+        self.course.refresh_from_db()
+        paths = [
+            default_storage.path(name)
+            for name in self.course.stored_files()
+            if name != self.course.image.name
+        ]
+        old = time.time() - 7200
+        for path in paths:
+            os.utime(path, (old, old))
+        other = Course.objects.create(
+            user=self.user,
+            title='Other course',
+            duration_hours=5,
+            price=Decimal('5.00'),
+        )
+        with self.captureOnCommitCallbacks():
+            self.client.post(
+                image_upload_url(other.id),
+                {'image': image_bytes()},
+                format='multipart',
+            )
+
+        images.run_variants(other.id, self.user.id, self.course.image.name)
+
+        for path in paths:
+            self.assertGreater(os.path.getmtime(path), old + 3600)
+
+    def test_outdated_job_ignored(self):
+        """Test a job for a replaced image does not record variants."""
+        self.upload(image_bytes())
+        name = self.course.image.name
+        self.upload(image_bytes(color='blue'))
+
+        images.run_variants(self.course.id, self.user.id, name)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.image_status, 'pending')
+        self.assertEqual(self.course.image_variants, {})
+
+    def test_finished_job_ignored(self):
+        """Test running a job again does not count references twice."""
+        self.upload(image_bytes())
+        images.run_variants(self.course.id, self.user.id,
+                            self.course.image.name)
+
+        with patch('course.images.render_variant') as render:
+            images.run_variants(self.course.id, self.user.id,
+                                self.course.image.name)
+
+        render.assert_not_called()
+        self.course.refresh_from_db()
+        self.assertEqual(
+            StoredFile.objects.filter(
+                name__in=self.course.stored_files(),
+                references=1,
+            ).count(),
+            7,
+        )
+
+    def test_process_pending_images(self):
+        """Test the command processes images whose jobs were lost."""
+        self.upload(image_bytes())
+        out = StringIO()
+
+        call_command('process_pending_images', stdout=out)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.image_status, 'pending')
+
+        call_command('process_pending_images', '--min-age', '0', stdout=out)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.image_status, 'ready')
+        self.assertEqual(len(self.course.stored_files()), 7)
+        self.assertIn('Processed 1 pending images.', out.getvalue())
+
+    def test_broken_image_fails(self):
+        """Test an unreadable image is marked as failed."""
+        self.upload(image_bytes())
+        with default_storage.open(self.course.image.name, 'wb') as f:
+            f.write(b'broken')
+
+        with self.assertLogs('course.images', 'ERROR'):
+            images.run_variants(self.course.id, self.user.id,
+                                self.course.image.name)
+
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.image_status, 'failed')
@@ -0,0 +1,269 @@
+"""
+Tests for course link checks.
+"""
+import socket
+import threading
+import time
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Course
+from course.cache import get_generation
+from course.links import UNREACHABLE, LinkChecker, check_courses
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer link checks with canned responses per path."""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body):
+        server = self.server
+        with server.lock:
+            server.requests.append((
+                self.command,
+                self.path,
+                self.headers.get('If-None-Match'),
+                self.client_address[1],
+            ))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            status, headers = self.route(send_body)
+            body = b'ok' if send_body and status == 200 else b''
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def route(self, is_get):
+        """Return the status and headers for the requested path."""
+        if self.path == '/ok':
+            if self.headers.get('If-None-Match') == '"v1"':
+                return 304, {'ETag': '"v1"'}
+            return 200, {'ETag': '"v1"'}
+        if self.path == '/moved':
+            return 301, {'Location': '/ok'}
+        if self.path == '/no-head':
+            return (200 if is_get else 405), {}
+        if self.path.startswith('/slow'):
+            time.sleep(0.1)
+            return 200, {}
+
+        return 404, {}
+
+
+class LinkCheckTests(TestCase):
+    """Test checking course links against a local server."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = 0
+        self.server.max_active = 0
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def create_course(self, link):
+        """Create and return a course with a link."""
+        return Course.objects.create(
+            user=self.user,
+            title='Sample course',
+            duration_hours=10,
+            price=Decimal('9.99'),
+            link=link,
+        )
+
+    def closed_port(self):
+        """Return a local port nothing listens on."""
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def test_results_recorded(self):
+        """Test statuses, redirects and ETags are saved in bulk."""
+        ok = self.create_course(f'{self.base}/ok')
+        moved = self.create_course(f'{self.base}/moved')
+        missing = self.create_course(f'{self.base}/missing')
+        down = self.create_course(f'http://127.0.0.1:{self.closed_port()}/')
+        updated_at = Course.objects.get(id=ok.id).updated_at
+
+        with LinkChecker(timeout=5) as checker:
+            check_courses(checker, [ok, moved, missing, down])
+
+        ok.refresh_from_db()
+        self.assertEqual(ok.link_status, 200)
+        self.assertEqual(ok.link_etag, '"v1"')
+        self.assertEqual(ok.link_final_url, '')
+        self.assertIsNotNone(ok.link_checked_at)
+        self.assertEqual(ok.updated_at, updated_at)
+        moved.refresh_from_db()
+        self.assertEqual(moved.link_status, 200)
+        self.assertEqual(moved.link_final_url, f'{self.base}/ok')
+        missing.refresh_from_db()
+        self.assertEqual(missing.link_status, 404)
+        down.refresh_from_db()
+        self.assertEqual(down.link_status, UNREACHABLE)
+
+    def test_head_falls_back_to_get(self):
+        """Test links refusing HEAD are checked with GET."""
+        course = self.create_course(f'{self.base}/no-head')
+
+        with LinkChecker() as checker:
+            check_courses(checker, [course])
+
+        course.refresh_from_db()
+        self.assertEqual(course.link_status, 200)
+        self.assertEqual(
+            [request[:2] for request in self.server.requests],
+            [('HEAD', '/no-head'), ('GET', '/no-head')],
+        )
+
+    def test_conditional_requests(self):
+        """Test stored ETags are sent and a 304 keeps the results."""
+        course = self.create_course(f'{self.base}/ok')
+        with LinkChecker() as checker:
+            check_courses(checker, [course])
+            first_checked_at = course.link_checked_at
+            check_courses(checker, [course])
+
+        course.refresh_from_db()
+        self.assertEqual(
+            [request[2] for request in self.server.requests],
+            [None, '"v1"'],
+        )
+        self.assertEqual(course.link_status, 200)
+        self.assertEqual(course.link_etag, '"v1"')
+        self.assertGreater(course.link_checked_at, first_checked_at)
+
+    def test_per_host_limit_and_reuse(self):
+        """Test requests to a host are bounded and share connections."""
+        courses = [
+            self.create_course(f'{self.base}/slow/{i}') for i in range(6)
+        ]
+
+        with LinkChecker(per_host=2) as checker:
+            requests = check_courses(checker, courses)
+
+        self.assertEqual(requests, 6)
+        self.assertEqual(self.server.max_active, 2)
+        ports = {request[3] for request in self.server.requests}
+        self.assertEqual(len(ports), 2)
+
+    def test_shared_links_checked_once(self):
+        """Test courses with the same link are checked by one request."""
+        courses = [self.create_course(f'{self.base}/ok') for _ in range(3)]
+
+        with LinkChecker() as checker:
+            requests = check_courses(checker, courses)
+
+        self.assertEqual(requests, 1)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(
+            set(Course.objects.values_list('link_status', flat=True)),
+            {200},
+        )
+
+    def test_command_checks_due_links(self):
+        """Test the command checks web links not checked recently."""
+        due = self.create_course(f'{self.base}/ok')
+        other = self.create_course('not a web link')
+        generation = get_generation(self.user.id)
+        out = StringIO()
+
+        call_command('check_links', '--batch-size', '1', stdout=out)
+        call_command('check_links', stdout=out)
+
+        due.refresh_from_db()
+        self.assertEqual(due.link_status, 200)
+        other.refresh_from_db()
+        self.assertIsNone(other.link_checked_at)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIn('Checked 1 course links.', out.getvalue())
+        self.assertIn('Checked 0 course links.', out.getvalue())
+        self.assertEqual(get_generation(self.user.id), generation)
+
+    def test_edited_link_reset(self):
+        """Test changing a link forgets the checks of the old one."""
+        course = self.create_course(f'{self.base}/ok')
+        with LinkChecker() as checker:
+            check_courses(checker, [course])
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.patch(
+            reverse('course:course-detail', args=[course.id]),
+            {'link': f'{self.base}/missing'},
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        course.refresh_from_db()
+        self.assertIsNone(course.link_status)
+        self.assertIsNone(course.link_checked_at)
+        self.assertEqual(course.link_etag, '')
+
+        Course.objects.filter(id=course.id).update(
+            link_status=404,
+            link_checked_at=timezone.now(),
+            link_etag='"v2"',
+        )
+        res = client.post(reverse('course:course-bulk'), {'update': [
+            {'id': course.id, 'link': f'{self.base}/ok'},
+        ]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        course.refresh_from_db()
+        self.assertIsNone(course.link_status)
+        self.assertEqual(course.link_etag, '')
+
+        with LinkChecker() as checker:
+            check_courses(checker, [course])
+        self.assertEqual(self.server.requests[-1][2], None)
+
+    def test_link_edited_during_check(self):
+        """Test results of a link edited meanwhile are not saved."""
+        course = self.create_course(f'{self.base}/ok')
+        Course.objects.filter(id=course.id).update(link='https://x.y/')
+
+        with LinkChecker() as checker:
+            check_courses(checker, [course])
+
+        course.refresh_from_db()
+        self.assertIsNone(course.link_status)
+
+    def test_negative_max_age_rejected(self):
+        """Test a negative maximum age is an error."""
+        with self.assertRaises(CommandError):
+            call_command('check_links', '--max-age', '-1')
@@ -0,0 +1,224 @@
+"""
+Tests for course recommendations.
+"""
+from decimal import Decimal
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    CourseRecommendation,
+    RecommendationState,
+    Tag,
+)
+
+
+RECOMMENDATIONS_URL = reverse('course:course-recommendations')
+
+
+def create_course(user, tags=(), **params):
+    """Create and return a sample course with tags."""
+    defaults = {
+        'title': 'Sample course',
+        'duration_hours': 20,
+        'price': Decimal('25.00'),
+    }
+    defaults.update(params)
+    course = Course.objects.create(user=user, **defaults)
+    course.tags.add(*[
+        Tag.objects.get_or_create(user=user, name=name)[0] for name in tags
+    ])
+    return course
+
+
+def refresh(*args):
+    """Run the refresh command and return its output."""
+    out = StringIO()
+    call_command('refresh_recommendations', *args, stdout=out)
+    return out.getvalue()
+
+
+@override_settings(COURSE_RECOMMENDATIONS_LAG=0)
+class RecommendationTests(TestCase):
+    """Test materialized course recommendations."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_course(
+            self.user,
+            ['Python', 'Django'],
+            price=Decimal('20.00'),
+            duration_hours=10,
+            link='https://example.com/owned',
+        )
+        create_course(
+            self.user,
+            ['Python'],
+            price=Decimal('30.00'),
+            duration_hours=20,
+        )
+
+        partner = get_user_model().objects.create_user(
+            'partner@example.com',
+            'testpass123',
+            is_partner=True,
+        )
+        self.best = create_course(
+            partner,
+            ['python', 'Django'],
+            title='Django in depth',
+            duration_hours=15,
+        )
+        self.expensive = create_course(
+            partner,
+            ['Python'],
+            price=Decimal('900.00'),
+            duration_hours=200,
+        )
+        create_course(partner, ['Cooking'])
+        create_course(partner, ['Python'], link='https://example.com/owned')
+
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        create_course(other, ['Python', 'Django'])
+
+    def test_recommendations_ranked(self):
+        """Test catalog courses are ranked by tags, price and duration."""
+        refresh()
+
+        res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [course['id'] for course in res.data],
+            [self.best.id, self.expensive.id],
+        )
+        self.assertEqual(res.data[0]['title'], 'Django in depth')
+        self.assertEqual(
+            [tag['name'] for tag in res.data[0]['tags']],
+            ['python', 'Django'],
+        )
+        self.assertGreater(res.data[0]['score'], res.data[1]['score'])
+
+    def test_recommendations_read_without_scoring(self):
+        """Test reading recommendations is a lookup and a tags query."""
+        refresh()
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+    def test_no_recommendations_before_refresh(self):
+        """Test users get no recommendations until they are computed."""
+        res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_only_changed_users_refreshed(self):
+        """Test a run recomputes only the users whose courses changed."""
+        self.assertIn('Refreshed 3 users', refresh())
+        self.assertIn('Refreshed 0 users', refresh())
+
+        create_course(self.user, ['Django'])
+        self.assertIn('Refreshed 1 users', refresh())
+
+        # Renaming without saving leaves updated_at, but changes which
+        # catalog courses share the user's tags.
+        Tag.objects.filter(user=self.user, name='Django').update(
+            name='Web',
+        )
+        self.assertIn('Refreshed 1 users', refresh())
+        Tag.objects.get(user=self.user, name='Web').save()
+        self.assertIn('Refreshed 1 users', refresh())
+
+        self.assertIn('Refreshed 3 users', refresh('--all'))
+
+    def test_catalog_change_refreshes_affected_users(self):
+        """Test catalog changes only refresh users sharing their tags."""
+        refresh()
+        before = CourseRecommendation.objects.get(
+            user=self.user,
+            course=self.expensive,
+        ).score
+
+        cooking = Course.objects.get(tags__name='Cooking')
+        cooking.price = Decimal('30.00')
+        cooking.save()
+        self.assertIn('Refreshed 1 users', refresh())
+
+        self.expensive.price = Decimal('30.00')
+        self.expensive.save()
+
+        self.assertIn('Refreshed 3 users', refresh())
+        after = CourseRecommendation.objects.get(
+            user=self.user,
+            course=self.expensive,
+        ).score
+        self.assertGreater(after, before)
+
+    def test_deleted_courses_cleared(self):
+        """Test users without courses lose their recommendations."""
+        refresh()
+        self.assertTrue(
+            CourseRecommendation.objects.filter(user=self.user).exists(),
+        )
+
+        Course.objects.filter(user=self.user).delete()
+        refresh()
+
+        self.assertFalse(
+            CourseRecommendation.objects.filter(user=self.user).exists(),
+        )
+        self.assertEqual(
+            RecommendationState.objects.get(user=self.user).signature,
+            '',
+        )
+        self.assertIn('Refreshed 0 users', refresh())
+
+    def test_catalog_tag_rename_refreshes_users_of_old_name(self):
+        """Test users lose catalog courses whose tags were renamed."""
+        cook = get_user_model().objects.create_user(
+            'cook@example.com',
+            'testpass123',
+        )
+        create_course(cook, ['Cooking'])
+        self.assertIn('Refreshed 4 users', refresh())
+
+        tag = Tag.objects.get(user__is_partner=True, name='Django')
+        tag.name = 'Flask'
+        tag.save()
+
+        self.assertIn('Refreshed 3 users', refresh())
+
+    @override_settings(COURSE_RECOMMENDATIONS_LAG=60)
+    def test_recent_changes_refreshed_again(self):
+        """Test users are refreshed until their changes had time to commit."""
+        self.assertIn('Refreshed 3 users', refresh())
+        self.assertIn('Refreshed 3 users', refresh())
+
+        later = timezone.now() + timedelta(seconds=61)
+        with patch('django.utils.timezone.now', return_value=later):
+            self.assertIn('Refreshed 3 users', refresh())
+            self.assertIn('Refreshed 0 users', refresh())
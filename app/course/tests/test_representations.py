@@ -0,0 +1,172 @@
+"""
+Tests for the fast course representations.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+from course.renderers import FastJSONRenderer
+from course.representations import (
+    COURSE_FIELDS,
+    DETAIL_FIELDS,
+    course_columns,
+    represent_courses,
+)
+from course.serializers import CourseDetailSerializer, CourseSerializer
+
+
+COURSES_URL = reverse('course:course-list')
+ORDERED_TAGS = Prefetch('tags', queryset=Tag.objects.order_by('id'))
+
+
+def detail_url(course_id):
+    """Create and return a course detail URL."""
+    return reverse('course:course-detail', args=[course_id])
+
+
+class RepresentationConformanceTests(TestCase):
+    """Test the fast path renders the same bytes as the serializers."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.request = RequestFactory().get('/')
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ['Python', 'Юникод', 'Line break', 'Quote "x"']
+        ]
+        samples = [
+            ('Plain', 1, Decimal('0.50'), '', []),
+            ('Ünïcødé 🚀 <b>&</b>', 120, Decimal('9999.99'), 'https://x.y',
+             tags),
+            ('Separators \u2028\u2029', 7, Decimal('10.00'), 'a\\b',
+             tags[1:3]),
+        ]
+        for title, hours, price, link, course_tags in samples:
+            course = Course.objects.create(
+                user=self.user,
+                title=title,
+                description=f'About {title}\n\ttabs',
+                duration_hours=hours,
+                price=price,
+                link=link,
+                image_status=Course.IMAGE_READY,
+                image_variants={
+                    'card': {
+                        'width': 480,
+                        'height': 320,
+                        'webp': 'uploads/course/variants/x/card.webp',
+                        'jpeg': 'uploads/course/variants/x/card.jpeg',
+                    },
+                },
+            )
+            course.tags.add(*course_tags)
+
+    def test_list_matches_serializer(self):
+        """Test course lists render byte for byte like CourseSerializer."""
+        queryset = Course.objects.filter(user=self.user).order_by('-id')
+        expected = JSONRenderer().render(CourseSerializer(
+            queryset.prefetch_related(ORDERED_TAGS),
+            many=True,
+        ).data)
+
+        rows = list(queryset.values(*course_columns(COURSE_FIELDS)))
+        actual = FastJSONRenderer().render(represent_courses(rows))
+
+        self.assertEqual(actual, expected)
+
+    def test_detail_matches_serializer(self):
+        """Test course details render like CourseDetailSerializer."""
+        courses = Course.objects.filter(user=self.user)
+        for course in courses.prefetch_related(ORDERED_TAGS):
+            expected = JSONRenderer().render(CourseDetailSerializer(
+                course,
+                context={'request': self.request},
+            ).data)
+
+            row = Course.objects.values(
+                *course_columns(DETAIL_FIELDS),
+            ).get(id=course.id)
+            actual = FastJSONRenderer().render(
+                represent_courses([row], self.request, DETAIL_FIELDS)[0],
+            )
+
+            self.assertEqual(actual, expected)
+
+    def test_api_matches_serializer(self):
+        """Test the list endpoint returns the serializer representation."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        courses = Course.objects.filter(
+            user=self.user,
+        ).prefetch_related(ORDERED_TAGS).order_by('-id')
+
+        res = client.get(COURSES_URL)
+
+        self.assertEqual(
+            res.json()['results'],
+            CourseSerializer(courses, many=True).data,
+        )
+        self.assertIn(b'\\u2028', res.content)
+
+    def test_retrieve_matches_serializer(self):
+        """Test the detail endpoint returns the serializer representation."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        course = Course.objects.prefetch_related(ORDERED_TAGS).filter(
+            user=self.user,
+        ).last()
+
+        res = client.get(detail_url(course.id))
+
+        self.assertEqual(
+            res.json(),
+            CourseDetailSerializer(
+                course,
+                context={'request': res.wsgi_request},
+            ).data,
+        )
+
+    def test_retrieve_other_user_not_found(self):
+        """Test the fast path only finds the user's own courses."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+        course = Course.objects.filter(user=self.user).first()
+
+        res = client.get(detail_url(course.id))
+
+        self.assertEqual(res.status_code, 404)
+
+
+class FastJSONRendererTests(TestCase):
+    """Test the orjson renderer."""
+
+    def test_indent_falls_back(self):
+        """Test indented output is left to JSONRenderer."""
+        data = {'a': [1, 'b']}
+        renderer = FastJSONRenderer()
+
+        self.assertEqual(
+            renderer.render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_none(self):
+        """Test no data renders an empty body."""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -0,0 +1,200 @@
+"""
+Tests for on-demand course image resizing.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Course
+from course.resize import ResizeCache, resize_cache
+
+
+def resize_url(course_id, **params):
+    """Create and return a resized image URL."""
+    url = reverse('course:course-image', args=[course_id])
+    query = '&'.join(f'{key}={value}' for key, value in params.items())
+    return f'{url}?{query}' if query else url
+
+
+def create_course_with_image(user, size=(1000, 500), color='blue'):
+    """Create and return a course with a sample image."""
+    course = Course.objects.create(
+        user=user,
+        title='Sample course',
+        duration_hours=5,
+        price=Decimal('5.00'),
+    )
+    image_file = ContentFile(b'', name='sample.png')
+    Image.new('RGB', size, color).save(image_file, format='PNG')
+    course.image.save('sample.png', image_file)
+    return course
+
+
+class ResizeAPITests(TestCase):
+    """Tests for the resized image endpoint."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(resize_cache.clear)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.client.force_authenticate(self.user)
+        self.course = create_course_with_image(self.user)
+
+    def get_image(self, res):
+        """Return the image in a file response."""
+        content = b''.join(res.streaming_content)
+        image_file = ContentFile(content)
+        return Image.open(image_file)
+
+    def test_resize(self):
+        """Test the image is served at the requested width and format."""
+        res = self.client.get(resize_url(self.course.id, width=320))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        image = self.get_image(res)
+        self.assertEqual(image.format, 'WEBP')
+        self.assertEqual(image.size, (320, 160))
+
+    def test_resize_jpeg(self):
+        """Test requesting a JPEG image."""
+        res = self.client.get(
+            resize_url(self.course.id, width=160, image_format='jpeg'),
+        )
+
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(self.get_image(res).format, 'JPEG')
+
+    def test_no_upscaling(self):
+        """Test widths beyond the original keep the original size."""
+        res = self.client.get(resize_url(self.course.id, width=1600))
+
+        self.assertEqual(self.get_image(res).size, (1000, 500))
+
+    def test_width_not_allowed(self):
+        """Test arbitrary widths are rejected."""
+        res = self.client.get(resize_url(self.course.id, width=321))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_RESIZE_WIDTHS=[321])
+    def test_allowed_widths_configurable(self):
+        """Test the allowed widths come from the settings."""
+        res = self.client.get(resize_url(self.course.id, width=321))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_image(res).width, 321)
+
+    def test_course_without_image(self):
+        """Test a course without an image returns 404."""
+        self.course.image.delete()
+
+        res = self.client.get(resize_url(self.course.id, width=320))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_other_users_course(self):
+        """Test images of other users' courses are not served."""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password123',
+        )
+        course = create_course_with_image(other_user)
+
+        res = self.client.get(resize_url(course.id, width=320))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cached_on_disk(self):
+        """Test repeated requests reuse the cached file."""
+        self.get_image(self.client.get(resize_url(self.course.id, width=320)))
+
+        with patch.object(ResizeCache, '_render') as render:
+            res = self.client.get(resize_url(self.course.id, width=320))
+            self.get_image(res)
+
+        render.assert_not_called()
+
+
+class ResizeCacheTests(TestCase):
+    """Tests for the resized image disk cache."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.course = create_course_with_image(self.user)
+        self.cache = ResizeCache()
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest files are evicted when the cache is full."""
+        names = [
+            create_course_with_image(self.user, color=color).image.name
+            for color in ('red', 'green', 'yellow')
+        ]
+        first = self.cache.get(names[0], 320, 'jpeg')
+        second = self.cache.get(names[1], 320, 'jpeg')
+        os.utime(first, (1, 1))
+        os.utime(second, (2, 2))
+        self.cache.get(names[0], 320, 'jpeg')
+
+        file_size = os.path.getsize(first)
+        with override_settings(IMAGE_RESIZE_CACHE_SIZE=file_size * 2.5):
+            third = self.cache.get(names[2], 320, 'jpeg')
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertTrue(os.path.exists(third))
+
+    def test_concurrent_requests_coalesced(self):
+        """Test concurrent misses for one file render it once."""
+        name = self.course.image.name
+        render = self.cache._render
+        calls = []
+        barrier = threading.Barrier(4)
+
+        def counting_render(*args):
+            calls.append(args)
+            return render(*args)
+
+        def request():
+            barrier.wait()
+            self.cache.get(name, 320, 'webp')
+
+        with patch.object(self.cache, '_render', counting_render):
+            threads = [threading.Thread(target=request) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,248 @@
+"""
+Tests for similar courses.
+"""
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Course,
+    Tag,
+)
+from course import similarity
+
+
+def similar_url(course_id):
+    """Create and return a similar courses URL."""
+    return reverse('course:course-similar', args=[course_id])
+
+
+def create_course(user, tags=(), **params):
+    """Create and return a sample course with tags."""
+    defaults = {
+        'duration_hours': 20,
+        'price': Decimal('22.80'),
+    }
+    defaults.update(params)
+    course = Course.objects.create(user=user, **defaults)
+    course.tags.add(*[
+        Tag.objects.get_or_create(user=user, name=name)[0] for name in tags
+    ])
+    return course
+
+
+class SimilarCoursesTests(TestCase):
+    """Test finding similar courses."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(COURSE_SIMILARITY_DIR=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(similarity._indexes.clear)
+        self.addCleanup(similarity._user_locks.clear)
+
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.course = create_course(
+            self.user,
+            ['Python', 'Django'],
+            title='Django web development',
+            description='Build web applications with Django.',
+        )
+        self.close = create_course(
+            self.user,
+            ['Python', 'Django'],
+            title='Django REST APIs',
+        )
+        self.related = create_course(
+            self.user,
+            ['Python'],
+            title='Data science',
+        )
+        self.unrelated = create_course(self.user, title='Cooking')
+
+    def similar_ids(self, course_id):
+        """Return the ids of the courses similar to a course."""
+        return [
+            course_id for course_id, _score in similarity.similar_courses(
+                self.user.id,
+                course_id,
+                10,
+            )
+        ]
+
+    def test_similar_courses_ranked(self):
+        """Test similar courses are ranked by tags and text."""
+        res = self.client.get(similar_url(self.course.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [course['id'] for course in res.data],
+            [self.close.id, self.related.id],
+        )
+        self.assertEqual(
+            [tag['name'] for tag in res.data[0]['tags']],
+            ['Python', 'Django'],
+        )
+        self.assertGreater(
+            res.data[0]['similarity'],
+            res.data[1]['similarity'],
+        )
+        self.assertLessEqual(res.data[0]['similarity'], 1)
+
+    def test_similar_courses_limited(self):
+        """Test the number of similar courses can be limited."""
+        res = self.client.get(similar_url(self.course.id), {'limit': 1})
+
+        self.assertEqual(
+            [course['id'] for course in res.data],
+            [self.close.id],
+        )
+
+        res = self.client.get(similar_url(self.course.id), {'limit': 0})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_similar_courses_of_other_user(self):
+        """Test courses of other users are neither found nor suggested."""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'testpass123',
+        )
+        other_course = create_course(
+            other,
+            ['Python', 'Django'],
+            title='Django web development',
+        )
+
+        res = self.client.get(similar_url(other_course.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn(other_course.id, self.similar_ids(self.course.id))
+
+    def test_index_updated_incrementally(self):
+        """Test changed courses are read again without a full build."""
+        self.similar_ids(self.course.id)
+        new = create_course(
+            self.user,
+            ['Python', 'Django'],
+            title='Django web development',
+        )
+        self.close.delete()
+        self.related.title = 'Django web development'
+        self.related.save()
+
+        with patch(
+            'course.similarity.read_courses',
+            wraps=similarity.read_courses,
+        ) as read:
+            ids = self.similar_ids(self.course.id)
+
+        self.assertEqual(ids[0], new.id)
+        self.assertIn(self.related.id, ids)
+        self.assertNotIn(self.close.id, ids)
+        self.assertEqual(len(read.mock_calls), 1)
+        self.assertIsNotNone(read.call_args.kwargs['since'])
+        self.assertEqual(ids, [
+            course_id for course_id, _score in
+            similarity.SimilarityIndex.build(self.user.id).similar(
+                self.course.id, 10,
+            )
+        ])
+
+    def test_late_commits_indexed(self):
+        """Test changes committed after newer ones are still indexed."""
+        latest = similarity.get_index(self.user.id).latest
+        # A transaction that took its timestamp before the last indexed
+        # change but committed after the index was updated.
+        Course.objects.filter(id=self.unrelated.id).update(
+            title='Django web development',
+            updated_at=latest - timedelta(seconds=1),
+        )
+
+        self.assertIn(self.unrelated.id, self.similar_ids(self.course.id))
+
+    def test_settled_index_not_read_again(self):
+        """Test an index read after the lag is current without reads."""
+        Course.objects.update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        self.similar_ids(self.course.id)
+
+        with patch('course.similarity.read_courses') as read:
+            self.similar_ids(self.course.id)
+
+        read.assert_not_called()
+
+    def test_unchanged_window_not_saved(self):
+        """Test re-reading recent changes writes the index only if changed."""
+        self.similar_ids(self.course.id)
+
+        with patch.object(similarity.SimilarityIndex, 'save') as save:
+            self.similar_ids(self.course.id)
+            save.assert_not_called()
+
+            self.close.title = 'Changed'
+            self.close.save()
+            self.similar_ids(self.course.id)
+            save.assert_called_once()
+
+    def test_evicted_users_release_locks(self):
+        """Test locks of users whose index left memory are dropped."""
+        with override_settings(COURSE_SIMILARITY_CACHED_INDEXES=1):
+            self.similar_ids(self.course.id)
+            similarity.get_index(self.user.id + 1000)
+
+        self.assertNotIn(self.user.id, similarity._user_locks)
+        self.assertNotIn(self.user.id, similarity._indexes)
+
+    def test_deleted_tags_dropped(self):
+        """Test deleting a tag updates the similarity of its courses."""
+        self.similar_ids(self.related.id)
+
+        Tag.objects.filter(user=self.user, name='Python').delete()
+
+        self.assertEqual(self.similar_ids(self.related.id), [])
+
+    def test_index_persisted(self):
+        """Test the index is loaded from its file without reading courses."""
+        Course.objects.update(
+            updated_at=timezone.now() - timedelta(hours=1),
+        )
+        ids = self.similar_ids(self.course.id)
+        self.assertTrue(os.path.exists(similarity.index_path(self.user.id)))
+        similarity._indexes.clear()
+
+        with patch('course.similarity.read_courses') as read:
+            self.assertEqual(self.similar_ids(self.course.id), ids)
+
+        read.assert_not_called()
+
+    def test_unusable_file_rebuilt(self):
+        """Test an unreadable index file is replaced by a new index."""
+        path = similarity.index_path(self.user.id)
+        with open(path, 'wb') as f:
+            f.write(b'not an index')
+
+        self.assertEqual(
+            self.similar_ids(self.course.id),
+            [self.close.id, self.related.id],
+        )
+        self.assertIsNotNone(similarity.SimilarityIndex.load(path))
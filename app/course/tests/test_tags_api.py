@@ -4,8 +4,10 @@ Tests for the tags API.
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -20,6 +22,7 @@ from course.serializers import TagSerializer
 
 
 TAGS_URL = reverse('course:tag-list')
+BULK_URL = reverse('course:course-bulk')
 
 
 def detail_url(tag_id):
@@ -91,6 +94,19 @@ class PrivateTagsApiTests(TestCase):
         tag.refresh_from_db()
         self.assertEqual(tag.name, payload['name'])
 
+    def test_update_tag_duplicate_name_error(self):
+        """Test renaming a tag to an existing name returns error."""
+        Tag.objects.create(user=self.user, name='Python')
+        tag = Tag.objects.create(user=self.user, name='Django')
+
+        payload = {'name': 'Python'}
+        url = detail_url(tag.id)
+        res = self.client.patch(url, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Django')
+
     def test_delete_tag(self):
         """Test deleting a tag"""
         tag = Tag.objects.create(user=self.user, name='PHP')
@@ -113,6 +129,7 @@ class PrivateTagsApiTests(TestCase):
             user=self.user,
         )
         course.tags.add(tag1)
+        tag1.refresh_from_db()
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
@@ -143,3 +160,84 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_assigned_only_reads_counts(self):
+        """Test filtering assigned tags does not join course links."""
+        tag = Tag.objects.create(user=self.user, name='Long training')
+        course = Course.objects.create(
+            title='Go',
+            duration_hours=10,
+            price=Decimal('12'),
+            user=self.user,
+        )
+        course.tags.add(tag)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([item['id'] for item in res.data], [tag.id])
+        sql = ' '.join(query['sql'] for query in ctx.captured_queries)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('core_course_tags', sql)
+
+    def test_order_by_popularity(self):
+        """Test tags can be sorted by their number of courses."""
+        tags = {
+            name: Tag.objects.create(user=self.user, name=name)
+            for name in ['Rare', 'Common', 'Unused', 'Also common']
+        }
+        for i in range(2):
+            course = Course.objects.create(
+                title=f'Course {i}',
+                duration_hours=10,
+                price=Decimal('12'),
+                user=self.user,
+            )
+            course.tags.add(tags['Common'], tags['Also common'])
+        course.tags.add(tags['Rare'])
+
+        res = self.client.get(TAGS_URL, {'ordering': 'popularity'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['name'], item['course_count']) for item in res.data],
+            [('Also common', 2), ('Common', 2), ('Rare', 1), ('Unused', 0)],
+        )
+
+    def test_invalid_ordering(self):
+        """Test sorting by an unknown ordering is refused."""
+        res = self.client.get(TAGS_URL, {'ordering': 'course_count'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ordering', res.data)
+
+    def test_bulk_changes_counted(self):
+        """Test courses changed in bulk are reflected in tag counts."""
+        kept = Tag.objects.create(user=self.user, name='Kept')
+        dropped = Tag.objects.create(user=self.user, name='Dropped')
+        courses = []
+        for i in range(2):
+            course = Course.objects.create(
+                title=f'Course {i}',
+                duration_hours=10,
+                price=Decimal('12'),
+                user=self.user,
+            )
+            course.tags.add(kept, dropped)
+            courses.append(course)
+        payload = {
+            'create': [{
+                'title': 'New',
+                'duration_hours': 5,
+                'price': '9.99',
+                'tags': [{'name': 'Kept'}, {'name': 'New'}],
+            }],
+            'update': [{'id': courses[0].id, 'tags': [{'name': 'Kept'}]}],
+            'delete': [courses[1].id],
+        }
+
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        counts = dict(Tag.objects.values_list('name', 'course_count'))
+        self.assertEqual(counts, {'Kept': 2, 'Dropped': 0, 'New': 1})
@@ -0,0 +1,334 @@
+"""
+Tests for streaming and resumable course image uploads.
+"""
+import io
+import os
+import shutil
+import struct
+import tempfile
+import tracemalloc
+import zlib
+from decimal import Decimal
+from unittest.mock import patch
+
+from PIL import Image, ImageFile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Course, ImageUpload
+from course.uploads import LimitedUploadHandler, UploadTooLarge, append_chunk
+
+
+def image_upload_url(course_id):
+    """Create and return an image upload URL."""
+    return reverse('course:course-upload-image', args=[course_id])
+
+
+def image_uploads_url(course_id):
+    """Create and return the URL starting resumable uploads."""
+    return reverse('course:course-image-uploads', args=[course_id])
+
+
+def image_upload_session_url(course_id, upload_id):
+    """Create and return the URL of a resumable upload."""
+    return reverse(
+        'course:course-image-upload',
+        args=[course_id, upload_id],
+    )
+
+
+def png_header(width, height):
+    """Return a PNG announcing the given size, without pixel data."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + \
+            struct.pack('>I', zlib.crc32(kind + data))
+
+    return b''.join([
+        b'\x89PNG\r\n\x1a\n',
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)),
+        chunk(b'IDAT', zlib.compress(b'')),
+        chunk(b'IEND', b''),
+    ])
+
+
+def encode_image(size=(200, 100), image_format='PNG'):
+    """Return an encoded image of random pixels."""
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def named_file(data, name):
+    """Return an in-memory file for multipart uploads."""
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
+
+
+class UploadTestCase(TestCase):
+    """Base class isolating uploaded files."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.client.force_authenticate(self.user)
+        self.course = Course.objects.create(
+            user=self.user,
+            title='Sample course',
+            duration_hours=5,
+            price=Decimal('5.00'),
+        )
+
+
+class StreamingUploadTests(UploadTestCase):
+    """Tests for limits on multipart image uploads."""
+
+    def upload(self, data, name='image.png'):
+        """Upload a file as the course image."""
+        return self.client.post(
+            image_upload_url(self.course.id),
+            {'image': named_file(data, name)},
+            format='multipart',
+        )
+
+    def test_upload(self):
+        """Test a valid image is accepted."""
+        res = self.upload(encode_image())
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_too_large_refused(self):
+        """Test uploads beyond the size limit are refused."""
+        res = self.upload(encode_image())
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        self.course.refresh_from_db()
+        self.assertFalse(self.course.image)
+
+    def test_too_many_pixels_rejected_before_decoding(self):
+        """Test the pixel limit is checked from the header."""
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            res = self.upload(png_header(20000, 20000))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', str(res.data['image'][0]))
+        load.assert_not_called()
+
+    def test_decompression_bomb_rejected(self):
+        """Test sizes Pillow refuses to open are rejected."""
+        res = self.upload(png_header(100000, 100000))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', str(res.data['image'][0]))
+
+    def test_format_not_allowed(self):
+        """Test image formats outside the allowed list are rejected."""
+        res = self.upload(encode_image(image_format='GIF'), 'image.gif')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('format', str(res.data['image'][0]))
+
+    def test_handler_memory_bounded(self):
+        """Test streaming a large upload holds one chunk at a time."""
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'image.png', 'image/png', None)
+        chunk = b'x' * handler.chunk_size
+        chunks = 10 * 1024 * 1024 // len(chunk)
+
+        tracemalloc.start()
+        try:
+            for index in range(chunks):
+                handler.receive_data_chunk(chunk, index * len(chunk))
+            uploaded = handler.file_complete(chunks * len(chunk))
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            handler.file.close()
+
+        self.assertEqual(uploaded.size, 10 * 1024 * 1024)
+        self.assertLess(peak, 256 * 1024)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_handler_stops_at_limit(self):
+        """Test the handler stops once the limit is exceeded."""
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'image.png', 'image/png', None)
+
+        handler.receive_data_chunk(b'x' * 1024, 0)
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'x', 1024)
+
+
+class ResumableUploadTests(UploadTestCase):
+    """Tests for resumable chunked image uploads."""
+
+    def start(self, data, filename='image.png'):
+        """Start a resumable upload and return its id."""
+        res = self.client.post(
+            image_uploads_url(self.course.id),
+            {'filename': filename, 'size': len(data)},
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['offset'], 0)
+        return res.data['id']
+
+    def send(self, upload_id, chunk, offset):
+        """Send a chunk of a resumable upload."""
+        return self.client.put(
+            image_upload_session_url(self.course.id, upload_id),
+            chunk,
+            content_type='application/offset+octet-stream',
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_in_chunks(self):
+        """Test uploading an image in chunks, resuming after a break."""
+        data = encode_image((300, 300))
+        upload_id = self.start(data)
+
+        res = self.send(upload_id, data[:1000], 0)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['offset'], 1000)
+
+        res = self.client.get(
+            image_upload_session_url(self.course.id, upload_id),
+        )
+        self.assertEqual(res.data['offset'], 1000)
+
+        res = self.send(upload_id, data[1000:], 1000)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['image_status'], 'pending')
+        self.course.refresh_from_db()
+        with self.course.image.open('rb') as image_file:
+            self.assertEqual(image_file.read(), data)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertEqual(
+            os.listdir(os.path.join(self.media_root, 'uploads', 'partial')),
+            [],
+        )
+
+    def test_wrong_offset_conflict(self):
+        """Test chunks sent at the wrong offset are refused."""
+        data = encode_image()
+        upload_id = self.start(data)
+        self.send(upload_id, data[:100], 0)
+
+        res = self.send(upload_id, data[100:200], 50)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(res.data['offset'], 100)
+
+    def test_missing_offset(self):
+        """Test chunks must carry their offset."""
+        upload_id = self.start(encode_image())
+
+        res = self.client.put(
+            image_upload_session_url(self.course.id, upload_id),
+            b'data',
+            content_type='application/offset+octet-stream',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_chunk_beyond_size_refused(self):
+        """Test data beyond the announced size is refused."""
+        data = encode_image()
+        upload_id = self.start(data)
+        self.send(upload_id, data[:100], 0)
+
+        res = self.send(upload_id, data[100:] + b'extra', 100)
+
+        self.assertEqual(
+            res.status_code,
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        res = self.client.get(
+            image_upload_session_url(self.course.id, upload_id),
+        )
+        self.assertEqual(res.data['offset'], 100)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_size_limit(self):
+        """Test uploads larger than the limit cannot be started."""
+        res = self.client.post(
+            image_uploads_url(self.course.id),
+            {'filename': 'image.png', 'size': 1025},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_image_rejected(self):
+        """Test the completed file is validated like direct uploads."""
+        data = png_header(20000, 20000)
+        upload_id = self.start(data)
+
+        res = self.send(upload_id, data, 0)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.course.refresh_from_db()
+        self.assertFalse(self.course.image)
+
+    def test_abort(self):
+        """Test aborting an upload removes it."""
+        data = encode_image()
+        upload_id = self.start(data)
+        self.send(upload_id, data[:100], 0)
+
+        res = self.client.delete(
+            image_upload_session_url(self.course.id, upload_id),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_other_users_upload(self):
+        """Test uploads of other users cannot be continued."""
+        upload_id = self.start(encode_image())
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'password123',
+        )
+        self.client.force_authenticate(other_user)
+
+        res = self.send(upload_id, b'data', 0)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_append_memory_bounded(self):
+        """Test appending a chunk holds a bounded amount of memory."""
+        upload = ImageUpload.objects.create(
+            user=self.user,
+            course=self.course,
+            filename='image.png',
+            size=8 * 1024 * 1024,
+        )
+        stream = io.BytesIO(b'x' * upload.size)
+
+        tracemalloc.start()
+        try:
+            offset = append_chunk(upload, stream)
+            _current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(offset, upload.size)
+        self.assertLess(peak, 256 * 1024)
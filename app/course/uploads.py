@@ -0,0 +1,127 @@
+"""
+Memory-bounded handling of course image uploads.
+"""
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import BaseParser
+
+
+# Room for the multipart boundaries and part headers around the file.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = _('Uploaded file is too large.')
+    default_code = 'too_large'
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream uploaded files to temporary files, enforcing the size limit.
+
+    Requests announcing a larger body are refused before it is read, and
+    the limit is checked again on every chunk received, so at most one
+    chunk of the upload is held in memory.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.IMAGE_UPLOAD_CHUNK_SIZE
+        self.max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise UploadTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+
+        return super().receive_data_chunk(raw_data, start)
+
+
+class OffsetStreamParser(BaseParser):
+    """
+    Accept raw chunks of resumable uploads.
+
+    The body is left unread so that views can stream it from
+    `request.stream` in chunks.
+    """
+    media_type = 'application/offset+octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return {}
+
+
+class ReceivedFile(File):
+    """
+    Completely received resumable upload.
+
+    Like uploads streamed to temporary files, it is validated and stored
+    from its path instead of being read into memory.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def read_chunks(stream, chunk_size, limit):
+    """Yield chunks of a stream, refusing more than limit bytes."""
+    received = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        received += len(chunk)
+        if received > limit:
+            raise UploadTooLarge()
+        yield chunk
+
+
+def append_chunk(upload, stream):
+    """Append a request body to a resumable upload, returning the offset."""
+    os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+    with open(upload.path, 'ab') as part:
+        offset = part.tell()
+        try:
+            for chunk in read_chunks(
+                stream,
+                settings.IMAGE_UPLOAD_CHUNK_SIZE,
+                upload.size - offset,
+            ):
+                part.write(chunk)
+        except UploadTooLarge:
+            # Keep the upload resumable from where the chunk started.
+            part.truncate(offset)
+            raise
+
+        return part.tell()
+
+
+def upload_offset(upload):
+    """Return the number of bytes received for a resumable upload."""
+    try:
+        return os.path.getsize(upload.path)
+    except FileNotFoundError:
+        return 0
+
+
+def discard(upload):
+    """Delete a resumable upload and its partial file."""
+    try:
+        os.unlink(upload.path)
+    except FileNotFoundError:
+        pass
+    upload.delete()
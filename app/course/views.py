@@ -1,6 +1,17 @@
 """
 Views for the course APIs.
 """
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+)
+from django.db import transaction
+from django.db.models import Exists, F, FloatField, OuterRef, Prefetch
+from django.db.models.functions import Cast
+from django.http import FileResponse
+from django.utils.cache import patch_cache_control
+from django.utils.translation import gettext as _
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -13,75 +24,590 @@ from rest_framework import (
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 
 from core.models import (
+    SEARCH_CONFIG,
     Course,
+    ImageUpload,
     Tag,
 )
 from course import serializers
+from course.cache import CachedResponseMixin, invalidate_user
+from course.conditional import (
+    ConditionalResponseMixin,
+    user_validators,
+)
+from course.export import export_response
+from course.facets import course_facets
+from course.fieldsets import fieldset_parameters, select_fields
+from course.images import schedule_variants
+from course.pagination import CoursePagination
+from course.renderers import FastJSONRenderer
+from course.representations import (
+    COURSE_FIELDS,
+    DETAIL_FIELDS,
+    EXPANDABLE_COURSE_FIELDS,
+    course_columns,
+    represent_courses,
+)
+from course.resize import resize_cache
+from course.similarity import similar_courses
+from course.uploads import (
+    LimitedUploadHandler,
+    OffsetStreamParser,
+    ReceivedFile,
+    append_chunk,
+    discard,
+    upload_offset,
+)
+from user.authentication import TokenAuthenticationMixin
+
+
+COURSE_FILTER_PARAMETERS = [
+    OpenApiParameter(
+        'tags',
+        OpenApiTypes.STR,
+        description='Comma separated list of IDs to filter',
+    ),
+    OpenApiParameter(
+        'tags_match',
+        OpenApiTypes.STR, enum=['any', 'all'],
+        description='Match courses with any or all of the tags.',
+    ),
+    OpenApiParameter(
+        'price_min',
+        OpenApiTypes.NUMBER,
+        description='Minimum course price.',
+    ),
+    OpenApiParameter(
+        'price_max',
+        OpenApiTypes.NUMBER,
+        description='Maximum course price.',
+    ),
+    OpenApiParameter(
+        'duration_min',
+        OpenApiTypes.INT,
+        description='Minimum course duration in hours.',
+    ),
+    OpenApiParameter(
+        'duration_max',
+        OpenApiTypes.INT,
+        description='Maximum course duration in hours.',
+    ),
+    OpenApiParameter(
+        'search',
+        OpenApiTypes.STR,
+        description='Full-text search over title and description.',
+    ),
+]
 
 
 @extend_schema_view(
     list=extend_schema(
-        parameters=[
-            OpenApiParameter(
-                'tags',
-                OpenApiTypes.STR,
-                description='Comma separated list of IDs to filter',
-            )
-        ]
-    )
+        parameters=COURSE_FILTER_PARAMETERS + fieldset_parameters(
+            COURSE_FIELDS,
+            EXPANDABLE_COURSE_FIELDS,
+        ),
+    ),
+    retrieve=extend_schema(parameters=fieldset_parameters(DETAIL_FIELDS)),
 )
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(TokenAuthenticationMixin,
+                    ConditionalResponseMixin,
+                    CachedResponseMixin,
+                    viewsets.ModelViewSet):
     """View for manage course APIs."""
     serializer_class = serializers.CourseDetailSerializer
     queryset = Course.objects.all()
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = CoursePagination
+    # Actions applying the filter query parameters, which other actions
+    # ignore rather than reject.
+    filtered_actions = ('list', 'facets', 'export')
 
     def _params_to_ints(self, qs):
         """Convert a list of string to integers"""
         return [int(str_id) for str_id in qs.split(',')]
 
-    def get_queryset(self):
-        """Retrieve courses for authenticated user."""
+    def _filter_by_tags(self, queryset, tag_ids, match):
+        """Filter courses with a semi-join on the course tags table."""
+        CourseTag = Course.tags.through
+        if match == 'all':
+            for tag_id in set(tag_ids):
+                queryset = queryset.filter(Exists(CourseTag.objects.filter(
+                    course_id=OuterRef('pk'),
+                    tag_id=tag_id,
+                )))
+            return queryset
+
+        return queryset.filter(Exists(CourseTag.objects.filter(
+            course_id=OuterRef('pk'),
+            tag_id__in=tag_ids,
+        )))
+
+    def _search(self, queryset, text):
+        """Filter courses matching a full-text query and rank them."""
+        query = SearchQuery(
+            text,
+            config=SEARCH_CONFIG,
+            search_type='websearch',
+        )
+        highlight = {
+            'config': SEARCH_CONFIG,
+            'start_sel': serializers.HIGHLIGHT_START,
+            'stop_sel': serializers.HIGHLIGHT_STOP,
+        }
+        return queryset.filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField()),
+            title_highlight=SearchHeadline(
+                'title',
+                query,
+                highlight_all=True,
+                **highlight,
+            ),
+            description_highlight=SearchHeadline(
+                'description',
+                query,
+                max_words=35,
+                min_words=15,
+                **highlight,
+            ),
+        )
+
+    def _filter_by_ranges(self, queryset):
+        """Filter courses by price and duration ranges."""
+        params = serializers.CourseFilterSerializer(
+            data=self.request.query_params,
+        )
+        params.is_valid(raise_exception=True)
+        lookups = {
+            'price_min': 'price__gte',
+            'price_max': 'price__lte',
+            'duration_min': 'duration_hours__gte',
+            'duration_max': 'duration_hours__lte',
+        }
+
+        return queryset.filter(**{
+            lookups[param]: value
+            for param, value in params.validated_data.items()
+        })
+
+    def _filter(self, queryset):
+        """Filter courses by the tags, search and range parameters."""
         tags = self.request.query_params.get('tags')
-        queryset = self.queryset
+        search = self.request.query_params.get('search')
+        match = self.request.query_params.get('tags_match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'tags_match': [_('Must be any or all.')]})
+
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+            queryset = self._filter_by_tags(queryset, tag_ids, match)
+        if search:
+            queryset = self._search(queryset, search)
+        return self._filter_by_ranges(queryset)
+
+    def get_queryset(self):
+        """Retrieve courses for authenticated user."""
+        queryset = self.queryset.defer('search_vector')
+        if self.action in self.filtered_actions:
+            queryset = self._filter(queryset)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        if self.action in ('list', 'retrieve'):
+            if self.uses_fast_path():
+                return queryset
+
+            fields = self.get_fieldset()
+            queryset = queryset.only(*self._columns(fields))
+            if 'tags' not in fields:
+                return queryset
+
+        # Tags are ordered like the fast path lists them.
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+        )
+
+    def get_fieldset(self):
+        """Return the fields requested for a list or retrieve response."""
+        params = self.request.query_params
+        if self.action == 'retrieve':
+            return select_fields(params, DETAIL_FIELDS)
+        if params.get('search'):
+            return select_fields(
+                params,
+                serializers.CourseSearchSerializer.Meta.fields,
+            )
+
+        return select_fields(params, COURSE_FIELDS, EXPANDABLE_COURSE_FIELDS)
+
+    def _columns(self, fields):
+        """Return the columns to read for fields and the page boundaries."""
+        columns = {field.name for field in Course._meta.concrete_fields}
+        ordering = self.request.query_params.get('ordering', '').lstrip('-')
+        keys = ['id'] + [ordering] * (ordering in columns)
+
+        return list(dict.fromkeys(
+            keys + [field for field in fields if field in columns]
+        ))
 
     def get_serializer_class(self):
         """Return serializer class for request."""
         if self.action == 'list':
+            if self.request.query_params.get('search'):
+                return serializers.CourseSearchSerializer
             return serializers.CourseSerializer
         elif self.action == 'upload_image':
             return serializers.CourseImageSerializer
+        elif self.action == 'bulk':
+            return serializers.CourseBatchSerializer
 
         return self.serializer_class
 
+    def get_serializer(self, *args, **kwargs):
+        """Narrow search results to the requested fields."""
+        if self.action == 'list' and \
+                self.request.query_params.get('search'):
+            kwargs['fields'] = self.get_fieldset()
+
+        return super().get_serializer(*args, **kwargs)
+
+    def uses_fast_path(self):
+        """Return whether the response is built without serializers."""
+        return self.action == 'retrieve' or (
+            self.action == 'list' and
+            not self.request.query_params.get('search')
+        )
+
+    def get_renderers(self):
+        """Render responses of the fast path with orjson."""
+        if not self.uses_fast_path():
+            return super().get_renderers()
+
+        return [FastJSONRenderer()] + [
+            renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+            if renderer.format != 'json'
+        ]
+
+    def _fast_list(self, request, *args, **kwargs):
+        """List courses from values() rows."""
+        fields = self.get_fieldset()
+        page = self.paginate_queryset(
+            self.get_queryset().values(*self._columns(fields)),
+        )
+        return self.get_paginated_response(
+            represent_courses(page, request, fields),
+        )
+
+    def _fast_retrieve(self, request, *args, **kwargs):
+        """Retrieve a course from a values() row."""
+        fields = self.get_fieldset()
+        row = get_object_or_404(
+            self.get_queryset().values(*self._columns(fields)),
+            pk=kwargs['pk'],
+        )
+        return Response(represent_courses([row], request, fields)[0])
+
+    def list(self, request, *args, **kwargs):
+        """List courses, answering repeated requests cheaply."""
+        handler = self._fast_list if self.uses_fast_path() \
+            else super().list
+        return self.conditional_response(
+            request,
+            user_validators(request.user),
+            lambda: self.cached_response(handler, request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a course, answering repeated requests cheaply."""
+        handler = self._fast_retrieve
+        return self.conditional_response(
+            request,
+            user_validators(request.user),
+            lambda: self.cached_response(handler, request, *args, **kwargs),
+            check_first=False,
+        )
+
     def perform_create(self, serializer):
         """Create a new course."""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        parameters=COURSE_FILTER_PARAMETERS + [
+            OpenApiParameter(
+                'price_bucket',
+                OpenApiTypes.NUMBER,
+                description='Width of the price histogram buckets.',
+            ),
+            OpenApiParameter(
+                'duration_bucket',
+                OpenApiTypes.INT,
+                description='Width of the duration histogram buckets.',
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=['GET'], detail=False)
+    def facets(self, request):
+        """Return histogram and tag counts for the filtered courses."""
+        params = serializers.CourseFacetSerializer(data=request.query_params)
+
+        if params.is_valid():
+            data = course_facets(
+                self.get_queryset(),
+                params.validated_data['price_bucket'],
+                params.validated_data['duration_bucket'],
+            )
+            return Response(data, status=status.HTTP_200_OK)
+
+        return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        parameters=COURSE_FILTER_PARAMETERS + [
+            serializers.CourseExportSerializer,
+        ],
+        responses={
+            (status.HTTP_200_OK, 'application/x-ndjson'): OpenApiTypes.BINARY,
+            (status.HTTP_200_OK, 'text/csv'): OpenApiTypes.BINARY,
+            (status.HTTP_200_OK, 'application/gzip'): OpenApiTypes.BINARY,
+        },
+    )
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream every filtered course with its tags as NDJSON or CSV."""
+        params = serializers.CourseExportSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        return export_response(
+            self.get_queryset(),
+            params.validated_data['export_format'],
+            params.validated_data.get('compression'),
+        )
+
+    @extend_schema(
+        parameters=[serializers.CourseSimilarSerializer],
+        responses=serializers.SimilarCourseSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """List the courses most similar to a course by tags and text."""
+        return self.conditional_response(
+            request,
+            user_validators(request.user),
+            lambda: self.cached_response(self._similar, request, pk=pk),
+            check_first=False,
+        )
+
+    def _similar(self, request, pk=None):
+        """List similar courses from the similarity index."""
+        params = serializers.CourseSimilarSerializer(
+            data=request.query_params,
+        )
+        params.is_valid(raise_exception=True)
+        course = get_object_or_404(
+            Course.objects.only('id'),
+            pk=pk,
+            user=request.user,
+        )
+
+        scores = similar_courses(
+            request.user.id,
+            course.id,
+            params.validated_data['limit'],
+        )
+        rows = {
+            row['id']: row for row in Course.objects.filter(
+                id__in=[course_id for course_id, _score in scores],
+            ).values(*course_columns(COURSE_FIELDS))
+        }
+        # Courses deleted since the index was read are left out.
+        scores = [(course_id, score) for course_id, score in scores
+                  if course_id in rows]
+        courses = represent_courses(
+            [rows[course_id] for course_id, _score in scores],
+            request,
+        )
+        for data, (_course_id, score) in zip(courses, scores):
+            data['similarity'] = round(score, 4)
+
+        return Response(courses)
+
+    @extend_schema(
+        responses=serializers.RecommendedCourseSerializer(many=True),
+    )
+    @action(methods=['GET'], detail=False)
+    def recommendations(self, request):
+        """List the catalog courses recommended to the user, best first."""
+        rows = Course.objects.filter(
+            recommendations__user=request.user,
+        ).annotate(
+            score=F('recommendations__score'),
+        ).order_by('recommendations__rank').values(
+            *course_columns(COURSE_FIELDS),
+            'score',
+        )
+        courses = represent_courses(rows, request, COURSE_FIELDS + ['score'])
+        for course in courses:
+            course['score'] = round(course['score'], 4)
+
+        return Response(courses)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create, update and delete courses in one request."""
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            results = serializer.save(user=request.user)
+            invalidate_user(request.user.id)
+            return Response(results, status=status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(
+        parameters=[serializers.CourseImageResizeSerializer],
+        responses={(status.HTTP_200_OK, 'image/*'): OpenApiTypes.BINARY},
+    )
+    @action(methods=['GET'], detail=True, url_path='image')
+    def image(self, request, pk=None):
+        """Return the course image resized to one of the allowed widths."""
+        serializer = serializers.CourseImageResizeSerializer(
+            data=request.query_params,
+        )
+        serializer.is_valid(raise_exception=True)
+        course = get_object_or_404(
+            Course.objects.only('id', 'image'),
+            pk=pk,
+            user=request.user,
+        )
+        if not course.image:
+            raise NotFound(_('Course has no image.'))
+
+        extension = serializer.validated_data['image_format']
+        image_file = resize_cache.open(
+            course.image.name,
+            serializer.validated_data['width'],
+            extension,
+        )
+        response = FileResponse(
+            image_file,
+            content_type=f'image/{extension}',
+        )
+        patch_cache_control(response, private=True, max_age=3600)
+        return response
+
+    @extend_schema(
+        responses={status.HTTP_202_ACCEPTED: serializers.CourseImageSerializer}
+    )
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
-        """Upload an image to course."""
+        """Upload an image to course, resizing it in the background."""
+        request.upload_handlers = [LimitedUploadHandler(request)]
         course = self.get_object()
-        serializer = self.get_serializer(course, data=request.data)
+        return self._save_image(course, request.data)
+
+    def _save_image(self, course, data):
+        """Validate and store a new course image, then process it."""
+        serializer = serializers.CourseImageSerializer(
+            course,
+            data=data,
+            context=self.get_serializer_context(),
+        )
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            course = serializer.save()
+            schedule_variants(course)
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(
+        request=serializers.ImageUploadSerializer,
+        responses={status.HTTP_201_CREATED: serializers.ImageUploadSerializer},
+    )
+    @action(methods=['POST'], detail=True, url_path='image-uploads')
+    def image_uploads(self, request, pk=None):
+        """Start a resumable image upload, sent in chunks."""
+        course = self.get_object()
+        serializer = serializers.ImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        for upload in ImageUpload.objects.filter(course=course):
+            discard(upload)
+        serializer.save(user=request.user, course=course)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @extend_schema(
+        methods=['GET'],
+        responses=serializers.ImageUploadSerializer,
+    )
+    @extend_schema(
+        methods=['PUT'],
+        parameters=[OpenApiParameter(
+            'Upload-Offset',
+            OpenApiTypes.INT,
+            OpenApiParameter.HEADER,
+            required=True,
+            description='Offset of the chunk in the file.',
+        )],
+        request={'application/offset+octet-stream': OpenApiTypes.BINARY},
+        responses={
+            status.HTTP_200_OK: serializers.ImageUploadSerializer,
+            status.HTTP_202_ACCEPTED: serializers.CourseImageSerializer,
+        },
+    )
+    @action(
+        methods=['GET', 'PUT', 'DELETE'],
+        detail=True,
+        url_path=r'image-uploads/(?P<upload_id>[0-9a-f-]+)',
+        parser_classes=[OffsetStreamParser],
+    )
+    def image_upload(self, request, pk=None, upload_id=None):
+        """Resume, continue or abort a resumable image upload."""
+        upload = get_object_or_404(
+            ImageUpload.objects.select_related('course'),
+            pk=upload_id,
+            course_id=pk,
+            user=request.user,
+        )
+        if request.method == 'DELETE':
+            discard(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'GET':
+            return Response(serializers.ImageUploadSerializer(upload).data)
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'Upload-Offset': [_('A valid integer is required.')]}
+            )
+
+        with transaction.atomic():
+            # Serializes chunks of one upload sent concurrently.
+            ImageUpload.objects.select_for_update().get(pk=upload.pk)
+            if offset != upload_offset(upload):
+                return Response(
+                    serializers.ImageUploadSerializer(upload).data,
+                    status=status.HTTP_409_CONFLICT,
+                )
+            offset = append_chunk(upload, request.stream)
+
+        if offset < upload.size:
+            return Response(serializers.ImageUploadSerializer(upload).data)
+
+        with open(upload.path, 'rb') as image_file:
+            response = self._save_image(
+                upload.course,
+                {'image': ReceivedFile(image_file, name=upload.filename)},
+            )
+        discard(upload)
+        return response
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -90,33 +616,97 @@ class CourseViewSet(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to courses.',
-            )
-        ]
+            ),
+            OpenApiParameter(
+                'ordering',
+                OpenApiTypes.STR, enum=['name', 'popularity'],
+                description='Sort by descending name, the default, or by '
+                            'descending number of courses.',
+            ),
+        ] + fieldset_parameters(['id', 'name', 'course_count'], ['courses'])
     )
 )
-class BaseCourseAttrViewSet(mixins.DestroyModelMixin,
+class BaseCourseAttrViewSet(TokenAuthenticationMixin,
+                            ConditionalResponseMixin,
+                            CachedResponseMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    orderings = {
+        'name': ['-name'],
+        'popularity': ['-course_count', 'name'],
+    }
+
+    def list(self, request, *args, **kwargs):
+        """List items, answering repeated requests cheaply."""
+        handler = super().list
+        return self.conditional_response(
+            request,
+            user_validators(request.user),
+            lambda: self.cached_response(handler, request, *args, **kwargs),
+        )
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
         assigned_only = bool(
             int(self.request.query_params.get('assigned_only', 0))
         )
+        ordering = self.request.query_params.get('ordering', 'name')
+        if ordering not in self.orderings:
+            raise ValidationError(
+                {'ordering': [_('Must be one of %s.') % ', '.join(
+                    self.orderings,
+                )]}
+            )
+
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(course__isnull=False)
+            # The stored count spares joining the course links, and the
+            # DISTINCT that joining would need.
+            queryset = queryset.filter(course_count__gt=0)
 
-        return queryset.filter(
+        queryset = queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(*self.orderings[ordering])
+        if self.action == 'list':
+            columns = {field.name for field in queryset.model._meta.fields}
+            queryset = queryset.only('id', *[
+                field for field in self.get_fieldset() if field in columns
+            ])
+
+        return queryset
+
+    def get_fieldset(self):
+        """Return the fields requested for a list response."""
+        meta = self.get_serializer_class().Meta
+        expandable = getattr(meta, 'expandable_fields', [])
+        default = [field for field in meta.fields if field not in expandable]
+
+        return select_fields(self.request.query_params, default, expandable)
+
+    def get_serializer(self, *args, **kwargs):
+        """Narrow listed items to the requested fields."""
+        if self.action == 'list':
+            kwargs['fields'] = self.get_fieldset()
+
+        return super().get_serializer(*args, **kwargs)
 
 
 class TagViewSet(BaseCourseAttrViewSet):
     """Manage tags in the database."""
     serializer_class = serializers.TagSerializer
     queryset = Tag.objects.all()
+
+    def get_queryset(self):
+        """Fetch the courses of the listed tags when they are expanded."""
+        queryset = super().get_queryset()
+        if self.action == 'list' and 'courses' in self.get_fieldset():
+            queryset = queryset.prefetch_related(Prefetch(
+                'course_set',
+                queryset=Course.objects.only('id').order_by('id'),
+            ))
+
+        return queryset
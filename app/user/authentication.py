@@ -0,0 +1,205 @@
+"""
+Authentication for the APIs.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from user.tokens import verify_access_token
+
+
+class TokenCache:
+    """
+    Bounded LRU of authenticated users keyed by token, with a TTL.
+
+    Entries can also be kept in a shared cache so that other processes
+    skip the database on their first request for a token. Entries are
+    evicted by the signal handlers in `user.signals` in the process that
+    made the change; other processes see it once their entry expires.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def max_size(self):
+        return settings.AUTH_TOKEN_CACHE_SIZE
+
+    @property
+    def timeout(self):
+        return settings.AUTH_TOKEN_CACHE_TIMEOUT
+
+    @property
+    def shared_cache(self):
+        """Return the shared cache backing the LRU, if one is configured."""
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key):
+        """Return the shared cache key for a token without exposing it."""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return f'auth-token:{digest}'
+
+    def get(self, key):
+        """Return the cached user for a token, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                user, expires = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return user
+                del self._entries[key]
+
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            user = shared_cache.get(self._shared_key(key))
+            if user is not None:
+                self._store(key, user)
+                with self._lock:
+                    self.shared_hits += 1
+                return user
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, user):
+        """Cache the user owning a token."""
+        self._store(key, user)
+        shared_cache = self.shared_cache
+        if shared_cache is not None:
+            shared_cache.set(self._shared_key(key), user, self.timeout)
+
+    def _store(self, key, user):
+        """Add an entry to the LRU, evicting the least recently used."""
+        with self._lock:
+            self._entries[key] = (user, time.monotonic() + self.timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        """Drop the entries of the given tokens."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+        shared_cache = self.shared_cache
+        if shared_cache is not None and keys:
+            shared_cache.delete_many([self._shared_key(key) for key in keys])
+
+    def clear(self):
+        """Drop every entry held by this process."""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        """Reset the hit and miss counters."""
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """Return the counters and hit ratio of this process."""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (
+                    (self.hits + self.shared_hits) / lookups
+                    if lookups else 0.0
+                ),
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token lookup."""
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        if user is None:
+            user, _token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+        elif not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        # Each request gets its own copy so that changes made while
+        # handling it never leak into the cached user.
+        user = copy.copy(user)
+        return (user, self.get_model()(key=key, user=user))
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authentication with signed access tokens, without database access.
+
+    The user is built from the token claims and only carries its id and
+    staff flag; views needing other fields must reload it.
+    """
+    keyword = 'Bearer'
+
+    def authenticate_credentials(self, key):
+        try:
+            token = verify_access_token(key)
+        except signing.BadSignature:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        user = get_user_model()(
+            pk=token.user_id,
+            is_active=True,
+            is_staff=bool(token.claims['s']),
+        )
+        user._state.adding = False
+
+        return (user, token)
+
+
+AUTHENTICATION_CLASSES = {
+    'db': [CachedTokenAuthentication],
+    'signed': [SignedTokenAuthentication, CachedTokenAuthentication],
+}
+
+
+def get_authentication_classes():
+    """Return the authentication classes of the AUTH_TOKEN_MODE setting."""
+    try:
+        return AUTHENTICATION_CLASSES[settings.AUTH_TOKEN_MODE]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Unknown AUTH_TOKEN_MODE {settings.AUTH_TOKEN_MODE!r}.'
+        )
+
+
+class TokenAuthenticationMixin:
+    """Authenticate requests according to the AUTH_TOKEN_MODE setting."""
+
+    def get_authenticators(self):
+        return [auth() for auth in get_authentication_classes()]
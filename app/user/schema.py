@@ -0,0 +1,17 @@
+"""
+API schema extensions for the user app.
+"""
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+
+
+class SignedTokenScheme(OpenApiAuthenticationExtension):
+    """Describe signed access token authentication."""
+    target_class = 'user.authentication.SignedTokenAuthentication'
+    name = 'bearerAuth'
+
+    def get_security_definition(self, auto_schema):
+        return {
+            'type': 'http',
+            'scheme': 'bearer',
+            'description': 'Signed access token from /api/user/token/.',
+        }
@@ -5,10 +5,13 @@ from django.contrib.auth import (
     get_user_model,
     authenticate,
 )
+from django.core import signing
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from user.tokens import verify_refresh_token
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user model."""
@@ -57,3 +60,45 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class SignedTokenSerializer(serializers.Serializer):
+    """Serializer for a signed access and refresh token pair."""
+    token = serializers.CharField()
+    refresh = serializers.CharField()
+    expires_in = serializers.IntegerField()
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer for a signed refresh token."""
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        """Validate the token and load its user."""
+        msg = _('Invalid or expired refresh token.')
+        try:
+            claims = verify_refresh_token(attrs['refresh'])
+        except signing.BadSignature:
+            raise serializers.ValidationError(msg, code='authorization')
+
+        user = get_user_model().objects.filter(
+            pk=claims['u'],
+            is_active=True,
+        ).first()
+        if user is None:
+            raise serializers.ValidationError(msg, code='authorization')
+
+        attrs['claims'] = claims
+        attrs['user'] = user
+        return attrs
+
+
+class TokenCacheStatsSerializer(serializers.Serializer):
+    """Serializer for token cache statistics."""
+    size = serializers.IntegerField()
+    max_size = serializers.IntegerField()
+    hits = serializers.IntegerField()
+    shared_hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    evictions = serializers.IntegerField()
+    hit_ratio = serializers.FloatField()
@@ -0,0 +1,164 @@
+"""
+Tests for cached token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+TOKEN_STATS_URL = reverse('user:token-stats')
+
+
+def create_user(email='user@example.com', **params):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(
+        email=email,
+        password='testpass123',
+        **params,
+    )
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached token lookups."""
+
+    def setUp(self):
+        token_cache.clear()
+        token_cache.reset_stats()
+        self.user = create_user(name='Test Name')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeated_requests_skip_token_lookup(self):
+        """Test only the first request looks up the token."""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+        stats = token_cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+
+    def test_invalid_token_rejected(self):
+        """Test an unknown token is rejected and not cached."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(token_cache.stats()['size'], 0)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user stops authenticating."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_user_reloaded(self):
+        """Test changes to the user are seen by the next request."""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'Updated name'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Updated name')
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=1)
+    def test_least_recently_used_evicted(self):
+        """Test the cache drops the least recently used token when full."""
+        other_token = Token.objects.create(
+            user=create_user(email='other@example.com'),
+        )
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {other_token.key}',
+        )
+
+        self.client.get(ME_URL)
+        other_client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+        self.assertEqual(token_cache.stats()['size'], 1)
+        self.assertEqual(token_cache.stats()['evictions'], 2)
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=0)
+    def test_expired_entry_reloaded(self):
+        """Test expired entries are looked up again."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        """Test another process finds the token in the shared cache."""
+        caches['default'].clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats()['shared_hits'], 1)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache_invalidated(self):
+        """Test deactivating a user also drops the shared entry."""
+        caches['default'].clear()
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        token_cache.clear()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_stats_require_staff(self):
+        """Test only staff users can read the cache statistics."""
+        res = self.client.get(TOKEN_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats(self):
+        """Test staff users can read the cache statistics."""
+        self.user.is_staff = True
+        self.user.save()
+
+        self.client.get(TOKEN_STATS_URL)
+        res = self.client.get(TOKEN_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['hits'], 1)
+        self.assertEqual(res.data['misses'], 1)
+        self.assertEqual(res.data['hit_ratio'], 0.5)
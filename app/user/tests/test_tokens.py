@@ -0,0 +1,261 @@
+"""
+Tests for signed access and refresh tokens.
+"""
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import RevokedToken
+from user.authentication import get_authentication_classes
+from user.tokens import deny_list
+
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+COURSES_URL = reverse('course:course-list')
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenTests(TestCase):
+    """Test the signed token mode."""
+
+    def setUp(self):
+        deny_list.clear()
+        deny_list.sync()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+
+    def obtain_tokens(self):
+        """Log in and return the issued token pair."""
+        res = self.client.post(TOKEN_URL, {
+            'email': 'user@example.com',
+            'password': 'testpass123',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_obtain_token_pair(self):
+        """Test logging in issues an access and a refresh token."""
+        tokens = self.obtain_tokens()
+
+        self.assertIn('token', tokens)
+        self.assertIn('refresh', tokens)
+        self.assertEqual(tokens['expires_in'], 300)
+        self.assertFalse(Token.objects.exists())
+
+    def test_access_token_needs_no_database(self):
+        """Test access tokens are verified without database queries."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Test Name')
+
+    def test_access_token_scopes_courses(self):
+        """Test access tokens authenticate course requests."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+
+        res = self.client.post(COURSES_URL, {
+            'title': 'Sample course',
+            'duration_hours': 5,
+            'price': '5.00',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            self.user.course_set.get().title,
+            'Sample course',
+        )
+
+    def test_expired_access_token_rejected(self):
+        """Test access tokens stop working once expired."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+
+        with patch('django.core.signing.time.time',
+                   return_value=time.time() + 301):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_tampered_access_token_rejected(self):
+        """Test a modified access token is rejected."""
+        tokens = self.obtain_tokens()
+        token = tokens['token'][:-1] + ('A' if tokens['token'][-1] != 'A'
+                                        else 'B')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_an_access_token(self):
+        """Test refresh tokens cannot authenticate requests."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {tokens["refresh"]}',
+        )
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_tokens(self):
+        """Test refreshing issues a new pair and spends the old token."""
+        tokens = self.obtain_tokens()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], tokens['refresh'])
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_with_expired_access_token(self):
+        """Test refreshing works when the expired access token is sent."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+
+        with patch('django.core.signing.time.time',
+                   return_value=time.time() + 301):
+            res = self.client.post(
+                REFRESH_URL,
+                {'refresh': tokens['refresh']},
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+            res = self.client.post(
+                REVOKE_URL,
+                {'refresh': res.data['refresh']},
+            )
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_deleted_user_rejected(self):
+        """Test access tokens of deleted users no longer authenticate."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+        self.user.delete()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rejected_for_inactive_user(self):
+        """Test deactivated users cannot refresh their tokens."""
+        tokens = self.obtain_tokens()
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoke(self):
+        """Test revoking denies both the access and the refresh token."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+
+        res = self.client.post(REVOKE_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        res = self.client.post(REFRESH_URL, {'refresh': tokens['refresh']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deny_list_synchronized(self):
+        """Test revocations made by other processes are picked up."""
+        tokens = self.obtain_tokens()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens["token"]}')
+        jti = self.client.get(ME_URL).wsgi_request.auth.jti
+        RevokedToken.objects.create(
+            jti=jti,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with patch('user.tokens.time.monotonic',
+                   return_value=time.monotonic() + 31):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deny_list_loads_late_commits(self):
+        """Test revocations committed out of id order are picked up."""
+        expires_at = timezone.now() + timedelta(minutes=5)
+        early_id = RevokedToken.objects.create(
+            jti='early',
+            expires_at=expires_at,
+        ).id
+        RevokedToken.objects.create(jti='later', expires_at=expires_at)
+        RevokedToken.objects.filter(id=early_id).delete()
+        deny_list.sync(force=True)
+
+        RevokedToken.objects.create(
+            id=early_id,
+            jti='late-commit',
+            expires_at=expires_at,
+        )
+        deny_list.sync(force=True)
+
+        self.assertIn('late-commit', deny_list)
+        self.assertIn('later', deny_list)
+
+    def test_database_tokens_still_accepted(self):
+        """Test existing database tokens keep working."""
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class TokenModeTests(TestCase):
+    """Test switching the token mode."""
+
+    def test_database_mode_rejects_signed_tokens(self):
+        """Test signed tokens are not accepted in database mode."""
+        get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        client = APIClient()
+        with override_settings(AUTH_TOKEN_MODE='signed'):
+            token = client.post(TOKEN_URL, {
+                'email': 'user@example.com',
+                'password': 'testpass123',
+            }).data['token']
+
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        res = client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_MODE='unknown')
+    def test_unknown_mode(self):
+        """Test an unknown mode is a configuration error."""
+        with self.assertRaises(ImproperlyConfigured):
+            get_authentication_classes()
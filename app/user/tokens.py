@@ -0,0 +1,167 @@
+"""
+Signed access and refresh tokens.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from core.models import RevokedToken
+
+
+ACCESS_SALT = 'user.tokens.access'
+REFRESH_SALT = 'user.tokens.refresh'
+
+
+class AccessToken:
+    """Claims of a verified signed access token."""
+
+    def __init__(self, claims):
+        self.claims = claims
+        self.user_id = claims['u']
+        self.jti = claims['j']
+        self.expires_at = claims['e']
+
+    def __str__(self):
+        return self.jti
+
+
+def _sign(user, salt, lifetime):
+    """Return a signed token for a user and its expiry timestamp."""
+    expires_at = int(time.time() + lifetime)
+    claims = {
+        'u': user.pk,
+        's': int(user.is_staff),
+        'j': secrets.token_urlsafe(12),
+        'e': expires_at,
+    }
+
+    return signing.dumps(claims, salt=salt, compress=True), expires_at
+
+
+def _unsign(token, salt, lifetime):
+    """Return the claims of a valid token, raising BadSignature if not."""
+    claims = signing.loads(token, salt=salt, max_age=lifetime)
+    if not isinstance(claims, dict) or \
+            not {'u', 's', 'j', 'e'} <= claims.keys():
+        raise signing.BadSignature('Malformed token.')
+
+    return claims
+
+
+def issue_tokens(user):
+    """Return a new access and refresh token pair for a user."""
+    access, _expires = _sign(
+        user,
+        ACCESS_SALT,
+        settings.AUTH_ACCESS_TOKEN_LIFETIME,
+    )
+    refresh, _expires = _sign(
+        user,
+        REFRESH_SALT,
+        settings.AUTH_REFRESH_TOKEN_LIFETIME,
+    )
+
+    return {
+        'token': access,
+        'refresh': refresh,
+        'expires_in': settings.AUTH_ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def verify_access_token(token):
+    """Return the claims of a valid, unrevoked access token."""
+    claims = AccessToken(
+        _unsign(token, ACCESS_SALT, settings.AUTH_ACCESS_TOKEN_LIFETIME)
+    )
+    if claims.jti in deny_list:
+        raise signing.BadSignature('Token revoked.')
+
+    return claims
+
+
+def verify_refresh_token(token):
+    """Return the claims of a valid, unrevoked refresh token."""
+    claims = _unsign(token, REFRESH_SALT, settings.AUTH_REFRESH_TOKEN_LIFETIME)
+    # Refreshing is rare, so check the database rather than the deny list
+    # to close the window before the next synchronization.
+    if RevokedToken.objects.filter(jti=claims['j']).exists():
+        raise signing.BadSignature('Token revoked.')
+
+    return claims
+
+
+def revoke(jti, expires_at):
+    """
+    Deny a token until it would have expired anyway.
+
+    Returns False if the token was already revoked.
+    """
+    expires_at = datetime.fromtimestamp(expires_at, tz=timezone.utc)
+    RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+
+    deny_list.add(jti, expires_at)
+    return True
+
+
+class DenyList:
+    """
+    In-memory copy of the revoked token ids.
+
+    The copy is reloaded at most every AUTH_DENY_LIST_SYNC_INTERVAL
+    seconds, so verifying an access token normally needs no database
+    access. Only revocations of unexpired tokens are kept in the table and
+    loaded. The whole set is read each time because revocations can commit
+    out of id order, and a high-water mark would skip the late ones.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._synced_at = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        self.sync()
+        return jti in self._entries
+
+    def add(self, jti, expires_at):
+        """Deny a token in this process without waiting for a sync."""
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def sync(self, force=False):
+        """Reload the revocations of tokens that have not expired."""
+        interval = settings.AUTH_DENY_LIST_SYNC_INTERVAL
+        now = time.monotonic()
+        if not force and self._synced_at is not None and \
+                now - self._synced_at < interval:
+            return
+
+        with self._lock:
+            if not force and self._synced_at is not None and \
+                    now - self._synced_at < interval:
+                return
+
+            self._entries = dict(RevokedToken.objects.filter(
+                expires_at__gt=timezone.now(),
+            ).values_list('jti', 'expires_at'))
+            self._synced_at = now
+
+    def clear(self):
+        """Forget every entry and synchronize again on the next lookup."""
+        with self._lock:
+            self._entries = {}
+            self._synced_at = None
+
+
+deny_list = DenyList()
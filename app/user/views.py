@@ -1,14 +1,30 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext as _
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from user.authentication import (
+    SignedTokenAuthentication,
+    TokenAuthenticationMixin,
+    token_cache,
+)
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
+    RefreshTokenSerializer,
+    SignedTokenSerializer,
+    TokenCacheStatsSerializer,
 )
+from user.tokens import AccessToken, issue_tokens, revoke
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -21,13 +37,92 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return super().post(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new token pair."""
+    serializer_class = RefreshTokenSerializer
+    # The refresh token in the body is the credential; an expired access
+    # token sent along must not fail the request.
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(responses=SignedTokenSerializer)
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        claims = serializer.validated_data['claims']
+
+        # Refresh tokens are single use; a replayed one is rejected.
+        if not revoke(claims['j'], claims['e']):
+            raise AuthenticationFailed(_('Refresh token already used.'))
+
+        return Response(issue_tokens(serializer.validated_data['user']))
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Revoke a refresh token and the access token sent with the request."""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        claims = serializer.validated_data['claims']
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+        revoke(claims['j'], claims['e'])
+        access = self.get_access_token(request)
+        if access is not None:
+            revoke(access.jti, access.expires_at)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_access_token(self, request):
+        """Return the valid access token sent with a request, or None."""
+        try:
+            result = SignedTokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            # Expired or revoked access tokens need no revoking.
+            return None
+
+        return result[1] if result is not None else None
+
+
+class ManageUserView(TokenAuthenticationMixin,
+                     generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         """Retrieve and return authenticated user."""
-        return self.request.user
+        user = self.request.user
+        if isinstance(self.request.auth, AccessToken):
+            # Signed tokens only carry the user id.
+            try:
+                user.refresh_from_db()
+            except get_user_model().DoesNotExist:
+                user.is_active = False
+            if not user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+
+        return user
+
+
+class TokenCacheStatsView(TokenAuthenticationMixin, APIView):
+    """Report token cache statistics of the serving process."""
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = TokenCacheStatsSerializer
+
+    def get(self, request):
+        serializer = self.serializer_class(token_cache.stats())
+        return Response(serializer.data)